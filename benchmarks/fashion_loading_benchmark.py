@@ -0,0 +1,79 @@
+"""Benchmark FashionData loading throughput against the PIL path.
+
+Writes random FashionMNIST training set sized processed files (60000 28x28
+images) to a temporary directory and reports the samples per second of one
+pass over the dataset with a DataLoader:
+
+- pil: every sample goes through PIL, ToTensor and Normalize, as before.
+- tensor: the per sample tensor fast path.
+- __getitems__: one indexing op per batch, collated by the DataLoader.
+- batch sampler: a BatchSampler with batch_size=None, no collation.
+- preload: images normalized once when the dataset is created.
+"""
+import os
+import tempfile
+import time
+
+import torch
+from torch.utils.data import DataLoader, BatchSampler, SequentialSampler
+
+from vulcanai.datasets.fashion import FashionData, transforms
+
+NUM_IMAGES = 60000
+BATCH_SIZE = 100
+
+
+def samples_per_second(loader):
+    """Return the samples per second of one pass over loader."""
+    start = time.perf_counter()
+    num_samples = sum(len(targets) for _, targets in loader)
+    return num_samples / (time.perf_counter() - start)
+
+
+class ItemFashionData(FashionData):
+    """FashionData without batched fetching."""
+
+    __getitems__ = None
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as root:
+        os.makedirs(os.path.join(root, 'processed'))
+        split = (torch.randint(0, 256, (NUM_IMAGES, 28, 28),
+                               dtype=torch.uint8),
+                 torch.randint(0, 10, (NUM_IMAGES,)))
+        for filename in ['training.pt', 'test.pt']:
+            torch.save(split, os.path.join(root, 'processed', filename))
+
+        pil_dataset = ItemFashionData(root)
+        # An equal transform that is not the default one takes the PIL path.
+        pil_dataset.transform = transforms.Compose(
+            pil_dataset.transform.transforms)
+        dataset = FashionData(root)
+
+        start = time.perf_counter()
+        preloaded_dataset = FashionData(root, preload=True)
+        preload_time = time.perf_counter() - start
+
+        loaders = [
+            ('pil', DataLoader(pil_dataset, batch_size=BATCH_SIZE)),
+            ('tensor', DataLoader(ItemFashionData(root),
+                                  batch_size=BATCH_SIZE)),
+            ('__getitems__', DataLoader(dataset, batch_size=BATCH_SIZE)),
+            ('batch sampler', DataLoader(
+                dataset,
+                sampler=BatchSampler(SequentialSampler(dataset), BATCH_SIZE,
+                                     drop_last=False),
+                batch_size=None)),
+            ('preload', DataLoader(
+                preloaded_dataset,
+                sampler=BatchSampler(SequentialSampler(dataset), BATCH_SIZE,
+                                     drop_last=False),
+                batch_size=None)),
+        ]
+
+        print("{:>14} | {:>14}".format("path", "samples/s"))
+        for name, loader in loaders:
+            print("{:>14} | {:14.0f}".format(name,
+                                             samples_per_second(loader)))
+        print("preloading took {:.3f}s".format(preload_time))
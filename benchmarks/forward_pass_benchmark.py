@@ -0,0 +1,81 @@
+"""Benchmark BaseNetwork.forward_pass against the torch.cat collector.
+
+Scores a small DenseNet over datasets from 10k to 10M rows and reports the
+wall time of the preallocated forward_pass next to the previous
+implementation which grew its prediction collector with torch.cat on every
+batch. The legacy collector copies quadratically, so it is only timed up to
+LEGACY_MAX_ROWS.
+
+Batches are drawn with a BatchSampler so that per-sample collation does not
+hide the cost of collecting the predictions.
+"""
+import time
+
+import torch
+from torch.utils.data import (DataLoader, TensorDataset, BatchSampler,
+                              SequentialSampler)
+
+from vulcanai.models import DenseNet
+
+ROW_COUNTS = [10000, 100000, 1000000, 10000000]
+LEGACY_MAX_ROWS = 1000000
+BATCH_SIZE = 4096
+IN_DIM = 16
+NUM_CLASSES = 10
+
+
+@torch.no_grad()
+def legacy_forward_pass(network, data_loader):
+    """Previous forward_pass collector, kept for comparison."""
+    pred_collector = torch.tensor([], dtype=torch.float,
+                                  device=network.device)
+    for data, _ in data_loader:
+        predictions = network(data)
+        if network._final_transform:
+            predictions = network._final_transform(predictions)
+        pred_collector = torch.cat([pred_collector, predictions])
+    return pred_collector.cpu().detach().numpy()
+
+
+def time_call(func, *args):
+    """Return the wall time in seconds of a single call."""
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    net = DenseNet(
+        name='benchmark_dnn',
+        in_dim=IN_DIM,
+        config={'dense_units': [64, 32]},
+        num_classes=NUM_CLASSES,
+        device='cpu'
+    )
+
+    # Warm up the allocator and kernels before timing.
+    net.forward_pass(DataLoader(
+        TensorDataset(torch.rand(BATCH_SIZE, IN_DIM),
+                      torch.zeros(BATCH_SIZE).long()),
+        batch_size=BATCH_SIZE))
+
+    print("{:>10} | {:>12} | {:>12}".format(
+        "rows", "legacy (s)", "buffer (s)"))
+    for num_rows in ROW_COUNTS:
+        dataset = TensorDataset(torch.rand(num_rows, IN_DIM),
+                                torch.zeros(num_rows).long())
+        # One indexing op per batch instead of per-sample collation.
+        loader = DataLoader(
+            dataset,
+            sampler=BatchSampler(SequentialSampler(dataset), BATCH_SIZE,
+                                 drop_last=False),
+            batch_size=None)
+
+        buffer_time = time_call(net.forward_pass, loader)
+        if num_rows <= LEGACY_MAX_ROWS:
+            legacy_time = "{:12.3f}".format(
+                time_call(legacy_forward_pass, net, loader))
+        else:
+            legacy_time = "{:>12}".format("skipped")
+        print("{:>10} | {} | {:12.3f}".format(
+            num_rows, legacy_time, buffer_time))
@@ -0,0 +1,77 @@
+"""Benchmark the numpy IDX reader against the byte loop reader.
+
+Writes a random FashionMNIST training set sized image file (60000 28x28
+images, 47M pixels) to a temporary directory and reports the wall time of
+read_image_file next to the previous reader which parsed every pixel in a
+nested Python loop. Also times read_idx_file with mmap=True, which only
+maps the file and reads pages on access.
+"""
+import codecs
+import os
+import struct
+import tempfile
+import time
+
+import numpy as np
+import torch
+
+from vulcanai.datasets.fashion import read_image_file, read_idx_file
+
+NUM_IMAGES = 60000
+IMAGE_SHAPE = (28, 28)
+
+
+def get_int(b):
+    return int(codecs.encode(b, 'hex'), 16)
+
+
+def legacy_read_image_file(path):
+    """Previous read_image_file, kept for comparison."""
+    with open(path, 'rb') as f:
+        data_in = f.read()
+        assert get_int(data_in[:4]) == 2051
+        length = get_int(data_in[4:8])
+        num_rows = get_int(data_in[8:12])
+        num_cols = get_int(data_in[12:16])
+        images = []
+        idx = 16
+        for l in range(length):
+            img = []
+            images.append(img)
+            for r in range(num_rows):
+                row = []
+                img.append(row)
+                for c in range(num_cols):
+                    row.append(data_in[idx])
+                    idx += 1
+        assert len(images) == length
+        return torch.ByteTensor(images).view(-1, 28, 28)
+
+
+def time_call(func, *args, **kwargs):
+    """Return the wall time in seconds and the result of a single call."""
+    start = time.perf_counter()
+    res = func(*args, **kwargs)
+    return time.perf_counter() - start, res
+
+
+if __name__ == '__main__':
+    images = np.random.randint(0, 256, size=(NUM_IMAGES, *IMAGE_SHAPE),
+                               dtype=np.uint8)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'train-images-idx3-ubyte')
+        with open(path, 'wb') as f:
+            f.write(struct.pack('>IIII', 2051, *images.shape))
+            f.write(images.tobytes())
+
+        legacy_time, legacy_images = time_call(legacy_read_image_file, path)
+        numpy_time, numpy_images = time_call(read_image_file, path)
+        mmap_time, mmap_images = time_call(read_idx_file, path, mmap=True)
+        assert torch.equal(legacy_images, numpy_images)
+        assert np.array_equal(mmap_images, images)
+        del mmap_images
+
+    print("{:>14} | {:>10}".format("reader", "time (s)"))
+    print("{:>14} | {:10.3f}".format("legacy", legacy_time))
+    print("{:>14} | {:10.3f}".format("frombuffer", numpy_time))
+    print("{:>14} | {:10.3f}".format("memmap", mmap_time))
@@ -0,0 +1,67 @@
+"""Benchmark Metrics.get_all_scores against the per metric run_test path.
+
+Scores random 50 class predictions of 100k to 10M rows and reports the wall
+time of the fused get_all_scores next to the previous _run_test_multi
+sequence, which built a confusion matrix and re-scanned the targets for
+every metric and ran one roc_curve per class. The legacy path is only timed
+up to LEGACY_MAX_ROWS.
+
+At 10M rows the float32 predictions alone take 2GB of memory.
+"""
+import time
+
+import numpy as np
+
+from vulcanai.models.metrics import Metrics
+
+ROW_COUNTS = [100000, 1000000, 10000000]
+LEGACY_MAX_ROWS = 1000000
+NUM_CLASSES = 50
+
+
+def legacy_scores(targets, raw_predictions, num_classes):
+    """Previous _run_test_multi metric calls, kept for comparison."""
+    average = 'macro'
+    predictions = Metrics.transform_outputs(raw_predictions)
+    Metrics.get_confusion_matrix_values(targets, predictions)
+    for func in [Metrics.get_sensitivity, Metrics.get_specificity,
+                 Metrics.get_dice, Metrics.get_ppv, Metrics.get_npv,
+                 Metrics.get_f1]:
+        func(targets, predictions)
+        func(targets, predictions, average=average)
+    Metrics.get_accuracy(targets, predictions)
+    Metrics.get_auc(targets, raw_predictions, num_classes)
+    Metrics.get_auc(targets, raw_predictions, num_classes, average=average)
+
+
+def time_call(func, *args, **kwargs):
+    """Return the wall time in seconds of a single call."""
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+
+    print("{:>10} | {:>12} | {:>12}".format(
+        "rows", "legacy (s)", "fused (s)"))
+    for num_rows in ROW_COUNTS:
+        targets = rng.integers(0, NUM_CLASSES, num_rows)
+        raw_predictions = rng.random((num_rows, NUM_CLASSES),
+                                     dtype=np.float32)
+        # Make the predictions informative so every class gets predicted.
+        raw_predictions[np.arange(num_rows), targets] += 0.5
+
+        fused_time = time_call(Metrics.get_all_scores, targets,
+                               raw_predictions, NUM_CLASSES,
+                               average='macro')
+        if num_rows <= LEGACY_MAX_ROWS:
+            legacy_time = "{:12.3f}".format(
+                time_call(legacy_scores, targets, raw_predictions,
+                          NUM_CLASSES))
+        else:
+            legacy_time = "{:>12}".format("skipped")
+        print("{:>10} | {} | {:12.3f}".format(
+            num_rows, legacy_time, fused_time))
+        del targets, raw_predictions
@@ -0,0 +1,153 @@
+"""Benchmark bfloat16 autocast training against float32 on the cpu.
+
+Trains the ConvNet configurations of examples/fashion_conv_dense.py and
+examples/fashion_multi_input_network.py on random FashionMNIST shaped data
+and reports the wall time of one BaseNetwork.fit epoch with and without
+mixed_precision='bfloat16', next to the final training loss of each run.
+
+Whether bfloat16 is faster depends on the cpu: it pays off on cpus with
+native bfloat16 instructions (AVX512-BF16, AMX) and can be slower without
+them.
+"""
+import copy
+import time
+
+import torch
+from torch.utils.data import DataLoader, TensorDataset
+
+import vulcanai
+from vulcanai.models import ConvNet, DenseNet
+
+REPEATS = 3
+BATCH_SIZE = 100
+
+# Same layers as the example scripts.
+conv_2D_config = {
+    'conv_units': [
+                    dict(
+                        in_channels=1,
+                        out_channels=16,
+                        kernel_size=(5, 5),
+                        stride=2,
+                        dropout=0.1
+                    ),
+                    dict(
+                        in_channels=16,
+                        out_channels=32,
+                        kernel_size=(5, 5),
+                        dropout=0.1
+                    ),
+                    dict(
+                        in_channels=32,
+                        out_channels=64,
+                        kernel_size=(5, 5),
+                        pool_size=2,
+                        dropout=0.1
+                        )
+    ],
+}
+conv_3D_config = {
+    'conv_units': [
+                    dict(
+                        in_channels=1,
+                        out_channels=16,
+                        kernel_size=(5, 5, 5),
+                        stride=2,
+                        dropout=0.1
+                    ),
+                    dict(
+                        in_channels=16,
+                        out_channels=16,
+                        kernel_size=(5, 5, 5),
+                        stride=1,
+                        dropout=0.1
+                    ),
+                    dict(
+                        in_channels=16,
+                        out_channels=64,
+                        kernel_size=(5, 5, 5),
+                        dropout=0.1
+                    ),
+    ],
+}
+dense_config = {
+    'dense_units': [100, 50],
+    'dropout': 0.5,
+}
+
+
+def build_conv_dense():
+    """The conv_2D -> dense_model stack of fashion_conv_dense.py."""
+    conv_2D = ConvNet(
+        name='conv_2D',
+        in_dim=(1, 28, 28),
+        config=conv_2D_config,
+        device='cpu'
+    )
+    return DenseNet(
+        name='dense_model',
+        input_networks=conv_2D,
+        config=dense_config,
+        num_classes=10,
+        device='cpu'
+    )
+
+
+def build_conv_3D():
+    """conv_3D of fashion_multi_input_network.py with a prediction layer."""
+    return ConvNet(
+        name='conv_3D',
+        in_dim=(1, 28, 28, 28),
+        config=conv_3D_config,
+        num_classes=10,
+        device='cpu'
+    )
+
+
+def make_loader(in_dim, num_rows):
+    """Random inputs and targets of the given shape."""
+    return DataLoader(
+        TensorDataset(torch.rand(num_rows, *in_dim),
+                      torch.randint(0, 10, [num_rows])),
+        batch_size=BATCH_SIZE)
+
+
+def time_fit(network, train_loader, val_loader, mixed_precision):
+    """Return the best epoch time over REPEATS and the last train loss."""
+    times = []
+    for _ in range(REPEATS):
+        vulcanai.set_global_seed(42)
+        net = copy.deepcopy(network)
+        start = time.perf_counter()
+        net.fit(train_loader, val_loader, epochs=1,
+                mixed_precision=mixed_precision)
+        times.append(time.perf_counter() - start)
+    return min(times), net.record['train_error'][-1]
+
+
+if __name__ == '__main__':
+    benchmarks = [
+        ('conv_2D + dense', build_conv_dense(), (1, 28, 28), 2000),
+        ('conv_3D', build_conv_3D(), (1, 28, 28, 28), 200),
+    ]
+
+    print("{:>16} | {:>10} | {:>10} | {:>7} | {:>10} | {:>10}".format(
+        "network", "fp32 (s)", "bf16 (s)", "speedup",
+        "fp32 loss", "bf16 loss"))
+    for name, network, in_dim, num_rows in benchmarks:
+        train_loader = make_loader(in_dim, num_rows)
+        val_loader = make_loader(in_dim, BATCH_SIZE)
+
+        # Warm up the kernels of both modes before timing.
+        for mode in (None, 'bfloat16'):
+            copy.deepcopy(network).fit(val_loader, val_loader, epochs=1,
+                                       mixed_precision=mode)
+
+        fp32_time, fp32_loss = time_fit(network, train_loader, val_loader,
+                                        None)
+        bf16_time, bf16_loss = time_fit(network, train_loader, val_loader,
+                                        'bfloat16')
+        print("{:>16} | {:10.3f} | {:10.3f} | {:6.2f}x | {:10.4f} | "
+              "{:10.4f}".format(name, fp32_time, bf16_time,
+                                fp32_time / bf16_time, fp32_loss,
+                                bf16_loss))
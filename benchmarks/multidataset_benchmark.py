@@ -0,0 +1,93 @@
+"""Benchmark a DataLoader epoch over a MultiDataset of TensorDatasets.
+
+Iterates a three input MultiDataset, the target dataset read twice as input
+and target like in examples/fashion_multi_input_network.py, with batch sizes
+of 32 to 1024 and reports the wall time of an epoch with the batched
+__getitems__ next to the previous MultiDataset, which fetched the target
+dataset item twice per sample and walked the datasets and logged a warning
+on every len call. The legacy warnings go to stderr.
+"""
+import logging
+import time
+
+import torch
+from torch.utils.data import DataLoader, Dataset, TensorDataset
+
+from vulcanai.datasets import MultiDataset
+
+NUM_ROWS = 100000
+BATCH_SIZES = [32, 256, 1024]
+
+logger = logging.getLogger(__name__)
+
+
+class LegacyMultiDataset(Dataset):
+    """Previous MultiDataset, kept for comparison."""
+
+    def __init__(self, dataset_tuples):
+        self._dataset_tuples = dataset_tuples
+
+    def __len__(self):
+        logger.warning("Defaulting to the length of the smallest dataset")
+
+        def _get_min_length(multi_datasets):
+            min_length = float('inf')
+            for tup in multi_datasets:
+                if isinstance(tup, LegacyMultiDataset):
+                    length = _get_min_length(tup._dataset_tuples)
+                else:
+                    length = len(tup[0])
+                if length < min_length:
+                    min_length = length
+            return min_length
+
+        return _get_min_length(self._dataset_tuples)
+
+    def __getitem__(self, idx):
+        input_data_items = []
+        target_item = None
+        for tup in self._dataset_tuples:
+            include_data = tup[1]
+            include_target = tup[2]
+            ds = tup if isinstance(tup, LegacyMultiDataset) else tup[0]
+            if include_data:
+                input_data_items.append(ds.__getitem__(idx)[0])
+            if include_target:
+                target_item = ds.__getitem__(idx)[1]
+        return input_data_items, target_item
+
+
+def run_epoch(dataset, batch_size):
+    """Iterate over every batch of the dataset once."""
+    for _ in DataLoader(dataset, batch_size=batch_size, shuffle=True):
+        pass
+
+
+def time_call(func, *args, **kwargs):
+    """Return the wall time in seconds of a single call."""
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    torch.manual_seed(0)
+    image_dataset = TensorDataset(torch.rand(NUM_ROWS, 1, 28, 28),
+                                  torch.randint(0, 10, [NUM_ROWS]))
+    tabular_dataset = TensorDataset(torch.rand(NUM_ROWS, 64),
+                                    torch.randint(0, 10, [NUM_ROWS]))
+    dataset_tuples = [
+        (image_dataset, True, True),
+        (tabular_dataset, True, False),
+        (image_dataset, True, False)
+    ]
+    legacy_dataset = LegacyMultiDataset(dataset_tuples)
+    multi_dataset = MultiDataset(dataset_tuples)
+
+    print("{:>10} | {:>12} | {:>12}".format(
+        "batch size", "legacy (s)", "batched (s)"))
+    for batch_size in BATCH_SIZES:
+        legacy_time = time_call(run_epoch, legacy_dataset, batch_size)
+        batched_time = time_call(run_epoch, multi_dataset, batch_size)
+        print("{:>10} | {:12.3f} | {:12.3f}".format(
+            batch_size, legacy_time, batched_time))
@@ -0,0 +1,68 @@
+"""Benchmark BaseNetwork.fit with and without a BatchPrefetcher.
+
+Trains a DenseNet for one epoch on 20k rows from a loader that sleeps for
+every batch, like a DataLoader reading from a slow disk or network store,
+and reports the epoch time with the batch wait and compute times recorded
+by fit, for prefetch=0 and prefetch=2. With prefetch the next batches are
+read while the network trains on the current one, so the batch wait drops
+by up to the compute time of a batch.
+"""
+import time
+
+import torch
+from torch.utils.data import DataLoader, TensorDataset
+
+from vulcanai.models import DenseNet
+
+NUM_ROWS = 20000
+NUM_FEATURES = 256
+BATCH_SIZE = 256
+# Seconds the loader sleeps for every batch.
+LOAD_DELAYS = [0.0, 0.005, 0.02]
+PREFETCHES = [0, 2]
+
+
+class SlowDataset(TensorDataset):
+    """TensorDataset that sleeps for every batch it is read in."""
+
+    def __init__(self, delay, *tensors):
+        super().__init__(*tensors)
+        self.delay = delay
+
+    def __getitems__(self, indices):
+        time.sleep(self.delay)
+        return [self[idx] for idx in indices]
+
+
+def time_call(func, *args, **kwargs):
+    """Return the wall time in seconds of a single call."""
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    torch.manual_seed(0)
+    data = torch.rand(NUM_ROWS, NUM_FEATURES)
+    targets = torch.randint(0, 10, [NUM_ROWS])
+
+    print("{:>9} | {:>8} | {:>9} | {:>8} | {:>11}".format(
+        "delay (s)", "prefetch", "epoch (s)", "wait (s)", "compute (s)"))
+    for delay in LOAD_DELAYS:
+        loader = DataLoader(SlowDataset(delay, data, targets),
+                            batch_size=BATCH_SIZE, shuffle=True)
+        val_loader = DataLoader(TensorDataset(data[:BATCH_SIZE],
+                                              targets[:BATCH_SIZE]))
+        for prefetch in PREFETCHES:
+            network = DenseNet(
+                name='prefetch_benchmark',
+                in_dim=(NUM_FEATURES),
+                config={'dense_units': [1024, 1024]},
+                num_classes=10,
+                device='cpu')
+            epoch_time = time_call(network.fit, loader, val_loader, 1,
+                                   valid_interv=2, prefetch=prefetch)
+            print("{:9.3f} | {:>8} | {:9.3f} | {:8.3f} | {:11.3f}".format(
+                delay, prefetch, epoch_time,
+                network.record['train_wait_time'][-1],
+                network.record['train_compute_time'][-1]))
@@ -0,0 +1,71 @@
+"""Benchmark the sparse one-hot path against the dense one.
+
+One-hot encodes a categorical column of 100k rows with 100 to 50k
+categories and converts it to a dataset, then reads one epoch of batches
+of 128. Reports the wall time and the memory of the dataset values for
+the dense create_one_hot_encoding + convert_to_tensor_datasets and for
+their sparse=True mode. The dense path is only timed up to
+LEGACY_MAX_CATEGORIES.
+
+At 50k categories the dense float tensor alone would take 20GB of memory.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+from torch.utils.data import DataLoader
+
+from vulcanai.datasets import collate_sparse
+from vulcanai.datasets.tabular_data_utils import (
+    create_one_hot_encoding, convert_to_tensor_datasets)
+
+CATEGORY_COUNTS = [100, 1000, 50000]
+LEGACY_MAX_CATEGORIES = 1000
+NUM_ROWS = 100000
+BATCH_SIZE = 128
+
+
+def encode_and_load(df, sparse):
+    """Encode, convert and read one epoch, return the data bytes."""
+    df = create_one_hot_encoding(df, 'category', sparse=sparse)
+    dataset = convert_to_tensor_datasets(df, target_vars='label',
+                                         sparse=sparse)
+    collate_fn = collate_sparse if sparse else None
+    for _ in DataLoader(dataset, batch_size=BATCH_SIZE,
+                        collate_fn=collate_fn):
+        pass
+    if sparse:
+        return (dataset.values.nbytes + dataset.col_indices.nbytes +
+                dataset.crow_indices.nbytes)
+    data = dataset.tensors[0]
+    return data.element_size() * data.nelement()
+
+
+def time_call(func, *args, **kwargs):
+    """Return the wall time in seconds and the result of a single call."""
+    start = time.perf_counter()
+    res = func(*args, **kwargs)
+    return time.perf_counter() - start, res
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+
+    print("{:>10} | {:>10} | {:>10} | {:>10} | {:>10}".format(
+        "categories", "dense (s)", "dense MB", "sparse (s)", "sparse MB"))
+    for num_categories in CATEGORY_COUNTS:
+        df = pd.DataFrame({
+            'category': rng.integers(0, num_categories, NUM_ROWS),
+            'value': rng.random(NUM_ROWS),
+            'label': rng.integers(0, 2, NUM_ROWS)
+        })
+
+        sparse_time, sparse_bytes = time_call(encode_and_load, df, True)
+        if num_categories <= LEGACY_MAX_CATEGORIES:
+            dense_time, dense_bytes = time_call(encode_and_load, df, False)
+            dense = "{:10.3f} | {:10.1f}".format(dense_time,
+                                                 dense_bytes / 2 ** 20)
+        else:
+            dense = "{:>10} | {:>10}".format("skipped", "skipped")
+        print("{:>10} | {} | {:10.3f} | {:10.1f}".format(
+            num_categories, dense, sparse_time, sparse_bytes / 2 ** 20))
@@ -10,15 +10,31 @@ Submodules
     fashion
     tabulardataset
     multidataset
+    multiinputloader
+    memmapdataset
+    sparsedataset
+    tabular_pipeline
 """
 
 from .fashion import FashionData
 from .multidataset import MultiDataset
+from .multiinputloader import MultiInputLoader
+from .memmapdataset import (MemmapDataset, MemmapDatasetWriter,
+                            write_memmap_dataset)
+from .sparsedataset import SparseTensorDataset, collate_sparse
+from .tabular_pipeline import ChunkedTabularPipeline
 
 __all__ = [
     'fashion',
     'tabular_data_utils.py',
     'utils',
     'FashionData',
-    'MultiDataset'
+    'MultiDataset',
+    'MultiInputLoader',
+    'MemmapDataset',
+    'MemmapDatasetWriter',
+    'write_memmap_dataset',
+    'SparseTensorDataset',
+    'collate_sparse',
+    'ChunkedTabularPipeline'
 ]
\ No newline at end of file
@@ -2,12 +2,14 @@
 
 from __future__ import print_function
 import torch.utils.data as data
+from torch.utils.data.dataloader import default_collate
 from PIL import Image
 import os
 import os.path
 import errno
+import gzip
+import numpy as np
 import torch
-import codecs
 import torchvision.transforms as transforms
 import urllib
 
@@ -30,6 +32,14 @@ class FashionData(data.Dataset):
         ``transforms.RandomCrop``
         target_transform (callable, optional): A function/transform that
         takes in the target and transforms it.
+        preload (bool, optional): If true, normalizes all images once when
+        the dataset is created instead of on every access. Uses 4 bytes of
+        memory per pixel.
+
+    With the default transform, images are normalized as uint8 tensors
+    without going through PIL, and indexing with a list of indices (e.g. a
+    DataLoader with a BatchSampler and batch_size=None) returns the whole
+    batch from one indexing op.
     """
     urls = [
         'http://fashion-mnist.s3-website.eu-central-1.amazonaws.com/train-images-idx3-ubyte.gz',
@@ -41,17 +51,22 @@ class FashionData(data.Dataset):
     processed_folder = 'processed'
     training_file = 'training.pt'
     test_file = 'test.pt'
+    # Mean and standard deviation of the default Normalize transform.
+    mean = 0.1307
+    std = 0.3081
 
     def __init__(self, root, train=True, transform=None, target_transform=None,
-                 download=False):
+                 download=False, preload=False):
         self.root = os.path.expanduser(root)
         self.transform = transform
         self.target_transform = target_transform
         self.train = train  # training set or test set
 
         self.transform = transforms.Compose([transforms.ToTensor(),
-                                            transforms.Normalize((0.1307,),
-                                                                 (0.3081,))])
+                                            transforms.Normalize((self.mean,),
+                                                                 (self.std,))])
+        # Replacing self.transform disables the tensor fast path.
+        self._default_transform = self.transform
 
         if download:
             self.download()
@@ -67,31 +82,96 @@ class FashionData(data.Dataset):
             self.test_data, self.test_labels = torch.load(os.path.join(
                 root, self.processed_folder, self.test_file))
 
+        self._normalized_data = None
+        if preload:
+            self._normalized_data = self._normalize(self._get_data()[0])
+
     def __getitem__(self, index):
         """
         Args:
-            index (int): Index
+            index (int, list, slice or torch.Tensor): Index, or indices of
+            a batch.
 
         Returns:
-            tuple: (image, target) where target is index of the target class.
+            tuple: (image, target) where target is index of the target class,
+            or the stacked images and targets of a batch.
         """
-        if self.train:
-            img, target = self.train_data[index], self.train_labels[index]
-        else:
-            img, target = self.test_data[index], self.test_labels[index]
+        if _is_batch_index(index):
+            return self._get_batch(index)
+
+        data, labels = self._get_data()
+        target = labels[index]
 
-        # doing this so that it is consistent with all other datasets
-        # to return a PIL Image
-        img = Image.fromarray(img.numpy(), mode='L')
+        if self.transform is self._default_transform:
+            img = self._get_normalized(index)
+        else:
+            # doing this so that it is consistent with all other datasets
+            # to return a PIL Image
+            img = Image.fromarray(data[index].numpy(), mode='L')
 
-        if self.transform is not None:
-            img = self.transform(img)
+            if self.transform is not None:
+                img = self.transform(img)
 
         if self.target_transform is not None:
             target = self.target_transform(target)
 
         return img, target
 
+    def __getitems__(self, indices):
+        """
+        Fetch the samples of a DataLoader batch with one indexing op.
+
+        Args:
+            indices (list): Indices of the batch.
+
+        Returns:
+            list: (image, target) tuples, collated by the DataLoader.
+        """
+        imgs, targets = self._get_batch(list(indices))
+        return list(zip(imgs, targets))
+
+    def _get_batch(self, index):
+        """Return the stacked images and targets of a batch index."""
+        if isinstance(index, tuple):
+            index = list(index)
+
+        if self.transform is not self._default_transform:
+            indices = range(len(self))[index] if isinstance(index, slice) \
+                else index
+            return tuple(default_collate(
+                [self[int(i)] for i in indices]))
+
+        imgs = self._get_normalized(index)
+        targets = self._get_data()[1][index]
+        if self.target_transform is not None:
+            targets = default_collate(
+                [self.target_transform(target) for target in targets])
+        return imgs, targets
+
+    def _get_data(self):
+        """Return the uint8 images and the labels of the split in use."""
+        if self.train:
+            return self.train_data, self.train_labels
+        return self.test_data, self.test_labels
+
+    def _get_normalized(self, index):
+        """Return the images at index with the default transform applied."""
+        if self._normalized_data is not None:
+            return self._normalized_data[index]
+        return self._normalize(self._get_data()[0][index])
+
+    def _normalize(self, imgs):
+        """
+        Apply ToTensor and Normalize to uint8 images of shape [..., H, W].
+
+        Same operations as the default transform, on the tensor directly.
+        Returns float images of shape [..., 1, H, W].
+        """
+        mean = torch.tensor(self.mean)
+        std = torch.tensor(self.std)
+        return imgs.unsqueeze(-3).to(dtype=torch.get_default_dtype()) \
+            .div(255).sub_(mean).div_(std)
+
     def __len__(self):
         if self.train:
             return len(self.train_data)
@@ -108,8 +188,6 @@ class FashionData(data.Dataset):
     def download(self):
         """Download the MNIST data if it doesn't exist in processed_folder
         already."""
-        import gzip
-
         if self._check_exists():
             return
 
@@ -158,40 +236,80 @@ class FashionData(data.Dataset):
 
         print('Done!')
 
-def get_int(b):
-    return int(codecs.encode(b, 'hex'), 16)
+def _is_batch_index(index):
+    """Whether index selects a batch of samples rather than one sample."""
+    if isinstance(index, (list, tuple, slice)):
+        return True
+    return isinstance(index, (np.ndarray, torch.Tensor)) and index.ndim > 0
+
+# IDX type codes, values are big endian.
+IDX_DTYPES = {
+    0x08: np.dtype('u1'),
+    0x09: np.dtype('i1'),
+    0x0B: np.dtype('>i2'),
+    0x0C: np.dtype('>i4'),
+    0x0D: np.dtype('>f4'),
+    0x0E: np.dtype('>f8'),
+}
+
+def read_idx_file(path, mmap=False):
+    """
+    Read an IDX file (the MNIST file format) into a numpy array.
+
+    The data is mapped with numpy.frombuffer, or numpy.memmap if mmap,
+    and reshaped to the dimensions of the header without copies. Multi
+    byte values are converted to native byte order, which copies.
+
+    Parameters:
+        path : str
+            Path of the IDX file, gzip compressed if it ends with .gz.
+        mmap : bool
+            Whether to memory-map the file instead of reading it. Pages are
+            copy on write, the file is never modified. Not possible for
+            compressed files.
+
+    Returns:
+        data : numpy.ndarray
+            Array with the dtype and shape given by the header.
+
+    """
+    compressed = path.endswith('.gz')
+    if mmap and compressed:
+        raise ValueError("Compressed IDX files cannot be memory-mapped.")
+
+    with (gzip.open(path, 'rb') if compressed else open(path, 'rb')) as f:
+        header = f.read(4)
+        if len(header) < 4 or header[:2] != b'\x00\x00' or \
+                header[2] not in IDX_DTYPES:
+            raise ValueError("{} is not an IDX file.".format(path))
+        dtype = IDX_DTYPES[header[2]]
+        num_dims = header[3]
+        shape = tuple(np.frombuffer(f.read(4 * num_dims), dtype='>u4',
+                                    count=num_dims).astype(int))
+        offset = 4 + 4 * num_dims
+        count = int(np.prod(shape))
+
+        if mmap:
+            data = np.memmap(path, dtype=dtype, mode='c', offset=offset,
+                             shape=shape)
+        else:
+            buffer = bytearray(count * dtype.itemsize)
+            if f.readinto(buffer) != len(buffer):
+                raise ValueError(
+                    "{} holds fewer values than its header's {} "
+                    "dimensions.".format(path, shape))
+            data = np.frombuffer(buffer, dtype=dtype).reshape(shape)
 
-def parse_byte(b):
-    if isinstance(b, str):
-        return ord(b)
-    return b
+    if not dtype.isnative:
+        data = data.astype(dtype.newbyteorder('='))
+    return data
 
 def read_label_file(path):
-    with open(path, 'rb') as f:
-        data_in = f.read()
-        assert get_int(data_in[:4]) == 2049
-        length = get_int(data_in[4:8])
-        labels = [parse_byte(b) for b in data_in[8:]]
-        assert len(labels) == length
-        return torch.LongTensor(labels)
+    data_in = read_idx_file(path)
+    assert data_in.dtype == np.uint8 and data_in.ndim == 1
+    return torch.from_numpy(data_in).long()
 
 def read_image_file(path):
-    with open(path, 'rb') as f:
-        data_in = f.read()
-        assert get_int(data_in[:4]) == 2051
-        length = get_int(data_in[4:8])
-        num_rows = get_int(data_in[8:12])
-        num_cols = get_int(data_in[12:16])
-        images = []
-        idx = 16
-        for l in range(length):
-            img = []
-            images.append(img)
-            for r in range(num_rows):
-                row = []
-                img.append(row)
-                for c in range(num_cols):
-                    row.append(parse_byte(data_in[idx]))
-                    idx += 1
-        assert len(images) == length
-        return torch.ByteTensor(images).view(-1, 28, 28)
+    data_in = read_idx_file(path)
+    assert data_in.dtype == np.uint8 and data_in.ndim == 3
+    return torch.from_numpy(data_in)
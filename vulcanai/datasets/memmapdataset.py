@@ -0,0 +1,265 @@
+# coding=utf-8
+""" Defines the MemmapDataset Class and its writer"""
+import json
+import os
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+import logging
+
+logger = logging.getLogger(__name__)
+
+DATA_FILE = 'data.bin'
+TARGET_FILE = 'target.bin'
+META_FILE = 'meta.json'
+
+
+class MemmapDatasetWriter(object):
+    """
+    Write DataFrame chunks to an on-disk MemmapDataset.
+
+    Rows are appended to raw binary files in the path directory, so the
+    whole table never has to be in memory. Values are stored with the
+    dtypes of convert_to_tensor_datasets: float32 data, and int64 targets
+    or float32 targets if continuous_target. The dataset can be read once
+    the writer is closed, which a with block exiting on an error does not
+    do, so a partly written dataset is never read.
+
+    Parameters:
+        path : str
+            Directory to write the dataset to. Created if needed.
+        target_vars : string or list of string
+            The column(s) to be used in the target tensor.
+        continuous_target : boolean default False
+            Whether the target values are continuous as opposed to categorical
+
+    """
+
+    def __init__(self, path, target_vars=None, continuous_target=False):
+        """Initialize the writer of an empty dataset."""
+        if target_vars and not isinstance(target_vars, list):
+            target_vars = [target_vars]
+        self.path = path
+        self.target_vars = target_vars or []
+        self.target_dtype = np.float32 if continuous_target else np.int64
+        self.feature_columns = None
+        self.num_rows = 0
+
+        os.makedirs(path, exist_ok=True)
+        # Drop the meta file first so a partly written dataset can't be read.
+        if os.path.exists(os.path.join(path, META_FILE)):
+            os.remove(os.path.join(path, META_FILE))
+        self._data_file = open(os.path.join(path, DATA_FILE), 'wb')
+        self._target_file = None
+        if self.target_vars:
+            self._target_file = open(os.path.join(path, TARGET_FILE), 'wb')
+
+    def write(self, df):
+        """
+        Append the rows of a DataFrame chunk.
+
+        Parameters:
+            df : Dataframe
+                The chunk to append. Its feature columns must match those of
+                the first chunk, in any order.
+
+        """
+        if self._data_file is None:
+            raise ValueError("The writer is closed.")
+        features = df.drop(self.target_vars, axis=1)
+        if self.feature_columns is None:
+            self.feature_columns = list(features.columns)
+        elif set(features.columns) != set(self.feature_columns):
+            raise ValueError(
+                "Chunk columns {} do not match the dataset columns "
+                "{}".format(list(features.columns), self.feature_columns))
+
+        np.ascontiguousarray(features[self.feature_columns],
+                             dtype=np.float32).tofile(self._data_file)
+        if self._target_file is not None:
+            np.ascontiguousarray(df[self.target_vars],
+                                 dtype=self.target_dtype).tofile(
+                                     self._target_file)
+        self.num_rows += len(df)
+
+    def close(self):
+        """Flush the rows and write the meta data of the dataset."""
+        if self._data_file is None:
+            return
+        self._close_files()
+
+        meta = {
+            'num_rows': self.num_rows,
+            'feature_columns': self.feature_columns or [],
+            'target_vars': self.target_vars,
+            'target_dtype': np.dtype(self.target_dtype).name
+        }
+        with open(os.path.join(self.path, META_FILE), 'w') as f:
+            json.dump(meta, f)
+
+    def _close_files(self):
+        """Close the data and target files."""
+        self._data_file.close()
+        self._data_file = None
+        if self._target_file is not None:
+            self._target_file.close()
+            self._target_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        elif self._data_file is not None:
+            # Without meta file the partly written dataset can't be read.
+            self._close_files()
+
+
+def write_memmap_dataset(path, chunks, target_vars=None,
+                         continuous_target=False):
+    """
+    Write DataFrame chunks to disk and return them as a MemmapDataset.
+
+    Parameters:
+        path : str
+            Directory to write the dataset to.
+        chunks : Dataframe or iterable of Dataframes
+            The rows to write, e.g. pandas.read_csv(..., chunksize=n).
+        target_vars : string or list of string
+            The column(s) to be used in the target tensor.
+        continuous_target : boolean default False
+            Whether the target values are continuous as opposed to categorical
+
+    Returns:
+        dataset : MemmapDataset
+
+    """
+    if hasattr(chunks, 'columns'):
+        chunks = [chunks]
+    with MemmapDatasetWriter(path, target_vars=target_vars,
+                             continuous_target=continuous_target) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    return MemmapDataset(path)
+
+
+class MemmapDataset(Dataset):
+    """
+    Define a dataset read from memory-mapped files written by
+    MemmapDatasetWriter.
+
+    Items are (data, target) tensors like those of the TensorDataset made by
+    convert_to_tensor_datasets, or (data,) without target_vars. Rows are
+    read from disk as they are indexed, so the dataset does not need to fit
+    in memory. Indexing with a list of indices reads a whole batch at once.
+
+    Parameters:
+        path : str
+            Directory the dataset was written to.
+
+    Returns:
+        memmap_dataset : torch.utils.data.Dataset
+
+    """
+
+    def __init__(self, path):
+        """Initialize a dataset from the files in path."""
+        self.path = path
+        meta_path = os.path.join(path, META_FILE)
+        if not os.path.isfile(meta_path):
+            raise ValueError("No closed MemmapDataset found in "
+                             "{}".format(path))
+        with open(meta_path) as f:
+            meta = json.load(f)
+        self.num_rows = meta['num_rows']
+        self.feature_columns = meta['feature_columns']
+        self.target_vars = meta['target_vars']
+        self._target_dtype = np.dtype(meta['target_dtype'])
+        self._open()
+
+    def _open(self):
+        """Map the data and target files."""
+        # Copy on write maps give writable arrays that torch can share
+        # without ever modifying the files.
+        self._data = self._map(DATA_FILE, np.float32,
+                               len(self.feature_columns))
+        self._target = None
+        if self.target_vars:
+            self._target = self._map(TARGET_FILE, self._target_dtype,
+                                     len(self.target_vars))
+
+    def _map(self, filename, dtype, num_columns):
+        """Map a file of num_rows x num_columns values."""
+        shape = (self.num_rows, num_columns)
+        if self.num_rows == 0 or num_columns == 0:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(os.path.join(self.path, filename), dtype=dtype,
+                         mode='c', shape=shape)
+
+    @property
+    def targets(self):
+        """The target tensor, backed by the target file, or None."""
+        if self._target is None:
+            return None
+        return torch.from_numpy(self._target)
+
+    def __len__(self):
+        """
+        Denotes the total number of samples.
+
+        Returns:
+            length : int
+
+        """
+        return self.num_rows
+
+    def __getitem__(self, idx):
+        """
+        Override getitem used by DataLoader required by torch Dataset.
+
+        Parameters:
+            idx : index
+                Index of sample to extract, or indices of a batch.
+
+        Returns:
+            (input_data, targets) : (torch.Tensor, torch.Tensor)
+                Tuple of input_data and target at that index, copied out of
+                the mapped files.
+
+        """
+        if isinstance(idx, torch.Tensor):
+            idx = idx.numpy()
+        elif isinstance(idx, (list, tuple)):
+            idx = np.asarray(idx)
+        items = (torch.from_numpy(np.array(self._data[idx])),)
+        if self._target is not None:
+            items += (torch.from_numpy(np.array(self._target[idx])),)
+        return items
+
+    def __getitems__(self, indices):
+        """
+        Fetch the samples of a DataLoader batch with one read per file.
+
+        Parameters:
+            indices : list
+                Indices of the batch.
+
+        Returns:
+            samples : list
+                Item tuples, collated by the DataLoader.
+
+        """
+        return list(zip(*self[list(indices)]))
+
+    def __getstate__(self):
+        """Pickle the path only, e.g. for worker processes."""
+        state = self.__dict__.copy()
+        del state['_data'], state['_target']
+        return state
+
+    def __setstate__(self, state):
+        """Map the files again after unpickling."""
+        self.__dict__.update(state)
+        self._open()
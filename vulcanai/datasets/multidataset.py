@@ -1,6 +1,7 @@
 # coding=utf-8
 """ Defines the MultiDataset Class"""
-from torch.utils.data import Dataset
+import torch
+from torch.utils.data import Dataset, TensorDataset
 import logging
 
 logger = logging.getLogger(__name__)
@@ -46,32 +47,35 @@ class MultiDataset(Dataset):
                 "You may specify at most one target."
                 " {} specified".format(total_num_targets))
 
+        # (dataset, include_data, include_target) of every child. A nested
+        # MultiDataset gives its input data, and its target if it has one.
+        self._children = []
+        for tup in self._dataset_tuples:
+            if isinstance(tup, MultiDataset):
+                self._children.append(
+                    (tup, True, _get_total_targets(tup._dataset_tuples) > 0))
+            else:
+                self._children.append((tup[0], bool(tup[1]), bool(tup[2])))
+
+        # Nested MultiDatasets have their length cached already.
+        lengths = [len(ds) for ds, _, _ in self._children]
+        self._length = min(lengths, default=0)
+        if len(set(lengths)) > 1:
+            logger.warning("Defaulting to the length of the smallest dataset")
+
     def __len__(self):
         """
         Denotes the total number of samples.
 
-        Will look for the dataset with the smallest number of samples and
-        default the length to that so as to avoid getting a sample that doesn't
-        exist in another dataset.
+        The length of the dataset with the smallest number of samples, so as
+        to avoid getting a sample that doesn't exist in another dataset. It is
+        computed once, when the MultiDataset is created.
 
         Returns:
             length : int
 
         """
-        logger.warning("Defaulting to the length of the smallest dataset")
-
-        def _get_min_length(multi_datasets):
-            min_length = float('inf')
-            for tup in multi_datasets:
-                if isinstance(tup, MultiDataset):
-                    length = _get_min_length(tup._dataset_tuples)
-                else:
-                    length = len(tup[0])
-                if length < min_length:
-                    min_length = length
-            return min_length
-
-        return _get_min_length(self._dataset_tuples)
+        return self._length
 
     def __getitem__(self, idx):
         """
@@ -90,20 +94,81 @@ class MultiDataset(Dataset):
         input_data_items = []
         target_item = None
 
-        for tup in self._dataset_tuples:
+        for ds, include_data, include_target in self._children:
+            if not (include_data or include_target):
+                continue
+            item = ds[idx]
 
-            include_data = tup[1]
-            include_target = tup[2]
+            if include_data:
+                input_data_items.append(item[0])
 
-            if isinstance(tup, MultiDataset):
-                ds = tup
-            else:
-                ds = tup[0]
+            if include_target:
+                target_item = item[1]
+
+        return input_data_items, target_item
+
+    def __getitems__(self, indices):
+        """
+        Fetch the samples of a DataLoader batch with one read per dataset.
+
+        Only the reads are batched: TensorDatasets are indexed with the
+        whole batch at once, and datasets with a __getitems__ of their own,
+        like nested MultiDatasets, fetch their part of the batch with it.
+        The batches are then split back into per sample views, which the
+        DataLoader collates, so the cost of default_collate stacking the
+        samples remains. MultiInputLoader skips the collation altogether.
+
+        Parameters:
+            indices : list
+                Indices of the batch.
+
+        Returns:
+            samples : list
+                (input_data, target) tuples as given by __getitem__,
+                collated by the DataLoader.
+
+        """
+        indices = list(indices)
+        input_data_items = []
+        target_items = [None] * len(indices)
+
+        for ds, include_data, include_target in self._children:
+            if not (include_data or include_target):
+                continue
+            items = _get_items(ds, indices)
 
             if include_data:
-                input_data_items.append(ds.__getitem__(idx)[0])
+                input_data_items.append([item[0] for item in items])
 
             if include_target:
-                target_item = ds.__getitem__(idx)[1]
+                target_items = [item[1] for item in items]
 
-        return input_data_items, target_item
+        return [([items[i] for items in input_data_items], target_item)
+                for i, target_item in enumerate(target_items)]
+
+
+def _get_items(dataset, indices):
+    """
+    Fetch the items of a batch from a child dataset of a MultiDataset.
+
+    Parameters:
+        dataset : torch.utils.data.Dataset
+            The child dataset.
+        indices : list
+            Indices of the batch.
+
+    Returns:
+        items : list
+            Item tuples of the dataset at indices.
+
+    """
+    if isinstance(dataset, TensorDataset):
+        index = torch.as_tensor(indices, dtype=torch.long)
+        return list(zip(*(tensor[index].unbind(0)
+                          for tensor in dataset.tensors)))
+    if callable(getattr(dataset, '__getitems__', None)):
+        items = dataset.__getitems__(indices)
+        # SparseTensorDataset gives a batch tuple instead of its items.
+        if isinstance(items, list):
+            return items
+    return [dataset[idx] for idx in indices]
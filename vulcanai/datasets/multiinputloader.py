@@ -0,0 +1,333 @@
+# coding=utf-8
+""" Defines the MultiInputLoader Class"""
+import queue
+import threading
+
+import numpy as np
+import torch
+from torch.utils.data import (BatchSampler, RandomSampler, SequentialSampler,
+                              Subset, TensorDataset)
+from torch.utils.data.dataloader import default_collate
+
+from .multidataset import MultiDataset, _get_items
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Put on the batch queue by the worker thread once the sampler is exhausted.
+_END = object()
+
+
+class _BatchSlot(object):
+    """Buffers a batch is gathered into, reused across iterations."""
+
+    def __init__(self, num_leaves):
+        self.host_buffers = [None] * num_leaves
+        self.device_buffers = [None] * num_leaves
+        # Recorded when the batch is released, so a cuda copy into the
+        # device buffers waits for the kernels still reading them.
+        self.release_event = None
+
+
+class MultiInputLoader(object):
+    """
+    Load batches of a MultiDataset without collation, for multi input
+    networks.
+
+    Every input and the target are gathered straight into one contiguous
+    buffer each, which is pinned when loading for a cuda device. A batch
+    from a TensorDataset is one index_select, other datasets are read with
+    their __getitems__, if any, and stacked into the buffer. The buffers are
+    reused across iterations, and with prefetch the next batches are
+    gathered, and copied to device on a separate cuda stream, on a
+    background thread while the network computes the current one.
+
+    Batches are structured like those of a DataLoader over the dataset,
+    ([input_data, ...], target) with nested lists for nested MultiDatasets,
+    so the loader can be passed to BaseNetwork.fit, forward_pass and
+    iter_forward_pass, but not to iter_forward_pass with return_indices,
+    which rebuilds a torch DataLoader. As the buffers are reused, a batch is
+    only valid until the next one is requested; clone the tensors to keep
+    them.
+
+    Parameters:
+        dataset : MultiDataset or torch.utils.data.Subset of a MultiDataset
+            The dataset to load.
+        batch_size : int
+            The number of samples per batch.
+        shuffle : boolean
+            Whether to reshuffle the samples at every iteration.
+        drop_last : boolean
+            Whether to drop the last batch if it is incomplete.
+        device : str or torch.device
+            The device to load the batches to. None leaves them on the cpu.
+        pin_memory : boolean
+            Whether to gather into pinned host buffers. Defaults to True
+            when device is a cuda device.
+        prefetch : int
+            The number of batches kept ready ahead on a background thread.
+            0 loads every batch when it is requested.
+
+    Returns:
+        multi_input_loader : MultiInputLoader
+
+    """
+
+    # Batches are overwritten once the next one is requested, so consumers
+    # holding on to batches, like BatchPrefetcher, must copy them.
+    reuses_buffers = True
+
+    def __init__(self, dataset, batch_size=1, shuffle=False, drop_last=False,
+                 device=None, pin_memory=None, prefetch=1):
+        """Initialize a loader over a MultiDataset."""
+        if not isinstance(prefetch, int) or prefetch < 0:
+            raise ValueError("prefetch must be a non-negative integer.")
+        self.dataset = dataset
+        self.batch_size = batch_size
+        self.device = torch.device(device) if device is not None else None
+        self.is_cuda = self.device is not None and \
+            self.device.type == 'cuda'
+        self.pin_memory = self.is_cuda if pin_memory is None else pin_memory
+        self.prefetch = prefetch
+        if shuffle:
+            self.sampler = RandomSampler(dataset)
+        else:
+            self.sampler = SequentialSampler(dataset)
+        self.batch_sampler = BatchSampler(self.sampler, batch_size,
+                                          drop_last)
+
+        # Subsets are resolved to indices of the MultiDataset.
+        self._indices = None
+        while isinstance(dataset, Subset):
+            indices = np.asarray(dataset.indices, dtype=np.int64)
+            if self._indices is not None:
+                indices = indices[self._indices]
+            self._indices = indices
+            dataset = dataset.dataset
+        if not isinstance(dataset, MultiDataset):
+            raise ValueError(
+                "MultiInputLoader needs a MultiDataset or a Subset of one, "
+                "got {}".format(type(dataset).__name__))
+
+        # (dataset, field) of every tensor of a batch, and where they go.
+        self._leaves = []
+        self._data_layout, self._target_leaf = self._get_layout(dataset)
+        self._stream = torch.cuda.Stream(self.device) if self.is_cuda \
+            else None
+
+    def _get_layout(self, multi_dataset):
+        """
+        Map the batch structure of a MultiDataset to leaves.
+
+        Parameters:
+            multi_dataset : MultiDataset
+
+        Returns:
+            (data_layout, target_leaf) : (list, int)
+                The input data structure, with leaf indices in place of
+                tensors, and the leaf index of the target or None.
+
+        """
+        data_layout = []
+        target_leaf = None
+        for ds, include_data, include_target in multi_dataset._children:
+            if isinstance(ds, MultiDataset):
+                nested_data_layout, nested_target_leaf = \
+                    self._get_layout(ds)
+                data_layout.append(nested_data_layout)
+                if include_target:
+                    target_leaf = nested_target_leaf
+                continue
+            if include_data:
+                data_layout.append(self._get_leaf(ds, 0))
+            if include_target:
+                target_leaf = self._get_leaf(ds, 1)
+        return data_layout, target_leaf
+
+    def _get_leaf(self, dataset, field):
+        """Return the leaf index of a dataset field, shared if repeated."""
+        for leaf_idx, (leaf_dataset, leaf_field) in enumerate(self._leaves):
+            if leaf_dataset is dataset and leaf_field == field:
+                return leaf_idx
+        self._leaves.append((dataset, field))
+        return len(self._leaves) - 1
+
+    def __len__(self):
+        """
+        Denotes the number of batches.
+
+        Returns:
+            length : int
+
+        """
+        return len(self.batch_sampler)
+
+    def __iter__(self):
+        """
+        Iterate over the batches of the dataset.
+
+        Yields:
+            (input_data, targets) : (list, torch.Tensor)
+
+        """
+        if self.prefetch == 0:
+            slot = _BatchSlot(len(self._leaves))
+            for batch_idx, indices in enumerate(self.batch_sampler):
+                # The single slot is reused, so the previous batch is
+                # released first, as on the prefetching path.
+                if batch_idx:
+                    self._release(slot)
+                yield self._load_batch(indices, slot)
+            return
+
+        # One slot being filled, prefetch ready and one being consumed.
+        free_slots = queue.Queue()
+        for _ in range(self.prefetch + 2):
+            free_slots.put(_BatchSlot(len(self._leaves)))
+        ready_batches = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        worker = threading.Thread(
+            target=self._fill, args=(free_slots, ready_batches, stop),
+            daemon=True)
+        worker.start()
+
+        slot = None
+        try:
+            while True:
+                item = ready_batches.get()
+                if slot is not None:
+                    self._release(slot)
+                    free_slots.put(slot)
+                    slot = None
+                if item is _END:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                slot, batch = item
+                yield batch
+        finally:
+            stop.set()
+            # Unblock the worker whether it waits for a slot or a place.
+            free_slots.put(None)
+            while not ready_batches.empty():
+                ready_batches.get_nowait()
+            worker.join()
+
+    def _fill(self, free_slots, ready_batches, stop):
+        """
+        Load batches into free slots until the sampler is exhausted.
+
+        Runs on the worker thread. Errors are passed on to the consumer.
+
+        Parameters:
+            free_slots : queue.Queue
+                Slots whose batch has been released.
+            ready_batches : queue.Queue
+                (slot, batch) tuples ready to be consumed.
+            stop : threading.Event
+                Set when the consumer stops iterating.
+
+        """
+        try:
+            for indices in self.batch_sampler:
+                slot = free_slots.get()
+                if stop.is_set():
+                    return
+                ready_batches.put((slot, self._load_batch(indices, slot)))
+                if stop.is_set():
+                    return
+            ready_batches.put(_END)
+        except Exception as e:
+            ready_batches.put(e)
+
+    def _release(self, slot):
+        """Mark the batch of a slot as consumed."""
+        if self.is_cuda:
+            slot.release_event = torch.cuda.Event()
+            slot.release_event.record(torch.cuda.current_stream(self.device))
+
+    def _load_batch(self, indices, slot):
+        """
+        Gather a batch into the buffers of a slot.
+
+        Parameters:
+            indices : list
+                Indices of the batch in the dataset.
+            slot : _BatchSlot
+                The slot to gather into.
+
+        Returns:
+            (input_data, targets) : (list, torch.Tensor)
+
+        """
+        if self._indices is not None:
+            indices = self._indices[indices].tolist()
+        index = torch.as_tensor(indices, dtype=torch.long)
+        batch_len = len(indices)
+
+        tensors = []
+        dataset_items = {}
+        for leaf_idx, (dataset, field) in enumerate(self._leaves):
+            out = slot.host_buffers[leaf_idx]
+            if out is not None:
+                out = out[:batch_len]
+            if isinstance(dataset, TensorDataset):
+                values = dataset.tensors[field]
+                if out is None:
+                    batch = values[index]
+                else:
+                    batch = torch.index_select(values, 0, index, out=out)
+            else:
+                # Items are read once for all fields of a dataset.
+                if id(dataset) not in dataset_items:
+                    dataset_items[id(dataset)] = _get_items(dataset, indices)
+                values = [item[field] for item in dataset_items[id(dataset)]]
+                if out is None:
+                    batch = default_collate(values)
+                elif all(isinstance(value, torch.Tensor)
+                         for value in values):
+                    batch = torch.stack(values, out=out)
+                else:
+                    batch = out.copy_(default_collate(values))
+            if out is None:
+                batch = self._set_host_buffer(slot, leaf_idx, batch)
+            tensors.append(self._to_device(slot, leaf_idx, batch))
+
+        if self.is_cuda:
+            # The copies are done once the batch is handed out, and the host
+            # buffers can be gathered into again.
+            self._stream.synchronize()
+
+        def _assemble(layout):
+            return [_assemble(leaf) if isinstance(leaf, list)
+                    else tensors[leaf] for leaf in layout]
+
+        target = None
+        if self._target_leaf is not None:
+            target = tensors[self._target_leaf]
+        return _assemble(self._data_layout), target
+
+    def _set_host_buffer(self, slot, leaf_idx, batch):
+        """Allocate the host buffer of a leaf from its first batch."""
+        num_rows = max(min(self.batch_size, len(self.sampler)), len(batch))
+        buffer = torch.empty([num_rows, *batch.shape[1:]], dtype=batch.dtype,
+                             pin_memory=self.pin_memory)
+        slot.host_buffers[leaf_idx] = buffer
+        return buffer[:len(batch)].copy_(batch)
+
+    def _to_device(self, slot, leaf_idx, batch):
+        """Copy a gathered batch to the device of the loader."""
+        if self.device is None or self.device.type == 'cpu':
+            return batch
+        if not self.is_cuda:
+            return batch.to(self.device)
+
+        with torch.cuda.stream(self._stream):
+            if slot.release_event is not None:
+                self._stream.wait_event(slot.release_event)
+                slot.release_event = None
+            if slot.device_buffers[leaf_idx] is None:
+                slot.device_buffers[leaf_idx] = torch.empty_like(
+                    slot.host_buffers[leaf_idx], device=self.device)
+            out = slot.device_buffers[leaf_idx][:len(batch)]
+            return out.copy_(batch, non_blocking=True)
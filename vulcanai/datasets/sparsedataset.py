@@ -0,0 +1,166 @@
+# coding=utf-8
+""" Defines the SparseTensorDataset Class and its collate function"""
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+from torch.utils.data.dataloader import default_collate
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SparseTensorDataset(Dataset):
+    """
+    Define a dataset of sparse rows, like a TensorDataset of sparse data.
+
+    The data is stored row compressed, so memory grows with the number of
+    non-zero values instead of rows x columns. Items are (data, *tensors)
+    with data a 1-D sparse COO tensor of the row. Indexing with a list of
+    indices gives a 2-D sparse COO batch, which nn.Linear, and so DenseNet,
+    take as input.
+
+    Use collate_sparse as the collate_fn of a DataLoader, which then
+    gathers each batch at once, or fetch whole batches with a BatchSampler
+    as sampler and batch_size=None.
+
+    Parameters:
+        data : torch.Tensor
+            [rows, features] sparse COO or CSR tensor, or a dense tensor.
+        tensors : torch.Tensor
+            Tensors indexed along with the rows of data, e.g. the targets.
+
+    Returns:
+        sparse_tensor_dataset : torch.utils.data.Dataset
+
+    """
+
+    def __init__(self, data, *tensors):
+        """Initialize a dataset from a 2-D data tensor."""
+        if data.dim() != 2:
+            raise ValueError("data must be 2-D, got shape "
+                             "{}".format(tuple(data.shape)))
+        if any(len(tensor) != len(data) for tensor in tensors):
+            raise ValueError("Size mismatch between tensors")
+        self.num_rows, self.num_features = data.shape
+        if data.layout == torch.sparse_csr:
+            self.crow_indices = data.crow_indices().numpy()
+            self.col_indices = data.col_indices().numpy()
+        else:
+            if data.layout != torch.sparse_coo:
+                data = data.to_sparse()
+            # Coalesced indices are sorted by row, then column.
+            data = data.coalesce()
+            rows, self.col_indices = data.indices().numpy()
+            self.crow_indices = np.concatenate([[0], np.cumsum(
+                np.bincount(rows, minlength=self.num_rows))])
+        self.values = data.values()
+        self.tensors = tensors
+
+    @property
+    def targets(self):
+        """The first of tensors, or None."""
+        return self.tensors[0] if self.tensors else None
+
+    def __len__(self):
+        """
+        Denotes the total number of samples.
+
+        Returns:
+            length : int
+
+        """
+        return self.num_rows
+
+    def _get_rows(self, indices):
+        """
+        Gather rows into a sparse COO batch.
+
+        Parameters:
+            indices : numpy.ndarray
+                Row indices of the batch.
+
+        Returns:
+            batch : torch.Tensor
+                [len(indices), features] coalesced sparse COO tensor.
+
+        """
+        starts = self.crow_indices[indices]
+        lengths = self.crow_indices[indices + 1] - starts
+        batch_rows = np.repeat(np.arange(len(indices)), lengths)
+        # Position of every value of the batch in col_indices and values.
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths,
+                              lengths) + np.arange(lengths.sum())
+        batch_indices = np.stack([batch_rows, self.col_indices[positions]])
+        return torch.sparse_coo_tensor(
+            torch.from_numpy(batch_indices),
+            self.values[torch.from_numpy(positions)],
+            (len(indices), self.num_features), is_coalesced=True,
+            check_invariants=False)
+
+    def __getitem__(self, idx):
+        """
+        Override getitem used by DataLoader required by torch Dataset.
+
+        Parameters:
+            idx : index
+                Index of sample to extract, or indices of a batch.
+
+        Returns:
+            (input_data, *tensors) : (torch.Tensor, torch.Tensor, ...)
+                Tuple of the sparse input_data and tensors at that index.
+
+        """
+        if isinstance(idx, torch.Tensor):
+            idx = idx.numpy()
+        elif isinstance(idx, slice):
+            idx = np.arange(self.num_rows)[idx]
+        rows = np.atleast_1d(np.asarray(idx, dtype=np.int64))
+        if ((rows < -self.num_rows) | (rows >= self.num_rows)).any():
+            raise IndexError("Index out of range for a dataset of "
+                             "{} rows".format(self.num_rows))
+        rows = np.where(rows < 0, rows + self.num_rows, rows)
+        data = self._get_rows(rows)
+        if np.ndim(idx) == 0:
+            data = data[0]
+        else:
+            idx = torch.from_numpy(rows)
+        return (data,) + tuple(tensor[idx] for tensor in self.tensors)
+
+    def __getitems__(self, indices):
+        """
+        Fetch the batch of a DataLoader with one gather.
+
+        Parameters:
+            indices : list
+                Indices of the batch.
+
+        Returns:
+            batch : tuple
+                The batch tuple of __getitem__, passed through by
+                collate_sparse.
+
+        """
+        return self[indices]
+
+
+def collate_sparse(batch):
+    """
+    Collate samples with sparse tensors, the DataLoader collate_fn for
+    SparseTensorDataset.
+
+    Parameters:
+        batch : list or tuple
+            Sample tuples from the dataset, or a batch tuple already
+            gathered by SparseTensorDataset.__getitems__.
+
+    Returns:
+        batch : list
+            Sparse fields stacked into sparse batches, the others collated
+            by default_collate.
+
+    """
+    if isinstance(batch, tuple):
+        return list(batch)
+    return [torch.stack(field) if field[0].is_sparse
+            else default_collate(field)
+            for field in map(list, zip(*batch))]
@@ -7,15 +7,20 @@ dataframes full of tabular data
 import numpy as np
 import pandas as pd
 import logging
-from itertools import groupby
-from sklearn import preprocessing
+from concurrent.futures import ThreadPoolExecutor
 import torch
 from torch.utils.data import TensorDataset
 
+from .sparsedataset import SparseTensorDataset
+
 logger = logging.getLogger(__name__)
 
+# Column dtypes identify_low_variance considers.
+LOW_VARIANCE_DTYPES = ['float64', 'int64', 'float32', 'int32']
+
 
-def convert_to_tensor_datasets(df, target_vars=None, continuous_target=False):
+def convert_to_tensor_datasets(df, target_vars=None, continuous_target=False,
+                               sparse=False):
     """
     Given a df, returns a TensorDataset, with the target variables contained
     in the second tensor being specified by the column name(s) in target_vars.
@@ -26,30 +31,86 @@ def convert_to_tensor_datasets(df, target_vars=None, continuous_target=False):
             The column(s) to be used in the target tensor.
         continuous_target: boolean default False
             Whether the target values are continuous as opposed to categorical
+        sparse: boolean default False
+            Whether to return a SparseTensorDataset, which keeps only the
+            non-zero values of the data, e.g. of sparse one-hot encodings.
 
-    Returns: TensorDataset
+    Returns: TensorDataset or SparseTensorDataset
         The resulting dataset representing the data contained in the df
 
     """
+    dataset_class = TensorDataset
+    to_tensor = _to_dense_tensor
+    if sparse:
+        dataset_class = SparseTensorDataset
+        to_tensor = _to_sparse_tensor
 
     if not target_vars:
-        return TensorDataset(torch.Tensor(np.array(df)))
+        return dataset_class(to_tensor(df))
 
     if target_vars and not isinstance(target_vars, list):
         target_vars = [target_vars]
 
-    data = torch.Tensor(np.array(df.drop(target_vars, axis=1)))
+    data = to_tensor(df.drop(target_vars, axis=1))
 
     if continuous_target:
         target = torch.FloatTensor(np.array(df[target_vars]))
     else:
         target = torch.LongTensor(np.array(df[target_vars]))
 
-    dataset = TensorDataset(data, target)
+    dataset = dataset_class(data, target)
 
     return dataset
 
 
+def _to_dense_tensor(df):
+    """Return the values of df as a float tensor."""
+    return torch.Tensor(np.array(df))
+
+
+def _to_sparse_tensor(df):
+    """
+    Return the values of df as a sparse COO float tensor.
+
+    Sparse columns with a fill value of 0, like those of
+    create_one_hot_encoding with sparse=True, are used without being
+    densified.
+
+    Parameters:
+        df: Dataframe
+            The dataframe to be converted
+
+    Returns:
+        data: torch.Tensor
+            [rows, columns] coalesced sparse COO tensor.
+
+    """
+    rows = [np.empty(0, dtype=np.int64)]
+    cols = [np.empty(0, dtype=np.int64)]
+    values = [np.empty(0, dtype=np.float32)]
+    for col_idx, (_, series) in enumerate(df.items()):
+        if isinstance(series.dtype, pd.SparseDtype) and \
+                series.dtype.fill_value == 0:
+            col_rows = series.array.sp_index.to_int_index().indices
+            col_values = series.array.sp_values
+        else:
+            col_values = series.to_numpy()
+            col_rows = np.flatnonzero(col_values)
+            col_values = col_values[col_rows]
+        rows.append(col_rows)
+        cols.append(np.full(len(col_rows), col_idx, dtype=np.int64))
+        values.append(col_values.astype(np.float32))
+
+    rows = np.concatenate(rows)
+    # A stable sort by row keeps the columns of each row in order.
+    order = np.argsort(rows, kind='stable')
+    indices = np.stack([rows[order], np.concatenate(cols)[order]])
+    values = np.concatenate(values)[order]
+    return torch.sparse_coo_tensor(torch.from_numpy(indices),
+                                   torch.from_numpy(values), df.shape,
+                                   is_coalesced=True, check_invariants=False)
+
+
 # TODO: use kwargs
 def create_label_encoding(df, column_name, ordered_values):
     """
@@ -91,7 +152,7 @@ def create_label_encoding(df, column_name, ordered_values):
     return df
 
 
-def create_one_hot_encoding(df, column_name, prefix_sep="@"):
+def create_one_hot_encoding(df, column_name, prefix_sep="@", sparse=False):
     """
     Create one-hot encoding for the given column.
     Parameters:
@@ -99,6 +160,11 @@ def create_one_hot_encoding(df, column_name, prefix_sep="@"):
             The name of the column you want to one-hot encode
         prefix_sep: String default("@")
             The prefix used when creating a one-hot encoding
+        sparse: boolean default False
+            Whether the one-hot columns are sparse columns, which only store
+            the rows of their category. Use with
+            convert_to_tensor_datasets(sparse=True) for high cardinality
+            columns.
 
     Returns:
         df: Dataframe
@@ -106,7 +172,7 @@ def create_one_hot_encoding(df, column_name, prefix_sep="@"):
     """
     # TODO: ensure dummy_na =False is what you want
     df = pd.get_dummies(df, columns=[column_name],
-                             prefix_sep=prefix_sep)
+                        prefix_sep=prefix_sep, sparse=sparse)
     logger.info("Successfully encoded %s", column_name)
 
     return df
@@ -119,6 +185,9 @@ def reverse_create_one_hot_encoding(df, prefix_sep, column_name=None):
     provided, only that column will be reverse-encoded, otherwise all will
     be reverse-encoded.
 
+    Each row gets the category of its max value within the group of dummy
+    columns, which makes it work for scores as well as for 0/1 encodings.
+
     Parameters:
         df: Dataframe
             The dataframe to be manipulated
@@ -144,19 +213,32 @@ def reverse_create_one_hot_encoding(df, prefix_sep, column_name=None):
         non_dummy_cols = [col for col in df.columns
                           if prefix_sep not in col]
 
-    # Find dummy columns and build pairs (category, category_value)
-    dummy_tuples = [(col.split(prefix_sep)[0], col) for col in
-                    considered_column_list if prefix_sep in col]
-
-    for dummy, cols in groupby(dummy_tuples, lambda item: item[0]):
-        dummy_df = df[[col[1] for col in cols]]
-
-        # Find max value among columns
-        max_columns = dummy_df.idxmax(axis=1)
-
-        # Remove category_ prefix
-        result_series[dummy] = max_columns.apply(lambda item:
-                                                 item.split(prefix_sep)[1])
+    # Group the dummy columns by prefix, in order of first appearance even
+    # if the columns of a group are not next to each other.
+    dummy_groups = {}
+    for col in considered_column_list:
+        if prefix_sep in col:
+            dummy, _, category = col.partition(prefix_sep)
+            dummy_groups.setdefault(dummy, []).append((col, category))
+
+    for dummy, dummy_tuples in dummy_groups.items():
+        cols, categories = zip(*dummy_tuples)
+        # Densified one group at a time, also for sparse columns.
+        values = df[list(cols)].to_numpy(dtype=np.float64)
+        missing = np.isnan(values)
+        has_missing = missing.any()
+        if has_missing:
+            # Skip NaN values like idxmax.
+            values[missing] = -np.inf
+
+        # Index a category array with the first column of the max value,
+        # -1 for rows of only NaN.
+        codes = values.argmax(axis=1)
+        if has_missing:
+            codes[missing.all(axis=1)] = -1
+        category_array = np.array(categories + (np.nan,), dtype=object)
+        result_series[dummy] = pd.Series(category_array[codes],
+                                         index=df.index)
 
     # Copy non-dummy columns over.
     for col in non_dummy_cols:
@@ -170,7 +252,119 @@ def reverse_create_one_hot_encoding(df, prefix_sep, column_name=None):
     return df
 
 
-def identify_null(df, threshold):
+def profile_columns(df, max_unique=None):
+    """
+    Profile every column of a dataframe, as used by the identify_ functions.
+
+    Null counts and the min max scaled variances are computed for all
+    columns at once, the number of unique values and the majority
+    proportion from one value_counts per column. Mixed types are only
+    looked for in object columns.
+
+    Parameters:
+        df: Dataframe
+            The dataframe to be profiled
+        max_unique: int or None
+            If given, stop counting the unique values of a column once
+            max_unique are found. num_unique is then max_unique and
+            majority_proportion is not computed for that column.
+
+    Returns:
+        profile: Dataframe
+            Indexed by column name, with the columns
+            dtype: the column dtype.
+            num_null: the number of null values.
+            num_unique: the number of unique values, null counting as one
+                value like in pandas.unique.
+            mixed_types: whether the values are of several python types.
+            majority_proportion: the proportion of the most frequent value
+                among the non-null values, NaN for empty columns.
+            scaled_variance: the variance of the non-null values after min
+                max scaling to [0, 1], NaN for non-numeric columns.
+
+    """
+    num_null = df.isnull().sum()
+
+    records = []
+    for col in df.columns:
+        series = df[col]
+        mixed_types = series.dtype == object and \
+            pd.api.types.infer_dtype(series, skipna=False).startswith('mixed')
+
+        majority_proportion = np.nan
+        if max_unique is not None:
+            num_unique = _count_unique(series, max_unique)
+        if max_unique is None or num_unique < max_unique:
+            value_counts = series.value_counts(dropna=False, sort=False)
+            num_unique = len(value_counts)
+            non_null_counts = value_counts[value_counts.index.notnull()]
+            if len(non_null_counts):
+                majority_proportion = \
+                    non_null_counts.max() / non_null_counts.sum()
+        records.append((series.dtype, num_null[col], num_unique,
+                        mixed_types, majority_proportion))
+
+    profile = pd.DataFrame.from_records(
+        records, index=df.columns,
+        columns=['dtype', 'num_null', 'num_unique', 'mixed_types',
+                 'majority_proportion'])
+    profile['scaled_variance'] = _get_scaled_variances(df)
+    return profile
+
+
+def _get_scaled_variances(df):
+    """
+    Return the variance of each column after min max scaling to [0, 1].
+
+    Computed for all numeric columns at once, NaN for the other columns.
+
+    Parameters:
+        df: Dataframe
+
+    Returns:
+        scaled_variance: pandas.Series
+
+    """
+    scaled_variance = pd.Series(np.nan, index=df.columns)
+    numeric_columns = [col for col in df.columns
+                       if df[col].dtype in LOW_VARIANCE_DTYPES]
+    if numeric_columns:
+        numeric_df = df[numeric_columns].astype(float)
+        value_range = numeric_df.max() - numeric_df.min()
+        column_variance = numeric_df.var(ddof=0) / value_range ** 2
+        # Constant columns scale to all zeros.
+        column_variance[value_range == 0] = 0.
+        scaled_variance[numeric_columns] = column_variance
+    return scaled_variance
+
+
+def _count_unique(series, max_unique, block_size=65536):
+    """
+    Count the unique values of a series, stopping at max_unique.
+
+    Parameters:
+        series: pandas.Series
+        max_unique: int
+            The count at which to stop.
+        block_size: int
+            The number of values added at a time.
+
+    Returns:
+        num_unique: int
+            The number of unique values, null counting as one value, or
+            max_unique if there are at least as many.
+
+    """
+    uniques = series.iloc[:0].unique()
+    for start in range(0, len(series), block_size):
+        uniques = pd.unique(np.concatenate([
+            uniques, series.iloc[start:start + block_size].unique()]))
+        if len(uniques) >= max_unique:
+            return max_unique
+    return len(uniques)
+
+
+def identify_null(df, threshold, profile=None):
     """
     Return columns where there is at least threshold percent of
     null values.
@@ -181,6 +375,8 @@ def identify_null(df, threshold):
         threshold: Float
             A number between 0 and 1, representing proportion of null
             values.
+        profile: Dataframe
+            Optional profile_columns result of df to reuse.
 
     Returns:
         cols: List
@@ -191,14 +387,14 @@ def identify_null(df, threshold):
         raise ValueError(
             "Threshold needs to be a proportion between 0 and 1 \
             (exclusive)")
+    num_null = df.isnull().sum() if profile is None else profile['num_null']
     num_threshold = ((1 - threshold) * len(df))
-    # thresh is "Require that many non-NA values."
-    tmp = df.dropna(thresh=num_threshold, axis=1)
-    cols = list(set(df.columns).difference(set(tmp.columns)))
-    return cols
+    # Same as dropna(thresh=num_threshold), which requires that many
+    # non-NA values.
+    return list(num_null.index[len(df) - num_null < num_threshold])
 
 
-def identify_unique(df, threshold):
+def identify_unique(df, threshold, profile=None):
     """
     Returns columns that do not have have at least threshold number of
     values. If a column has 9 values and the threshold is 9, that column
@@ -210,28 +406,28 @@ def identify_unique(df, threshold):
         threshold: The minimum number of values needed.
             Must be greater than 1. Not between 0 and 1, but rather
             represents the number of values
+        profile: Dataframe
+            Optional profile_columns result of df to reuse. Must not be
+            capped below threshold unique values.
 
     Returns:
         column_list: list
             The list of columns having threshold number of values
 
     """
-    obj_types = {col: set(map(type, df[col])) for col in
-                 df.columns}
+    if profile is None:
+        profile = profile_columns(df, max_unique=threshold)
 
-    column_list = []
-    for col in df.columns:
-        if len(obj_types[col]) > 1:
-            logger.warning("Column: {} has mixed datatypes, this may"
-                           "interfere with an accurate identification"
-                           "of mixed values: i.e. you may have 1 and '1'"
-                           .format(col))
-        if len(df[col].unique()) < threshold:
-            column_list.append(col)
-    return column_list
+    for col in profile.index[profile['mixed_types'].astype(bool)]:
+        logger.warning("Column: {} has mixed datatypes, this may"
+                       "interfere with an accurate identification"
+                       "of mixed values: i.e. you may have 1 and '1'"
+                       .format(col))
+    return list(profile.index[profile['num_unique'] < threshold])
 
 
-def identify_unbalanced_columns(df, threshold, non_numeric=True):
+def identify_unbalanced_columns(df, threshold, non_numeric=True,
+                                profile=None):
     """
     This returns columns that are highly unbalanced.
     Those that have a disproportionate amount of one value.
@@ -245,55 +441,130 @@ def identify_unbalanced_columns(df, threshold, non_numeric=True):
             (less imbalanced)
         non_numeric: Boolean
             Whether non-numeric columns are also considered.
+        profile: Dataframe
+            Optional uncapped profile_columns result of df to reuse.
 
     Returns:
         column_list: List
             The list of column names
 
     """
+    if profile is None:
+        profile = profile_columns(df)
     if non_numeric:
         columns = list(df.columns)
     else:
         columns = list(df.select_dtypes(include=np.number))
-    column_list = []
-    for col in columns:
-        # Check amount of null values, because if column is entirely null,
-        # max won't work.
-        num_of_null = df[col].isnull().sum()
-        if num_of_null != len(df):
-            col_maj = (max(df[col].value_counts()) /
-                       df[col].value_counts().sum())
-            if col_maj >= threshold:
-                column_list.append(col)
-    return column_list
+    # Entirely null columns have no majority value and are never reported.
+    majority_proportion = profile.loc[columns, 'majority_proportion']
+    return list(majority_proportion.index[majority_proportion >= threshold])
 
 
-def identify_highly_correlated(df, threshold):
+def identify_highly_correlated(df, threshold, block_size=1024):
     """
     Identify columns that are highly correlated with one-another.
 
+    Computes the pearson correlation of the numeric columns like df.corr,
+    but one block_size x block_size tile at a time, keeping only the
+    pairs above threshold. Memory for the correlations is bounded by the
+    tile size.
+
     Parameters:
         df: Dataframe
             The dataframe to be manipulated
         threshold: Between 0 (weakest correlation) and 1
             (strongest correlation).
             Minimum amount of correlation necessary to be identified.
+        block_size: int
+            The number of columns per tile.
 
     Returns:
-        column list: List of tuples
-            The correlation values above threshold
+        column list: Set of tuples
+            ((column, other_column), absolute correlation) for each pair of
+            distinct columns above threshold, once per pair with the columns
+            in dataframe order.
 
     """
+    numeric_df = df.select_dtypes(include=[np.number, bool])
+    columns = numeric_df.columns
+    values = numeric_df.to_numpy(dtype=np.float64)
     column_list = set()
-    features_correlation = df.corr().abs()
-    corr_pairs = features_correlation.unstack()
-    for index, val in corr_pairs.items():
-        if val > threshold and (index[0] != index[1]):
-            column_list.add((index, val))
+    for idx_a, idx_b, val in _get_correlated_pairs(values, threshold,
+                                                   block_size):
+        column_list.add(((columns[idx_a], columns[idx_b]), val))
     return column_list
 
 
-def identify_low_variance(df, threshold):
+def _get_correlated_pairs(values, threshold, block_size=1024):
+    """
+    Yield the column pairs whose absolute pearson correlation exceeds
+    threshold.
+
+    Every block of columns is standardized once, before the tiles are
+    computed, which takes a standardized copy of values. Without missing
+    values a tile is a single matrix product. With missing values, masked
+    products give the pairwise complete correlations of df.corr.
+
+    Parameters:
+        values: numpy.ndarray
+            [rows, columns] float values, NaN for missing values.
+        threshold: float
+            Minimum absolute correlation of the yielded pairs.
+        block_size: int
+            The number of columns per tile.
+
+    Yields:
+        (idx_a, idx_b, correlation): (int, int, float)
+            Column indices with idx_a < idx_b and the absolute correlation.
+
+    """
+    mask = ~np.isnan(values)
+    has_missing = not mask.all()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.nanmean(values, axis=0)
+        std = np.nanstd(values, axis=0)
+    std[std == 0] = np.nan
+
+    def standardize(start):
+        """Standardized columns of a tile, 0 for missing values."""
+        block = (values[:, start:start + block_size] -
+                 mean[start:start + block_size]) / \
+            std[start:start + block_size]
+        return np.nan_to_num(block, nan=0.)
+
+    num_rows, num_cols = values.shape
+    starts = range(0, num_cols, block_size)
+    z_blocks = [standardize(start) for start in starts]
+    for idx_a, start_a in enumerate(starts):
+        z_a = z_blocks[idx_a]
+        mask_a = mask[:, start_a:start_a + block_size].astype(np.float64)
+        for idx_b, start_b in enumerate(starts[idx_a:], idx_a):
+            z_b = z_blocks[idx_b]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                if has_missing:
+                    mask_b = mask[:, start_b:start_b + block_size].astype(
+                        np.float64)
+                    count = mask_a.T @ mask_b
+                    sum_a = z_a.T @ mask_b
+                    sum_b = mask_a.T @ z_b
+                    cov = z_a.T @ z_b - sum_a * sum_b / count
+                    var_a = (z_a ** 2).T @ mask_b - sum_a ** 2 / count
+                    var_b = mask_a.T @ z_b ** 2 - sum_b ** 2 / count
+                    corr = cov / np.sqrt(var_a * var_b)
+                else:
+                    corr = z_a.T @ z_b / num_rows
+            # Constant columns have no correlation, like df.corr.
+            corr = np.abs(corr)
+            corr[np.isnan(std[start_a:start_a + block_size])] = np.nan
+            corr[:, np.isnan(std[start_b:start_b + block_size])] = np.nan
+            if start_a == start_b:
+                # Each pair once, without the diagonal.
+                corr = np.triu(corr, k=1)
+            for row, col in zip(*np.nonzero(corr > threshold)):
+                yield start_a + row, start_b + col, float(corr[row, col])
+
+
+def identify_low_variance(df, threshold, profile=None):
     """
     Identify those columns that have low variance
 
@@ -304,28 +575,24 @@ def identify_low_variance(df, threshold):
             Between 0 an 1.
             Maximum amount of variance necessary to be identified as low
             variance.
+        profile: Dataframe
+            Optional profile_columns result of df to reuse.
 
     Returns:
         variance_dict: Dict
             A dictionary of column names, with the value being their
-            variance.
+            variance, that of the min max scaled values.
 
     """
-    dct_low_var = {}
-    scaler = preprocessing.MinMaxScaler()
-    for col in df.columns:
-        if df[col].dtype in ['float64', 'int64', 'float32', 'int32']:
-            col_float_array = df[col].dropna().values.astype(float)
-            reshaped_col_float_array = col_float_array.reshape(-1, 1)
-            scaled_col = scaler.fit_transform(reshaped_col_float_array)
-            col_var = scaled_col.var()
-            if col_var <= threshold:
-                dct_low_var[col] = col_var
-    return dct_low_var
+    if profile is None:
+        scaled_variance = _get_scaled_variances(df)
+    else:
+        scaled_variance = profile['scaled_variance']
+    return scaled_variance[scaled_variance <= threshold].to_dict()
 
 
 def convert_all_categorical_binary(df, list_only=False,
-                                   exception_columns=None):
+                                   exception_columns=None, n_workers=1):
     """Recodes all columns with only two values as ones and zeros, float
     valued.
 
@@ -339,37 +606,132 @@ def convert_all_categorical_binary(df, list_only=False,
         list_only: boolean
             only return a list of columns for which this would
             apply, do not actually do the transformation.
-            If false operation is performed in place.
         exception_columns: list
             list of column names you do not wish to convert.
+        n_workers: int
+            The number of threads finding and recoding the binary columns,
+            each on a chunk of the columns. Useful for very wide frames.
 
     Returns:
         list or df
-        list if list_only if true, nothing otherwise.
+        list if list_only if true, otherwise a copy of df with the binary
+        columns recoded, or df itself if there are none.
     """
 
     # recoding binary valued columns as ones and zeros
-
-    binary_cols = [(col, df[col].value_counts().index) for col
-                   in df.columns if
-                   len(df[col].value_counts()) == 2]
+    exception_columns = exception_columns or []
+    columns = [(col, series) for col, series in df.items()
+               if list_only or col not in exception_columns]
+
+    def recode_chunk(chunk):
+        """Find and recode the binary columns of a chunk of columns."""
+        return [(col, _get_binary_recoding(series))
+                for col, series in chunk]
+
+    if n_workers > 1 and len(columns) > 1:
+        chunk_size = -(-len(columns) // n_workers)
+        with ThreadPoolExecutor(max_workers=n_workers) as pool:
+            recodings = [recoding for chunk_recodings in pool.map(
+                recode_chunk, [columns[start:start + chunk_size] for start
+                               in range(0, len(columns), chunk_size)])
+                         for recoding in chunk_recodings]
+    else:
+        recodings = recode_chunk(columns)
+    recodings = [(col, recoding) for col, recoding in recodings
+                 if recoding is not None]
 
     if list_only:
-        return binary_cols
-
-    for col, index in binary_cols:
-        if col in exception_columns:
-            continue
-        di = {index[0]: 1.0, index[1]: 0.0}
-        try:
-            df = df.replace({col: di})
-        except (AssertionError, TypeError, ValueError) as e:
-            logging.info("Could not convert column {} due to error {}"
-                         .format(col, e))
-            continue
-        df[col] = df[col].astype(np.float64)
+        return [(col, index) for col, (index, _) in recodings]
 
-    return df
+    return _replace_columns(df, {col: values
+                                 for col, (_, values) in recodings})
+
+
+def _get_binary_recoding(series, block_size=65536):
+    """
+    Recode a column with only two non-null values as ones and zeros.
+
+    The distinct values are found with one factorization, after the
+    first rows rule out most columns with more values.
+
+    Parameters:
+        series: pandas.Series
+            The column.
+        block_size: int
+            The number of first rows checked before factorizing.
+
+    Returns:
+        (index, values): (pandas.Index, numpy.ndarray) or None
+            The two values, most frequent first like value_counts, and the
+            column with the first as 1.0, the second as 0.0 and nulls as
+            NaN. None if the column is not binary.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # value_counts counts every category, even unused ones.
+        codes = series.cat.codes.to_numpy()
+        uniques = pd.CategoricalIndex(series.cat.categories,
+                                      dtype=series.dtype)
+    elif series.iloc[:block_size].nunique() > 2:
+        # Rule out most other columns from their first rows.
+        return None
+    else:
+        codes, uniques = pd.factorize(series)
+    if len(uniques) != 2:
+        return None
+
+    counts = np.bincount(codes[codes >= 0], minlength=2)
+    order = np.argsort(-counts, kind='stable')
+    # Code -1 of null values picks the last entry.
+    lookup = np.full(3, np.nan)
+    lookup[order] = [1.0, 0.0]
+    return pd.Index(uniques).take(order), lookup[codes]
+
+
+def _get_binary_values(series, index):
+    """
+    Recode the two values of a column as 1.0 (index[0]) and 0.0 (index[1]).
+
+    Parameters:
+        series: pandas.Series
+            The binary column.
+        index: list
+            Its two values, most frequent first.
+
+    Returns:
+        values: numpy.ndarray
+            The recoded column, NaN for any other value.
+    """
+    values = np.full(len(series), np.nan)
+    values[(series == index[0]).to_numpy()] = 1.0
+    values[(series == index[1]).to_numpy()] = 0.0
+    return values
+
+
+def _replace_columns(df, new_columns):
+    """
+    Replace columns of df by new values with a single copy of df.
+
+    Assigning the columns one at a time would split, and copy, the blocks
+    of df once per column.
+
+    Parameters:
+        df: Dataframe
+            The dataframe to be manipulated
+        new_columns: dict
+            The new values of each replaced column.
+
+    Returns:
+        df: Dataframe
+            A new dataframe, or df itself if new_columns is empty.
+    """
+    if not new_columns:
+        return df
+    result = pd.concat([
+        pd.Series(new_columns[col], index=df.index, name=col)
+        if col in new_columns else series
+        for col, series in df.items()], axis=1)
+    result.columns = df.columns
+    return result
 
 
 def stitch_datasets(df_main=None, merge_on_columns=None,
@@ -377,6 +739,11 @@ def stitch_datasets(df_main=None, merge_on_columns=None,
     """
     Function to produce a single dataset from multiple.
 
+    With merge_on_columns, the rows of each key are collapsed into one row
+    holding the first non-null value of every column, in the order of the
+    frames. The frames are collapsed one at a time, so they are never all
+    concatenated.
+
     Parameters:
         df_main: dataframe
             optional primary dataframe to merge onto
@@ -411,34 +778,40 @@ def stitch_datasets(df_main=None, merge_on_columns=None,
      df1=df_test_one, df2=df_test_two)
 
     """
-    # Get name of a dataframe to extract
+    frames = list(dataset_dict.items())
     if df_main is not None:
-        merged_df = copy.deepcopy(df_main)
+        frames.insert(0, ('df_main', df_main.copy()))
+    else:
+        first_key, first_df = frames[0]
+        frames[0] = (first_key,
+                     first_df.apply(pd.to_numeric, errors='ignore'))
+
+    if merge_on_columns is None:
+        merged_df = frames[0][1]
+        for key, df_two in frames[1:]:
+            logger.info('Combining: {}'.format(key))
+            merged_df = pd.concat([merged_df, df_two], sort=False)
     else:
-        first_column = list(dataset_dict)[0]
-        merged_df = dataset_dict.pop(first_column)
-        merged_df = merged_df.apply(pd.to_numeric, errors='ignore')
-
-    for key in list(dataset_dict):
-        logger.info('Combining: {}'.format(key))
-        df_two = dataset_dict.pop(key)
-        merged_df = pd.concat([merged_df, df_two], sort=False)
-
-    if merge_on_columns is not None:
-        # Group by keys, forward fill and backward fill missing data
-        # then remove duplicate keys
-        merged_df = merged_df.apply(pd.to_numeric, errors='ignore')
-        df_group_on = merged_df.reset_index(drop=True).\
-            groupby(merge_on_columns).apply(lambda x: x.bfill().ffill())
+        # Collapse the frames into the first non-null value of every column
+        # for every key, one frame at a time, which is what forward and
+        # backward filling each group then keeping its first row gives.
+        numeric_columns = _get_numeric_columns(
+            [frame for _, frame in frames])
+        merged_df = None
+        num_rows = 0
+        for key, frame in frames:
+            if merged_df is not None:
+                logger.info('Combining: {}'.format(key))
+            # Rows keep their position in the concatenated frames.
+            frame = _to_numeric_columns(frame, numeric_columns).set_axis(
+                pd.RangeIndex(num_rows, num_rows + len(frame)), axis=0)
+            num_rows += len(frame)
+            if merged_df is not None:
+                frame = pd.concat([merged_df, frame], sort=False)
+            merged_df = _collapse_on_columns(frame, merge_on_columns)
         logger.info("\tDropping duplicates")
-
-        # Drop rows where there are duplicates for the merged_on_columns.
-        # We first need to dropna based on merged since drop_duplicates
-        # ignores null/na values.
-        df_group_on = df_group_on.dropna(subset=merge_on_columns, how='all')
-        df_group_on = df_group_on.drop_duplicates(subset=merge_on_columns,
-                                                  keep='first', inplace=False)
-        merged_df = df_group_on
+        # Concatenating frames without a column can change its dtype.
+        merged_df = _to_numeric_columns(merged_df, numeric_columns)
 
     if index_list is not None:
         merged_df = merged_df.set_index(index_list, inplace=False)
@@ -446,4 +819,79 @@ def stitch_datasets(df_main=None, merge_on_columns=None,
     logger.info("\nMerge Total columns = {totalCols}, rows = {totalRows} "
                 .format(totalCols=len(list(merged_df)),
                         totalRows=len(merged_df)))
-    return merged_df
\ No newline at end of file
+    return merged_df
+
+
+def _get_numeric_columns(frames):
+    """
+    Find the columns pd.to_numeric converts over the concatenated frames.
+
+    Parameters:
+        frames: list of Dataframe
+            The frames to be concatenated
+
+    Returns:
+        numeric_columns: list
+            The columns that are numeric or convert in every frame.
+
+    """
+    numeric_columns = {}
+    for frame in frames:
+        for col, series in frame.items():
+            if not numeric_columns.get(col, True):
+                continue
+            numeric_columns[col] = True
+            if not pd.api.types.is_numeric_dtype(series.dtype):
+                try:
+                    pd.to_numeric(series)
+                except (ValueError, TypeError):
+                    numeric_columns[col] = False
+    return [col for col, numeric in numeric_columns.items() if numeric]
+
+
+def _to_numeric_columns(df, columns):
+    """
+    Convert the given columns of df with pd.to_numeric.
+
+    Parameters:
+        df: Dataframe
+            The dataframe to be converted
+        columns: list
+            The columns to convert, if present in df.
+
+    Returns:
+        df: Dataframe
+            A shallow copy of df with the columns converted.
+
+    """
+    df = df.copy(deep=False)
+    for col in columns:
+        if col in df and not pd.api.types.is_numeric_dtype(df[col].dtype):
+            df[col] = pd.to_numeric(df[col])
+    return df
+
+
+def _collapse_on_columns(df, merge_on_columns):
+    """
+    Collapse the rows of each key into one row of first non-null values.
+
+    Rows with a null key are dropped. Each collapsed row keeps the index of
+    the first row of its key.
+
+    Parameters:
+        df: Dataframe
+            The dataframe to be collapsed
+        merge_on_columns: list of strings
+            The key columns.
+
+    Returns:
+        df: Dataframe
+
+    """
+    grouped = df.groupby(merge_on_columns, sort=False)
+    # Groups are numbered in order of appearance, -1 for null keys.
+    group_codes, first_rows = np.unique(grouped.ngroup().to_numpy(),
+                                        return_index=True)
+    keys = df[merge_on_columns].iloc[first_rows[group_codes >= 0]]
+    collapsed = grouped.first().set_axis(keys.index, axis=0)
+    return pd.concat([keys, collapsed], axis=1)[df.columns]
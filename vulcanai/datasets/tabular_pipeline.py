@@ -0,0 +1,495 @@
+# -*- coding: utf-8 -*-
+"""
+This file defines a chunked, out-of-core version of the preprocessing
+functions of tabular_data_utils, for tabular sources too large to load as
+one dataframe.
+"""
+import logging
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .tabular_data_utils import (_get_binary_values, _replace_columns,
+                                 LOW_VARIANCE_DTYPES)
+from .memmapdataset import write_memmap_dataset
+
+logger = logging.getLogger(__name__)
+
+
+def read_chunks(source, chunksize=100000, **read_kwargs):
+    """
+    Yield the rows of a tabular source as dataframe chunks.
+
+    Parameters:
+        source: str, Dataframe or callable
+            Path of a CSV file or of a Parquet file (.parquet, .parq, needs
+            pyarrow), a dataframe, or a callable returning an iterable of
+            dataframes.
+        chunksize: int
+            The number of rows per chunk. Ignored for callables.
+        read_kwargs: dict of keyworded parameters
+            Passed to pandas.read_csv or pyarrow.parquet.ParquetFile.
+
+    Yields:
+        chunk: Dataframe
+
+    """
+    if callable(source):
+        for chunk in source():
+            yield chunk
+    elif isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            yield source.iloc[start:start + chunksize]
+    elif str(source).endswith(('.parquet', '.parq')):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading Parquet files requires pyarrow.")
+        parquet_file = pq.ParquetFile(source, **read_kwargs)
+        for batch in parquet_file.iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        for chunk in pd.read_csv(source, chunksize=chunksize, **read_kwargs):
+            yield chunk
+
+
+class ColumnStatistics(object):
+    """
+    Statistics of one column, accumulated chunk by chunk.
+
+    Counts values exactly unless max_distinct is set: past max_distinct
+    distinct non-null values, new values are only counted in
+    untracked_count. No uncounted value occurs more often than
+    untracked_bound, the sum of the largest uncounted count of each chunk.
+
+    Parameters:
+        max_distinct: int or None
+            The maximum number of distinct values counted per column.
+
+    """
+
+    def __init__(self, max_distinct=None):
+        """Initialize the statistics of an empty column."""
+        self.max_distinct = max_distinct
+        self.num_rows = 0
+        self.null_count = 0
+        # Values in order of first appearance, as pandas.value_counts.
+        self.value_counts = OrderedDict()
+        self.untracked_count = 0
+        self.untracked_bound = 0
+        self.dtypes = []
+        # Moments of the non-null values of numeric chunks.
+        self.count = 0
+        self.mean = 0.
+        self.m2 = 0.
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, series):
+        """
+        Add the values of a chunk of the column.
+
+        Parameters:
+            series: pandas.Series
+
+        """
+        self.num_rows += len(series)
+        self.null_count += int(series.isnull().sum())
+        if series.dtype not in self.dtypes:
+            self.dtypes.append(series.dtype)
+
+        value_counts = self.value_counts
+        max_untracked = 0
+        for value, count in series.value_counts(sort=False).items():
+            if value in value_counts:
+                value_counts[value] += int(count)
+            elif self.max_distinct is None or \
+                    len(value_counts) < self.max_distinct:
+                value_counts[value] = int(count)
+            else:
+                self.untracked_count += int(count)
+                max_untracked = max(max_untracked, int(count))
+        self.untracked_bound += max_untracked
+
+        if pd.api.types.is_numeric_dtype(series) and \
+                not pd.api.types.is_bool_dtype(series):
+            values = series.dropna().to_numpy(dtype=np.float64)
+            if len(values):
+                self._update_moments(values)
+
+    def _update_moments(self, values):
+        """Merge the moments of values into the column moments."""
+        count = len(values)
+        mean = values.mean()
+        m2 = ((values - mean) ** 2).sum()
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.count = total
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+    @property
+    def overflowed(self):
+        """Whether some values were not counted due to max_distinct."""
+        return self.untracked_count > 0
+
+    @property
+    def non_null_count(self):
+        """The number of non-null values."""
+        return self.num_rows - self.null_count
+
+    @property
+    def num_distinct(self):
+        """
+        The number of distinct values, null counting as one value like in
+        pandas.unique. A lower bound if overflowed.
+        """
+        return len(self.value_counts) + int(self.null_count > 0) + \
+            int(self.overflowed)
+
+    @property
+    def dtype(self):
+        """The dtype of the column if it was read as one dataframe."""
+        if len(self.dtypes) == 1:
+            return self.dtypes[0]
+        if all(pd.api.types.is_numeric_dtype(dtype) and
+               not pd.api.types.is_bool_dtype(dtype)
+               for dtype in self.dtypes):
+            return np.result_type(*self.dtypes)
+        return np.dtype(object)
+
+    @property
+    def variance(self):
+        """The population variance of the non-null values."""
+        if self.count == 0:
+            return np.nan
+        return self.m2 / self.count
+
+    def get_value_counts(self):
+        """
+        Return the value counts as pandas.Series.value_counts would.
+
+        Returns:
+            value_counts: pandas.Series
+
+        """
+        if self.overflowed:
+            raise ValueError("The column has more than max_distinct={} "
+                             "values.".format(self.max_distinct))
+        return pd.Series(self.value_counts, dtype=np.int64).sort_values(
+            ascending=False)
+
+
+class ChunkedTabularPipeline(object):
+    """
+    Preprocess a tabular source chunk by chunk instead of in memory.
+
+    fit makes one streaming pass over the source to gather ColumnStatistics
+    (null counts, value counts, dtypes, min/max/variance). The identify_
+    methods then make the same column decisions as the functions of
+    tabular_data_utils would on the whole dataframe, from those statistics
+    only. Encodings and column drops are registered as steps and applied to
+    every chunk by transform, in the order they were registered. All
+    decisions are made on the columns of the source.
+
+    Parameters:
+        source: str, Dataframe or callable
+            See read_chunks. Read again by every fit and transform.
+        chunksize: int
+            The number of rows per chunk.
+        max_distinct: int or None
+            The maximum number of distinct values counted per column.
+            Decisions that would need uncounted values raise a ValueError.
+        read_kwargs: dict of keyworded parameters
+            Passed to pandas.read_csv or pyarrow.parquet.ParquetFile.
+
+    """
+
+    def __init__(self, source, chunksize=100000, max_distinct=None,
+                 **read_kwargs):
+        """Initialize a pipeline without steps."""
+        self.source = source
+        self.chunksize = chunksize
+        self.max_distinct = max_distinct
+        self.read_kwargs = read_kwargs
+        self.statistics = None
+        self.steps = []
+
+    def iter_chunks(self):
+        """Yield the chunks of the source, untransformed."""
+        return read_chunks(self.source, chunksize=self.chunksize,
+                           **self.read_kwargs)
+
+    def fit(self):
+        """
+        Gather the statistics of every column in one pass over the source.
+
+        Returns:
+            self
+
+        """
+        statistics = OrderedDict()
+        for chunk in self.iter_chunks():
+            for col in chunk.columns:
+                if col not in statistics:
+                    statistics[col] = ColumnStatistics(self.max_distinct)
+                statistics[col].update(chunk[col])
+        self.statistics = statistics
+        return self
+
+    def _get_statistics(self):
+        """Return the column statistics, fitting first if needed."""
+        if self.statistics is None:
+            self.fit()
+        return self.statistics
+
+    @property
+    def num_rows(self):
+        """The number of rows of the source."""
+        statistics = self._get_statistics()
+        if not statistics:
+            return 0
+        return next(iter(statistics.values())).num_rows
+
+    def identify_null(self, threshold):
+        """
+        Return columns where there is at least threshold percent of
+        null values. Same as tabular_data_utils.identify_null.
+
+        Parameters:
+            threshold: Float
+                A number between 0 and 1, representing proportion of null
+                values.
+
+        Returns:
+            cols: List
+
+        """
+        if threshold >= 1 or threshold <= 0:
+            raise ValueError(
+                "Threshold needs to be a proportion between 0 and 1 \
+                (exclusive)")
+        num_threshold = (1 - threshold) * self.num_rows
+        return [col for col, stats in self._get_statistics().items()
+                if stats.non_null_count < num_threshold]
+
+    def identify_unique(self, threshold):
+        """
+        Returns columns that do not have have at least threshold number of
+        values. Same as tabular_data_utils.identify_unique.
+
+        Parameters:
+            threshold: The minimum number of values needed.
+
+        Returns:
+            column_list: list
+
+        """
+        column_list = []
+        for col, stats in self._get_statistics().items():
+            if stats.overflowed and stats.num_distinct < threshold:
+                raise ValueError(
+                    "Column {} has more than max_distinct={} values, which "
+                    "is too few for threshold={}".format(
+                        col, self.max_distinct, threshold))
+            if stats.num_distinct < threshold:
+                column_list.append(col)
+        return column_list
+
+    def identify_unbalanced_columns(self, threshold, non_numeric=True):
+        """
+        This returns columns that are highly unbalanced. Same as
+        tabular_data_utils.identify_unbalanced_columns.
+
+        Parameters:
+            threshold: Float
+                Proportion needed to define unbalanced, between 0 and 1
+            non_numeric: Boolean
+                Whether non-numeric columns are also considered.
+
+        Returns:
+            column_list: List
+
+        """
+        column_list = []
+        for col, stats in self._get_statistics().items():
+            if not non_numeric and not (
+                    pd.api.types.is_numeric_dtype(stats.dtype) and
+                    not pd.api.types.is_bool_dtype(stats.dtype)):
+                continue
+            if stats.non_null_count == 0:
+                continue
+            col_maj = max(stats.value_counts.values()) / stats.non_null_count
+            if col_maj < threshold and stats.overflowed and \
+                    stats.untracked_bound / stats.non_null_count >= threshold:
+                # An uncounted value may hold the majority.
+                raise ValueError(
+                    "Column {} has more than max_distinct={} values to "
+                    "decide threshold={}".format(col, self.max_distinct,
+                                                 threshold))
+            if col_maj >= threshold:
+                column_list.append(col)
+        return column_list
+
+    def identify_low_variance(self, threshold):
+        """
+        Identify those columns that have low variance. Same as
+        tabular_data_utils.identify_low_variance, the variance of the min
+        max scaled values.
+
+        Parameters:
+            threshold: Float
+                Between 0 an 1.
+                Maximum amount of variance necessary to be identified as low
+                variance.
+
+        Returns:
+            variance_dict: Dict
+
+        """
+        dct_low_var = {}
+        for col, stats in self._get_statistics().items():
+            if stats.dtype not in LOW_VARIANCE_DTYPES or stats.count == 0:
+                continue
+            value_range = stats.max - stats.min
+            col_var = 0. if value_range == 0 else \
+                stats.variance / value_range ** 2
+            if col_var <= threshold:
+                dct_low_var[col] = col_var
+        return dct_low_var
+
+    def convert_all_categorical_binary(self, list_only=False,
+                                       exception_columns=None):
+        """
+        Recodes all columns with only two values as ones and zeros, float
+        valued, in every transformed chunk. Same columns and recoding as
+        tabular_data_utils.convert_all_categorical_binary.
+
+        Parameters:
+            list_only: boolean
+                only return a list of columns for which this would
+                apply, do not add the step.
+            exception_columns: list
+                list of column names you do not wish to convert.
+
+        Returns:
+            list if list_only, self otherwise.
+
+        """
+        binary_cols = [(col, stats.get_value_counts().index)
+                       for col, stats in self._get_statistics().items()
+                       if not stats.overflowed and
+                       len(stats.value_counts) == 2]
+
+        if list_only:
+            return binary_cols
+
+        exception_columns = exception_columns or []
+        self.steps.append(('binary', [
+            (col, index) for col, index in binary_cols
+            if col not in exception_columns]))
+        return self
+
+    def create_one_hot_encoding(self, column_name, prefix_sep="@"):
+        """
+        One-hot encode a column in every transformed chunk.
+
+        Every chunk gets a dummy column for each value of the whole source,
+        in the order of tabular_data_utils.create_one_hot_encoding.
+
+        Parameters:
+            column_name: String
+                The name of the column you want to one-hot encode
+            prefix_sep: String default("@")
+                The prefix used when creating a one-hot encoding
+
+        Returns:
+            self
+
+        """
+        stats = self._get_statistics()[column_name]
+        if stats.overflowed:
+            raise ValueError(
+                "Column {} has more than max_distinct={} values to "
+                "encode".format(column_name, self.max_distinct))
+        categories = sorted(stats.value_counts)
+        self.steps.append(('one_hot', column_name, prefix_sep, categories))
+        return self
+
+    def drop_columns(self, columns):
+        """
+        Drop columns, e.g. those identified, from every transformed chunk.
+
+        Parameters:
+            columns: list
+                The column names.
+
+        Returns:
+            self
+
+        """
+        self.steps.append(('drop', list(columns)))
+        return self
+
+    def transform(self):
+        """
+        Yield the chunks of the source with all steps applied.
+
+        Yields:
+            chunk: Dataframe
+
+        """
+        for chunk in self.iter_chunks():
+            yield self.transform_chunk(chunk)
+
+    def transform_chunk(self, chunk):
+        """
+        Apply all steps to one chunk.
+
+        Parameters:
+            chunk: Dataframe
+
+        Returns:
+            chunk: Dataframe
+
+        """
+        for step in self.steps:
+            if step[0] == 'drop':
+                chunk = chunk.drop(step[1], axis=1)
+            elif step[0] == 'binary':
+                chunk = _replace_columns(chunk, {
+                    col: _get_binary_values(chunk[col], index)
+                    for col, index in step[1]})
+            elif step[0] == 'one_hot':
+                _, column_name, prefix_sep, categories = step
+                chunk = chunk.copy()
+                chunk[column_name] = pd.Categorical(chunk[column_name],
+                                                    categories=categories)
+                chunk = pd.get_dummies(chunk, columns=[column_name],
+                                       prefix_sep=prefix_sep)
+        return chunk
+
+    def write_memmap_dataset(self, path, target_vars=None,
+                             continuous_target=False):
+        """
+        Write the transformed chunks to an on-disk MemmapDataset.
+
+        Parameters:
+            path: str
+                Directory to write the dataset to.
+            target_vars: string or list of string
+                The column(s) to be used in the target tensor.
+            continuous_target: boolean default False
+                Whether the target values are continuous as opposed to
+                categorical
+
+        Returns:
+            dataset: MemmapDataset
+
+        """
+        return write_memmap_dataset(path, self.transform(),
+                                    target_vars=target_vars,
+                                    continuous_target=continuous_target)
@@ -11,6 +11,13 @@ import pandas as pd
 import logging
 import copy
 import numpy as np
+import torch
+from torch.utils.data import (DataLoader, TensorDataset, Subset,
+                              ConcatDataset)
+
+from .multidataset import MultiDataset
+from .memmapdataset import MemmapDataset
+from .sparsedataset import SparseTensorDataset
 
 logger = logging.getLogger(__name__)
 
@@ -106,4 +113,78 @@ def rationed_split(df, train_ratio, test_ratio, validation_ratio):
     return indices
 
 
+def get_targets(dataset, batch_size=1024):
+    """
+    Return the targets of a dataset as one tensor, in dataset order.
+
+    Reads the targets without indexing the dataset item by item when it is
+    a TensorDataset, MemmapDataset or SparseTensorDataset (a view of its
+    target tensor), a Subset or ConcatDataset of such datasets (gathered
+    from the wrapped targets) or a MultiDataset (the targets of its target
+    dataset). Other datasets are read in batches with a DataLoader.
+
+    Parameters:
+        dataset : torch.utils.data.Dataset
+            Dataset of (input, target) items.
+        batch_size : int
+            The number of items collated at a time for other datasets.
+
+    Returns:
+        targets : torch.Tensor
+            The targets of shape [len(dataset), *target_shape].
+
+    """
+    targets = _get_stored_targets(dataset)
+    if targets is not None:
+        return targets
+    return torch.cat([target for _, target in
+                      DataLoader(dataset, batch_size=batch_size)])
 
+
+def _get_stored_targets(dataset):
+    """
+    Return the targets stored in a dataset, or None if they are not.
+
+    Parameters:
+        dataset : torch.utils.data.Dataset
+            Dataset of (input, target) items.
+
+    Returns:
+        targets : torch.Tensor or None
+
+    """
+    if isinstance(dataset, TensorDataset):
+        if len(dataset.tensors) < 2:
+            return None
+        return dataset.tensors[1]
+
+    if isinstance(dataset, (MemmapDataset, SparseTensorDataset)):
+        return dataset.targets
+
+    if isinstance(dataset, Subset):
+        targets = _get_stored_targets(dataset.dataset)
+        if targets is None:
+            return None
+        indices = torch.as_tensor(np.asarray(dataset.indices),
+                                  dtype=torch.long)
+        return targets[indices]
+
+    if isinstance(dataset, ConcatDataset):
+        all_targets = [_get_stored_targets(ds) for ds in dataset.datasets]
+        if any(targets is None for targets in all_targets):
+            return None
+        return torch.cat(all_targets)
+
+    if isinstance(dataset, MultiDataset):
+        # Same target selection as MultiDataset.__getitem__.
+        targets = None
+        for ds, _, include_target in dataset._children:
+            if include_target:
+                targets = _get_stored_targets(ds)
+                if targets is None:
+                    return None
+        if targets is None:
+            raise ValueError("The MultiDataset has no target dataset.")
+        return targets[:len(dataset)]
+
+    return None
@@ -9,14 +9,16 @@ from .utils import (
         selu_weight_init_,
         selu_bias_init_,
         set_tensor_device,
-        master_device_setter
+        split_batch,
+        master_device_setter,
+        BatchPrefetcher
     )
 
 from .basenetwork import BaseNetwork
 from .cnn import ConvNet, ConvNetConfig
 from .dnn import DenseNet, DenseNetConfig
 from .ensemble import SnapshotNet
-from .metrics import Metrics
+from .metrics import Metrics, MetricAccumulator
 from .layers import BaseUnit, ConvUnit, DenseUnit, FlattenUnit
 
 __all__ = [
@@ -34,6 +36,7 @@ __all__ = [
     'DenseNetConfig',
     'SnapshotNet',
     'Metrics',
+    'MetricAccumulator',
     'ConvUnit',
     'DenseUnit',
     'FlattenUnit',
@@ -5,18 +5,22 @@ import abc
 
 # Vulcan imports
 from .layers import *
-from .utils import set_tensor_device
+from .utils import (set_tensor_device, split_batch, BatchPrefetcher,
+                    _RecordingBatchSampler)
 
 from .metrics import Metrics
+from ..datasets import MultiInputLoader
 from ..plotters.visualization import display_record, get_save_path
 
 # Generic imports
+from torch.utils.data import DataLoader
 import pydash as pdash
 from tqdm import tqdm, trange
 from datetime import datetime
 import logging
 import os
 import pickle
+import time
 import numpy as np
 
 import matplotlib.pyplot as plt
@@ -29,6 +33,20 @@ warnings.filterwarnings("ignore")
 sns.set(style='dark')
 logger = logging.getLogger(__name__)
 
+# Autocast dtypes accepted by BaseNetwork.fit(mixed_precision=...)
+_MIXED_PRECISION_DTYPES = {
+    'bfloat16': torch.bfloat16,
+    'float16': torch.float16
+}
+
+# DataLoader settings kept when iter_forward_pass rebatches a DataLoader.
+# Settings missing from older torch versions are skipped.
+_DATA_LOADER_SETTINGS = ('num_workers', 'collate_fn', 'pin_memory',
+                         'timeout', 'worker_init_fn',
+                         'multiprocessing_context', 'generator',
+                         'prefetch_factor', 'persistent_workers',
+                         'pin_memory_device', 'in_order')
+
 
 # Because pytorch causes a bunch of unresolved references
 # noinspection PyDefaultArgument,PyUnresolvedReferences,PyTypeChecker
@@ -122,6 +140,7 @@ class BaseNetwork(nn.Module):
 
         self.optim = None
         self.criterion = None
+        self._grad_scaler = None
 
         self.epoch = 0
 
@@ -130,7 +149,9 @@ class BaseNetwork(nn.Module):
             train_error=[],
             train_accuracy=[],
             validation_error=[],
-            validation_accuracy=[]
+            validation_accuracy=[],
+            train_wait_time=[],
+            train_compute_time=[]
         )
 
         if in_dim:
@@ -603,7 +624,8 @@ class BaseNetwork(nn.Module):
             self.val_loss_min = val_loss
 
     def fit(self, train_loader, val_loader, epochs,
-            retain_graph=None, valid_interv=4, plot=False, save_path=None):
+            retain_graph=None, valid_interv=4, plot=False, save_path=None,
+            mixed_precision=None, accumulation_steps=1, prefetch=0):
         """
         Train the network on the provided data.
 
@@ -622,6 +644,26 @@ class BaseNetwork(nn.Module):
                 Whether or not to plot training metrics in real-time.
             save_path : str
                 Path to save graphics at
+            mixed_precision : {None, 'bfloat16', 'float16'}
+                Run the forward passes and loss under torch.autocast with
+                the given dtype. 'bfloat16' works on cpu and cuda, 'float16'
+                needs a cuda device and scales the loss with a GradScaler.
+                Weights and optimizer state stay in float32.
+            accumulation_steps : int
+                Split every DataLoader batch into this many micro-batches,
+                accumulate their gradients and step the optimizer once per
+                batch. Lowers the peak memory of a batch without changing
+                the effective batch size, except for layers that use batch
+                statistics such as batch norm.
+            prefetch : int
+                Load this many batches of train_loader and val_loader ahead
+                on a background thread, moved to the device, with a
+                BatchPrefetcher. 0 loads every batch in the training loop.
+                MultiInputLoaders are not wrapped, as they load ahead with
+                their own prefetch.
+                The time the training loop waited for batches is recorded
+                in record['train_wait_time'] next to the rest of the epoch
+                in record['train_compute_time'].
 
         Returns:
             None
@@ -629,12 +671,28 @@ class BaseNetwork(nn.Module):
         """
         # Check all networks are on same device.
         self.assert_same_devices()
+        self._check_mixed_precision(mixed_precision)
+        if not isinstance(accumulation_steps, int) or accumulation_steps < 1:
+            raise ValueError("accumulation_steps must be a positive integer.")
+        if not isinstance(prefetch, int) or prefetch < 0:
+            raise ValueError("prefetch must be a non-negative integer.")
+        train_loader = self._get_prefetching_loader(train_loader, prefetch)
+        val_loader = self._get_prefetching_loader(val_loader, prefetch)
 
         # In case there is already one, don't overwrite it.
         # Important for not removing the ref from a lr scheduler
         if self.optim is None:
             self._init_trainer()
 
+        # Kept on the network so the loss scale carries over between fits
+        # and is saved with the model.
+        if mixed_precision == 'float16' and \
+                getattr(self, '_grad_scaler', None) is None:
+            if hasattr(torch.amp, 'GradScaler'):
+                self._grad_scaler = torch.amp.GradScaler('cuda')
+            else:
+                self._grad_scaler = torch.cuda.amp.GradScaler()
+
         early_stopping = self.EarlyStopping(patience=
                                             self.early_stopping_patience,
                                             verbose=True)
@@ -655,12 +713,16 @@ class BaseNetwork(nn.Module):
 
             for epoch in iterator:
 
-                train_loss, train_acc = self._train_epoch(train_loader,
-                                                          retain_graph)
+                train_loss, train_acc, train_wait_time, train_compute_time = \
+                    self._train_epoch(
+                        train_loader, retain_graph,
+                        mixed_precision=mixed_precision,
+                        accumulation_steps=accumulation_steps)
 
                 valid_loss = valid_acc = None
                 if epoch % valid_interv == 0:
-                    valid_loss, valid_acc = self._validate(val_loader)
+                    valid_loss, valid_acc = self._validate(
+                        val_loader, mixed_precision=mixed_precision)
 
                 if self.lr_scheduler:
                     self.lr_scheduler.step(epoch=epoch)
@@ -700,18 +762,26 @@ class BaseNetwork(nn.Module):
                 tqdm.write(
                     "\n Epoch {}:\n"
                     "Train Loss: {:.6f} | Val Loss: {:.6f} |"
-                    "Train Acc: {:.4f} | Val Acc: {:.4f}".format(
+                    "Train Acc: {:.4f} | Val Acc: {:.4f}\n"
+                    "Batch Wait: {:.3f}s | Compute: {:.3f}s".format(
                         self.epoch,
                         train_loss,
                         valid_loss,
                         train_acc,
-                        valid_acc))
+                        valid_acc,
+                        train_wait_time,
+                        train_compute_time))
 
                 self.record['epoch'].append(self.epoch)
                 self.record['train_error'].append(train_loss)
                 self.record['train_accuracy'].append(train_acc)
                 self.record['validation_error'].append(valid_loss)
                 self.record['validation_accuracy'].append(valid_acc)
+                # Missing from the records of networks saved before.
+                self.record.setdefault('train_wait_time', []).append(
+                    train_wait_time)
+                self.record.setdefault('train_compute_time', []).append(
+                    train_compute_time)
 
                 if plot:
                     plt.ion()
@@ -726,81 +796,177 @@ class BaseNetwork(nn.Module):
                 "\n\n**********KeyboardInterrupt: "
                 "Training stopped prematurely.**********\n\n")
 
-    def _train_epoch(self, train_loader, retain_graph):
+    def _get_prefetching_loader(self, loader, prefetch):
+        """
+        Return the loader fit iterates to keep prefetch batches ready.
+
+        Parameters:
+            loader : DataLoader
+                The loader of (data, targets) batches.
+            prefetch : int
+                The number of batches to load ahead. 0 for none.
+
+        Returns:
+            loader : DataLoader or BatchPrefetcher
+                A BatchPrefetcher over loader moving the batches to the
+                device, or loader itself without prefetch or if it is a
+                MultiInputLoader, which loads ahead on its own and reuses
+                its buffers.
+
+        """
+        if not prefetch or isinstance(loader, MultiInputLoader):
+            return loader
+        return BatchPrefetcher(loader, device=self.device,
+                               num_batches=prefetch)
+
+    def _check_mixed_precision(self, mixed_precision):
+        """
+        Check that the mixed precision mode can run on the network's device.
+
+        Parameters:
+            mixed_precision : {None, 'bfloat16', 'float16'}
+                The requested autocast dtype.
+
+        """
+        if mixed_precision is None:
+            return
+        if mixed_precision not in _MIXED_PRECISION_DTYPES:
+            raise ValueError(
+                "mixed_precision must be one of None, {}.".format(
+                    ", ".join(repr(k) for k in _MIXED_PRECISION_DTYPES)))
+        if mixed_precision == 'float16' and self.device.type != 'cuda':
+            raise ValueError(
+                "float16 mixed precision needs a cuda device. "
+                "Use 'bfloat16' on {}.".format(self.device.type))
+
+    def _autocast(self, mixed_precision):
+        """
+        Return the autocast context for the given mixed precision mode.
+
+        Parameters:
+            mixed_precision : {None, 'bfloat16', 'float16'}
+                The autocast dtype. None returns a disabled context.
+
+        Returns:
+            context : torch.autocast
+
+        """
+        return torch.autocast(
+            device_type=self.device.type,
+            dtype=_MIXED_PRECISION_DTYPES.get(mixed_precision,
+                                              torch.bfloat16),
+            enabled=mixed_precision is not None)
+
+    def _train_epoch(self, train_loader, retain_graph, mixed_precision=None,
+                     accumulation_steps=1):
         """
         Trains the network for 1 epoch.
 
         Parameters:
             train_loader : DataLoader
                 The DataLoader object containing the dataset to train on.
+            retain_graph : {None, True, False}
+                Whether retain_graph will be true when .backwards is called.
+            mixed_precision : {None, 'bfloat16', 'float16'}
+                The autocast dtype of the forward pass, if any.
+            accumulation_steps : int
+                The number of micro-batches each batch is split into before
+                the optimizer steps.
 
         Returns:
-            (train_loss, train_accuracy) : (float, float)
-                Returns the train loss and accuracy.
+            (train_loss, train_accuracy, wait_time, compute_time) :
+                    (float, float, float, float)
+                Returns the train loss and accuracy, and the seconds spent
+                waiting for batches, moved to the device, and the seconds
+                spent on the rest of the epoch.
 
         """
         # Set model to training mode
         # Done here because the default is evaluation
         self.train()
 
-        train_loss_accumulator = 0.0
-        train_accuracy_accumulator = 0.0
+        # Accumulated on the device so that no batch forces a host sync.
+        train_loss_accumulator = torch.zeros([], device=self.device)
+        train_metric_accumulator = torch.zeros([], device=self.device)
+        train_metric_count = 0
+        train_row_count = 0
+        grad_scaler = self._grad_scaler \
+            if mixed_precision == 'float16' else None
         pbar = trange(len(train_loader.dataset), desc='Training.. ')
 
+        wait_time = 0.
+        epoch_start = wait_start = time.perf_counter()
         for data, targets in train_loader:
             data = set_tensor_device(data, device=self.device)
             targets = set_tensor_device(targets, device=self.device)
+            wait_time += time.perf_counter() - wait_start
+            batch_len = len(targets)
 
-            # Forward + Backward + Optimize
-            predictions = self(data)
-            train_loss = self.criterion(predictions, targets)
-            train_loss_accumulator += train_loss.item()
+            if accumulation_steps > 1:
+                micro_batches = zip(split_batch(data, accumulation_steps),
+                                    split_batch(targets, accumulation_steps))
+            else:
+                micro_batches = [(data, targets)]
 
+            # Forward + Backward for every micro-batch, then one optimize.
             self.optim.zero_grad()
-            train_loss.backward(retain_graph=retain_graph)
-            self.optim.step()
-
-            # here can add more options in the future if other metrics
-            # will be used
-            average = None
-
-            if self.num_classes == 1:
-                metric = "mse"
+            for micro_data, micro_targets in micro_batches:
+                micro_len = len(micro_targets)
+                with self._autocast(mixed_precision):
+                    predictions = self(micro_data)
+                    train_loss = self.criterion(predictions, micro_targets)
+                train_loss_accumulator += \
+                    train_loss.detach().float() * micro_len
+
+                # Weight the mean micro-batch losses so the accumulated
+                # gradient is the gradient of the mean batch loss.
+                if micro_len != batch_len:
+                    train_loss = train_loss * (micro_len / batch_len)
+                if grad_scaler is not None:
+                    train_loss = grad_scaler.scale(train_loss)
+                train_loss.backward(retain_graph=retain_graph)
+
+                metric_sum, metric_count = self._get_batch_metric_sum(
+                    predictions=predictions.detach().float(),
+                    targets=micro_targets)
+                train_metric_accumulator += metric_sum
+                train_metric_count += metric_count
+
+            if grad_scaler is not None:
+                grad_scaler.step(self.optim)
+                grad_scaler.update()
             else:
-                metric = "accuracy"
-
-            if self._final_transform:
-                predictions = self._final_transform(predictions)
+                self.optim.step()
+            train_row_count += batch_len
 
-            # will be fixed in the future
-            train_accuracy_accumulator += self.metrics.get_score(
-                targets=targets,
-                predictions=predictions,
-                metrics=metric,
-                average=average)[metric]
-
-            pbar.update(train_loader.batch_size)
+            pbar.update(batch_len)
+            wait_start = time.perf_counter()
         pbar.close()
 
-        train_loss = train_loss_accumulator * \
-            train_loader.batch_size / len(train_loader.dataset)
-        train_accuracy = train_accuracy_accumulator * \
-            train_loader.batch_size / len(train_loader.dataset)
+        # Single read back of the epoch values.
+        train_loss, train_accuracy = torch.stack([
+            train_loss_accumulator,
+            train_metric_accumulator]).tolist()
+        compute_time = time.perf_counter() - epoch_start - wait_time
+        train_loss /= max(train_row_count, 1)
+        train_accuracy /= max(train_metric_count, 1)
 
         # returns the network to evaluation state
         # done here because the default is evaluation
         self.eval()
 
-        return train_loss, train_accuracy
+        return train_loss, train_accuracy, wait_time, compute_time
 
     @torch.no_grad()
-    def _validate(self, val_loader):
+    def _validate(self, val_loader, mixed_precision=None):
         """
         Validate the network on the validation data.
 
         Parameters:
             val_loader : DataLoader
                 The DataLoader object containing the dataset to evaluate on
+            mixed_precision : {None, 'bfloat16', 'float16'}
+                The autocast dtype of the forward pass, if any.
 
         Returns:
             (val_loss, val_accuracy) : (float, float)
@@ -808,50 +974,82 @@ class BaseNetwork(nn.Module):
 
         """
 
-        val_loss_accumulator = 0.0
-        val_accuracy_accumulator = 0.0
+        # Accumulated on the device so that no batch forces a host sync.
+        val_loss_accumulator = torch.zeros([], device=self.device)
+        val_metric_accumulator = torch.zeros([], device=self.device)
+        val_metric_count = 0
+        val_row_count = 0
         pbar = trange(len(val_loader.dataset), desc='Validating.. ')
 
         for data, targets in val_loader:
 
             data = set_tensor_device(data, device=self.device)
             targets = set_tensor_device(targets, device=self.device)
+            batch_len = len(targets)
 
-            predictions = self(data)
-            validation_loss = self.criterion(predictions, targets)
-            val_loss_accumulator += validation_loss.item()
+            with self._autocast(mixed_precision):
+                predictions = self(data)
+                validation_loss = self.criterion(predictions, targets)
+            val_loss_accumulator += validation_loss.float() * batch_len
 
-            # here can add more options in the future if other metrics
-            # will be used
-            average = None
+            metric_sum, metric_count = self._get_batch_metric_sum(
+                predictions=predictions.float(),
+                targets=targets)
+            val_metric_accumulator += metric_sum
+            val_metric_count += metric_count
+            val_row_count += batch_len
 
-            if self.num_classes == 1:
-                metric = "mse"
-            else:
-                metric = "accuracy"
+            pbar.update(batch_len)
+        pbar.close()
 
-            if self._final_transform:
-                predictions = self._final_transform(predictions)
+        # Single read back of the epoch values.
+        validation_loss, validation_accuracy = torch.stack([
+            val_loss_accumulator,
+            val_metric_accumulator]).tolist()
+        validation_loss /= max(val_row_count, 1)
+        validation_accuracy /= max(val_metric_count, 1)
 
-            # will be fixed in the future
-            val_accuracy_accumulator += self.metrics.get_score(
-                targets=targets,
-                predictions=predictions,
-                metrics=metric,
-                average=average)[metric]
+        return validation_loss, validation_accuracy
 
-            pbar.update(val_loader.batch_size)
-        pbar.close()
+    def _get_batch_metric_sum(self, predictions, targets):
+        """
+        Sum the batch metric used for reporting without leaving the device.
 
-        validation_loss = val_loss_accumulator * \
-            val_loader.batch_size / len(val_loader.dataset)
-        validation_accuracy = val_accuracy_accumulator * \
-            val_loader.batch_size / len(val_loader.dataset)
+        Counts the correct class predictions, or sums the squared errors
+        when predicting a single continuous value. Dividing the summed values
+        of an epoch by the summed counts gives the exact epoch accuracy or
+        MSE, including when the last batch is partial.
 
-        return validation_loss, validation_accuracy
+        Parameters:
+            predictions : torch.Tensor
+                The raw network outputs of the batch.
+            targets : torch.Tensor
+                The target values of the batch.
+
+        Returns:
+            (metric_sum, count) : (torch.Tensor, int)
+                The summed metric as a 0-dim tensor on the predictions'
+                device and the number of values it was summed over.
+
+        """
+        # here can add more options in the future if other metrics
+        # will be used
+        if self.num_classes == 1:
+            if self._final_transform:
+                predictions = self._final_transform(predictions)
+            targets = targets.reshape(predictions.shape)
+            squared_error = (predictions - targets.to(predictions.dtype)) ** 2
+            return squared_error.sum(), predictions.numel()
+
+        # Same class conversion as Metrics.transform_outputs
+        if predictions.shape[1] > 1:
+            predictions = torch.argmax(predictions, dim=1)
+        predictions = predictions.reshape(-1)
+        correct = predictions == targets.reshape(-1).to(predictions.dtype)
+        return correct.sum(), len(predictions)
 
     def run_test(self, data_loader, plot=False, save_path=None, pos_label=1,
-                 transform_callable=None, **kwargs):
+                 transform_callable=None, streaming=False, **kwargs):
         """
         Will conduct the test suite to determine network strength. Using
         metrics.run_test
@@ -868,6 +1066,9 @@ class BaseNetwork(nn.Module):
                 calculations.
             transform_callable: callable
                 A torch function. e.g. torch.round()
+            streaming: bool
+                Whether to score batch by batch with a MetricAccumulator
+                instead of collecting all predictions first.
             kwargs: dict of keyworded parameters
                 Values passed to transform callable (function parameters)
 
@@ -882,6 +1083,7 @@ class BaseNetwork(nn.Module):
             plot=plot,
             pos_label=pos_label,
             transform_callable=transform_callable,
+            streaming=streaming,
             **kwargs
         )
 
@@ -891,7 +1093,8 @@ class BaseNetwork(nn.Module):
     def bootfold_p_estimate(self, data_loader, n_samples, k, epochs,
                             index_to_iter, ls_feat_vals, retain_graph=None,
                             valid_interv=4, plot=False, save_path=None,
-                            p_output_path=None, **kwargs):
+                            p_output_path=None, n_workers=1,
+                            torch_threads=None, ci_width=None, **kwargs):
         """
         Performs bootfold - estimation to identify whether training model
         provides statistically significant
@@ -925,6 +1128,13 @@ class BaseNetwork(nn.Module):
                 Where to save all figures and results.
             p_output_path: str
                 Output file to save p_value to
+            n_workers : int
+                The number of worker processes the replicates run in.
+            torch_threads : int or None
+                The number of torch threads per worker process.
+            ci_width : float or None
+                Stop early once the 95% confidence interval of the p value
+                is at most this wide.
             kwargs: dict of keyworded parameters
                 Values passed to transform callable (function parameters)
         Returns:
@@ -943,12 +1153,16 @@ class BaseNetwork(nn.Module):
             plot=plot,
             save_path=save_path,
             p_output_path=p_output_path,
+            n_workers=n_workers,
+            torch_threads=torch_threads,
+            ci_width=ci_width,
             **kwargs)
 
     def cross_validate(self, data_loader, k, epochs,
                        average_results=True, retain_graph=None,
                        valid_interv=4, plot=False, save_path=None,
-                       transform_callable=None, **kwargs):
+                       transform_callable=None, n_workers=1,
+                       torch_threads=None, **kwargs):
         """
         Perform k-fold cross validation given a Network and DataLoader object.
 
@@ -973,6 +1187,10 @@ class BaseNetwork(nn.Module):
                 Where to save all figures and results.
             transform_callable: callable
                 A torch function. e.g. torch.round()
+            n_workers : int
+                The number of worker processes the folds are trained in.
+            torch_threads : int or None
+                The number of torch threads per worker process.
             kwargs: dict of keyworded parameters
                 Values passed to transform callable (function parameters)
 
@@ -995,6 +1213,8 @@ class BaseNetwork(nn.Module):
             plot=plot,
             save_path=save_path,
             transform_callable=transform_callable,
+            n_workers=n_workers,
+            torch_threads=torch_threads,
             **kwargs)
 
     def forward(self, inputs, **kwargs):
@@ -1069,23 +1289,125 @@ class BaseNetwork(nn.Module):
         # (e.g. with or without class conversion)
         # so far always a float.
         dtype = torch.float
-        pred_collector = torch.tensor([], dtype=dtype, device=self.device)
+        num_rows = len(data_loader.dataset)
+        pred_collector = None
+        row_idx = 0
         for data, _ in data_loader:
-            # Get raw network output
-            predictions = self(data)
-
-            if self._final_transform:
-                predictions = self._final_transform(predictions)
-
-            if transform_callable:
-                predictions = transform_callable(predictions)
+            predictions = self._predict_batch(data, transform_callable)
+            batch_len = predictions.shape[0]
+
+            # The buffer is sized once from the dataset and the output shape
+            # of the first batch (self.out_dim unless transform_callable
+            # reshapes the outputs) and stays on the prediction device.
+            if pred_collector is None:
+                pred_collector = torch.empty(
+                    [num_rows, *predictions.shape[1:]],
+                    dtype=dtype, device=predictions.device)
+            elif row_idx + batch_len > pred_collector.shape[0]:
+                # Samplers may draw more rows than the dataset holds.
+                grow_rows = max(pred_collector.shape[0], batch_len)
+                pred_collector = torch.cat([
+                    pred_collector,
+                    pred_collector.new_empty(
+                        [grow_rows, *pred_collector.shape[1:]])])
 
             # Aggregate predictions
-            pred_collector = torch.cat([pred_collector, predictions])
+            pred_collector[row_idx:row_idx + batch_len] = predictions
+            row_idx += batch_len
+
+        if pred_collector is None:
+            return np.empty([0, *self.out_dim], dtype=np.float32)
 
-        pred_collector = pred_collector.cpu().detach().numpy()
+        # Single device to host copy.
+        pred_collector = pred_collector[:row_idx].cpu().numpy()
         return pred_collector
 
+    # noinspection PyUnusedLocal
+    @torch.no_grad()
+    def iter_forward_pass(self, data_loader, transform_callable=None,
+                          return_indices=False, **kwargs):
+        """
+        Stream predictions batch by batch instead of collecting them.
+
+        Same transforms as forward_pass, but each batch is yielded as soon
+        as it is computed so that callers can write predictions out without
+        holding the whole output in memory.
+
+        Parameters:
+            data_loader : DataLoader
+                DataLoader object to make the pass with.
+            transform_callable: callable
+                A torch function. e.g. torch.round() used to transform
+                the outputs before they are passed to some scoring function.
+            return_indices : boolean
+                Whether to also yield the dataset indices of each batch.
+                Requires a torch DataLoader which batches with a
+                batch_sampler, as it is rebuilt to record the batches.
+            kwargs: dict of keyworded parameters
+                Values passed to transform callable (function parameters)
+
+        Yields:
+            outputs : numpy.ndarray
+                Numpy matrix with the batch output.
+            (indices, outputs) : (numpy.ndarray, numpy.ndarray)
+                If return_indices, the dataset indices of the batch rows
+                along with the batch output.
+
+        """
+        index_recorder = None
+        if return_indices:
+            if not isinstance(data_loader, DataLoader):
+                raise ValueError(
+                    "return_indices requires a torch DataLoader, got "
+                    "{}.".format(type(data_loader).__name__))
+            if data_loader.batch_sampler is None:
+                raise ValueError(
+                    "return_indices requires a DataLoader which batches "
+                    "with a batch_sampler.")
+            index_recorder = _RecordingBatchSampler(data_loader.batch_sampler)
+            data_loader = DataLoader(
+                dataset=data_loader.dataset,
+                batch_sampler=index_recorder,
+                **{name: getattr(data_loader, name)
+                   for name in _DATA_LOADER_SETTINGS
+                   if hasattr(data_loader, name)})
+
+        for data, _ in data_loader:
+            predictions = self._predict_batch(data, transform_callable)
+            predictions = predictions.to(dtype=torch.float).cpu().numpy()
+            if index_recorder is None:
+                yield predictions
+            else:
+                yield index_recorder.pop_batch(), predictions
+
+    def _predict_batch(self, data, transform_callable=None):
+        """
+        Pass a single batch through the network for inference.
+
+        Applies the final transform (e.g. softmax for nn.CrossEntropyLoss)
+        and then transform_callable, as used by forward_pass.
+
+        Parameters:
+            data : torch.Tensor or list of torch.Tensor
+                The batch of input data.
+            transform_callable: callable
+                A torch function. e.g. torch.round()
+
+        Returns:
+            predictions : torch.Tensor
+
+        """
+        # Get raw network output
+        predictions = self(data)
+
+        if self._final_transform:
+            predictions = self._final_transform(predictions)
+
+        if transform_callable:
+            predictions = transform_callable(predictions)
+
+        return torch.as_tensor(predictions)
+
     # TODO: could integrate map location in the future if needed
     # https://discuss.pytorch.org/t/
     # on-a-cpu-device-how-to-load-checkpoint-saved-on-gpu-device/349
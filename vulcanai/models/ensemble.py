@@ -65,7 +65,8 @@ class SnapshotNet(BaseNetwork):
         self.n_snapshots = n_snapshots
 
     def fit(self, train_loader, val_loader, epochs,
-            retain_graph=None, valid_interv=4, plot=False):
+            retain_graph=None, valid_interv=4, plot=False,
+            mixed_precision=None, accumulation_steps=1, prefetch=0):
         """
         Train each model for T/M epochs and controls network learning rate.
 
@@ -78,6 +79,15 @@ class SnapshotNet(BaseNetwork):
                 Input data and targets to validate against
             epochs : int
                 Total number of epochs (evenly distributed between snapshots)
+            mixed_precision : {None, 'bfloat16', 'float16'}
+                Autocast dtype used to train each snapshot. See
+                BaseNetwork.fit.
+            accumulation_steps : int
+                Micro-batches per batch used to train each snapshot. See
+                BaseNetwork.fit.
+            prefetch : int
+                Batches loaded ahead on a background thread to train each
+                snapshot. See BaseNetwork.fit.
 
         Returns:
             None
@@ -110,7 +120,10 @@ class SnapshotNet(BaseNetwork):
                 val_loader=val_loader,
                 epochs=network_epochs,
                 valid_interv=valid_interv,
-                plot=plot
+                plot=plot,
+                mixed_precision=mixed_precision,
+                accumulation_steps=accumulation_steps,
+                prefetch=prefetch
             )
             # Save instance of snapshot in a nn.ModuleList
             temp_network = deepcopy(self.template_network)
@@ -8,12 +8,21 @@ import numpy as np
 from sklearn import metrics as skl_metrics
 import pandas as pd
 
-from .utils import round_list, _get_probs, _filter_matched_subj
+from .utils import (round_list, _get_probs, _filter_matched_subj,
+                    _collect_inputs)
+from .. import set_global_seed
+from ..datasets.utils import get_targets
 from ..plotters.visualization import display_confusion_matrix
-from collections import defaultdict
+from collections import defaultdict, deque
+from contextlib import contextmanager
 
 import copy
-import inspect
+import itertools
+import multiprocessing
+import os
+import pickle
+import random
+from concurrent.futures import ProcessPoolExecutor
 
 import pandas as pd
 
@@ -24,6 +33,286 @@ logger = logging.getLogger(__name__)
 logger.addHandler(logging.StreamHandler())
 
 
+def _init_worker(torch_threads):
+    """
+    Initialize a cross validation worker process.
+
+    Parameters:
+        torch_threads : int
+            The number of intra-op threads torch may use in the worker.
+
+    """
+    torch.set_num_threads(torch_threads)
+
+
+def _get_process_pool(n_workers, torch_threads=None):
+    """
+    Create the process pool used to run folds and replicates in parallel.
+
+    Workers are spawned rather than forked, since forking a process that
+    has already used torch's thread pools can deadlock.
+
+    Parameters:
+        n_workers : int
+            The number of worker processes.
+        torch_threads : int or None
+            The number of torch threads per worker. Defaults to an even share
+            of the cpu cores.
+
+    Returns:
+        pool : concurrent.futures.ProcessPoolExecutor
+
+    """
+    if torch_threads is None:
+        torch_threads = max(1, (os.cpu_count() or 1) // n_workers)
+    return ProcessPoolExecutor(
+        max_workers=n_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(torch_threads,))
+
+
+def _check_picklable(**objects):
+    """
+    Check that the arguments sent to worker processes can be pickled.
+
+    Checked before the process pool starts, as a lambda or a locally
+    defined function otherwise fails deep inside the pool.
+
+    Parameters:
+        objects : dict
+            The objects to check, keyed by argument name.
+
+    Raises:
+        ValueError
+            If any of the objects can't be pickled.
+
+    """
+    for name, obj in objects.items():
+        try:
+            pickle.dumps(obj)
+        except Exception as e:
+            raise ValueError(
+                "{} must be picklable to be sent to worker processes with "
+                "n_workers > 1, e.g. a module level function instead of a "
+                "lambda, or use n_workers=1. Pickling failed with: "
+                "{}".format(name, e))
+
+
+def _iter_in_order(func, params_list, n_workers=1, torch_threads=None):
+    """
+    Yield func(**params) for every params of params_list, in order.
+
+    With n_workers > 1 the calls run in a process pool and each result is
+    yielded as soon as it and all results before it are done. At most
+    2 * n_workers calls are queued ahead of the consumer, and the queued
+    calls are cancelled when the generator is closed, so a consumer can stop
+    early without paying for the remaining calls.
+
+    Parameters:
+        func : callable
+            Module level function to call.
+        params_list : iterable of dict
+            The keyword arguments of each call.
+        n_workers : int
+            The number of worker processes. 1 calls func in this process.
+        torch_threads : int or None
+            The number of torch threads per worker process.
+
+    Returns:
+        results : generator
+            The return values of the calls, in params_list order.
+
+    """
+    if n_workers == 1:
+        for params in params_list:
+            yield func(**params)
+        return
+
+    params_iter = iter(params_list)
+    with _get_process_pool(n_workers, torch_threads) as pool:
+        pending = deque(
+            pool.submit(func, **params)
+            for params in itertools.islice(params_iter, 2 * n_workers))
+        try:
+            while pending:
+                result = pending.popleft().result()
+                for params in itertools.islice(params_iter, 1):
+                    pending.append(pool.submit(func, **params))
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+@contextmanager
+def _keep_global_rng_state():
+    """
+    Restore the global python, numpy and torch random states on exit.
+
+    Lets code seed with set_global_seed in this process without replacing
+    the random stream of the caller.
+
+    """
+    python_state = random.getstate()
+    numpy_state = np.random.get_state()
+    torch_state = torch.get_rng_state()
+    cuda_states = torch.cuda.get_rng_state_all() \
+        if torch.cuda.is_available() else None
+    try:
+        yield
+    finally:
+        random.setstate(python_state)
+        np.random.set_state(numpy_state)
+        torch.set_rng_state(torch_state)
+        if cuda_states is not None:
+            torch.cuda.set_rng_state_all(cuda_states)
+
+
+def _wilson_interval_width(successes, n, z=1.96):
+    """
+    Return the width of the Wilson score interval of a binomial proportion.
+
+    Parameters:
+        successes : int
+            The number of successes.
+        n : int
+            The number of trials.
+        z : float
+            The standard normal quantile of the confidence level. 1.96 gives
+            a 95% interval.
+
+    Returns:
+        width : float
+
+    """
+    p = successes / n
+    return 2 * z * math.sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2)) / \
+        (1 + z ** 2 / n)
+
+
+def _boot_replicate(network, dataset, batch_size, k, epochs, retain_graph,
+                    valid_interv, plot, save_path, index_to_iter,
+                    ls_feat_vals, seed):
+    """
+    Run one bootstrap replicate of Metrics.bootfold_p_estimate.
+
+    Resamples the dataset with replacement and runs Metrics._boot_cv on the
+    resample. Everything random is drawn after seeding with seed, so a
+    replicate gives the same score in any process. The global random state
+    is restored afterwards, so running in the caller's process leaves its
+    random stream as it was.
+
+    Module level so that it can be sent to worker processes.
+
+    Parameters:
+        network : BaseNetwork
+            Network descendant of BaseNetwork.
+        dataset : torch.utils.data.Dataset
+            The dataset to resample.
+        batch_size : int
+            The batch size of the replicate DataLoaders.
+        k : int
+            The number of folds to split the resample into.
+        epochs : int
+            The number of epochs to train the network per fold.
+        retain_graph : {None, boolean}
+            Whether retain_graph will be true when .backwards is called.
+        valid_interv : int
+            Specifies after how many epochs validation should occur.
+        plot : boolean
+            Whether or not to plot all results in prompt and charts.
+        save_path : str
+            Where to save all figures and results.
+        index_to_iter : int
+            Index of feature within dataset who's values will be iterated.
+        ls_feat_vals : list
+            List of values for feature provided in index_to_iter
+        seed : int
+            Seed set with set_global_seed before resampling.
+
+    Returns:
+        improvement_score : float
+
+    """
+    with _keep_global_rng_state():
+        set_global_seed(seed)
+        resample = torch.randint(len(dataset), [len(dataset)]).tolist()
+        boot_loader = data.DataLoader(data.Subset(dataset, resample),
+                                      batch_size=batch_size, shuffle=True)
+        return Metrics._boot_cv(
+            network, boot_loader, k, epochs, retain_graph=retain_graph,
+            valid_interv=valid_interv, plot=plot, save_path=save_path,
+            index_to_iter=index_to_iter, ls_feat_vals=ls_feat_vals)
+
+
+def _fit_and_test_fold(network, train_dataset, val_dataset, batch_size,
+                       shuffle, epochs, retain_graph, valid_interv, plot,
+                       save_path, transform_callable, seed=None, **kwargs):
+    """
+    Train a copy of the network on one fold and test it on the held out set.
+
+    Module level so that it can be sent to worker processes.
+
+    Parameters:
+        network : BaseNetwork
+            Network descendant of BaseNetwork. It is copied, not trained.
+        train_dataset : torch.utils.data.Dataset
+            The fold training set.
+        val_dataset : torch.utils.data.Dataset
+            The fold validation set.
+        batch_size : int
+            The batch size of both fold DataLoaders.
+        shuffle : boolean
+            Whether to shuffle the fold training set.
+        epochs : int
+            The number of epochs to train the network for.
+        retain_graph : {None, boolean}
+            Whether retain_graph will be true when .backwards is called.
+        valid_interv : int
+            Specifies after how many epochs validation should occur.
+        plot : boolean
+            Whether or not to plot all results in prompt and charts.
+        save_path : str
+            Where to save all figures and results.
+        transform_callable: callable
+            A torch function. e.g. torch.round()
+        seed : int or None
+            Seed set with set_global_seed before training, if given.
+        kwargs: dict of keyworded parameters
+            Values passed to transform callable (function parameters)
+
+    Returns:
+        results : dict
+            The run_test results of the fold.
+
+    """
+    if seed is not None:
+        set_global_seed(seed)
+
+    # TODO: this may break on different devices?? test.
+    # TODO: Re-initialize instead of deepcopy?
+    cross_val_network = copy.deepcopy(network)
+
+    # Generate fold training data loader object.
+    train_loader = data.DataLoader(
+        train_dataset, batch_size=batch_size, shuffle=shuffle)
+    # Generate fold validation data loader object.
+    val_loader = data.DataLoader(
+        val_dataset, batch_size=batch_size)
+    # Train network on fold training data loader.
+    cross_val_network.fit(
+        train_loader, val_loader, epochs,
+        retain_graph=retain_graph,
+        valid_interv=valid_interv, plot=plot, save_path=save_path)
+    # Validate network performance on validation data loader.
+    return Metrics.run_test(
+        cross_val_network, val_loader,
+        save_path=save_path, plot=plot,
+        transform_callable=transform_callable,
+        **kwargs)
+
+
 # noinspection PyProtectedMember
 class Metrics(object):
     """
@@ -142,7 +431,8 @@ class Metrics(object):
 
         """
         # credit: Robert Fratila
-        confusion_matrix = skl_metrics.confusion_matrix(targets, predictions)
+        _, confusion_matrix = Metrics._get_confusion_matrix(targets,
+                                                            predictions)
         tp = np.diagonal(confusion_matrix).astype('float32')
         tn = (np.array(
             [np.sum(confusion_matrix)] *
@@ -157,46 +447,312 @@ class Metrics(object):
         return tp, tn, fp, fn
 
     @staticmethod
-    def _check_average_parameter(targets, predictions, average):
+    def _get_confusion_matrix(targets, predictions):
         """
-        Check to see if average parameter is suitable for the data.
+        Calculate the confusion matrix of the labels in targets/predictions.
+
+        Same matrix as sklearn.metrics.confusion_matrix, counted with a
+        single bincount. Labels that are not small non-negative integers
+        are factorized first.
 
         Parameters:
             targets: numpy.ndarray of integers
-                The target values
+                The target values.
             predictions: numpy.ndarray of integers
-                The predicted values
+                The predicted values.
+
+        Returns:
+            labels, confusion_matrix : numpy.ndarray, numpy.ndarray of int64
+                The sorted labels present in targets or predictions and the
+                [len(labels), len(labels)] matrix with targets as rows and
+                predictions as columns.
+
+        """
+        targets = np.asarray(targets).ravel()
+        predictions = np.asarray(predictions).ravel()
+        int_targets = targets.astype(np.int64)
+        int_predictions = predictions.astype(np.int64)
+
+        num_labels = 0
+        if len(targets) and np.array_equal(int_targets, targets) and \
+                np.array_equal(int_predictions, predictions) and \
+                min(int_targets.min(), int_predictions.min()) >= 0:
+            num_labels = max(int_targets.max(), int_predictions.max()) + 1
+        if 0 < num_labels ** 2 <= max(len(targets), 2 ** 20):
+            confusion_matrix = np.bincount(
+                int_targets * num_labels + int_predictions,
+                minlength=num_labels ** 2).reshape(num_labels, num_labels)
+            present = (confusion_matrix.sum(axis=0) +
+                       confusion_matrix.sum(axis=1)) > 0
+            labels = np.flatnonzero(present)
+            confusion_matrix = confusion_matrix[np.ix_(present, present)]
+        else:
+            labels, inverse = np.unique(
+                np.concatenate([targets, predictions]), return_inverse=True)
+            num_labels = len(labels)
+            confusion_matrix = np.bincount(
+                inverse[:len(targets)] * num_labels +
+                inverse[len(targets):],
+                minlength=num_labels ** 2).reshape(num_labels, num_labels)
+        return labels, confusion_matrix
+
+    @staticmethod
+    def _get_scores_from_confusion_matrix(labels, confusion_matrix,
+                                          average=None, pos_label=1):
+        """
+        Derive the run_test classification scores from a confusion matrix.
+
+        Undefined sensitivity, ppv and f1 values are 0 as in scikit learn,
+        undefined npv values are 0 as in get_npv.
+
+        Parameters:
+            labels: numpy.ndarray
+                The sorted labels of the confusion matrix.
+            confusion_matrix: numpy.ndarray of integers
+                Matrix with targets as rows and predictions as columns.
             average: string
-                [None, ‘binary’ (def), ‘micro’, ‘macro’, ‘samples’, ‘weighted’]
-                This parameter is required for multiclass/multilabel targets.
+                [None, 'binary', 'macro']
                 If None, the scores for each class are returned.
                 Otherwise, this determines the type of averaging performed on
-                the data. See scikit learn.
+                the data.
+            pos_label: int
+                The label reported for average=binary.
 
-        Raises:
-            ValueError if `average` value invalid for type of predictions.
+        Returns:
+            scores: dict
+                The per class tp, tn, fp, fn, sensitivity, specificity, dice,
+                ppv, npv and f1 arrays and the accuracy. With average, also
+                each per class score averaged under a 'macro_' prefix, as
+                run_test reports them.
+
+        """
+        cm = np.asarray(confusion_matrix, dtype=np.float64)
+        total = cm.sum()
+        tp = np.diagonal(cm)
+        fp = cm.sum(axis=0) - tp
+        fn = cm.sum(axis=1) - tp
+        tn = total - tp - fp - fn
+
+        def zero_divide(numerator, denominator):
+            return np.divide(numerator, denominator,
+                             out=np.zeros_like(numerator),
+                             where=denominator != 0)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            specificity = tn / (tn + fp)
+            dice = 2 * tp / (2 * tp + fp + fn)
+        scores = {
+            'tp': tp.astype('float32'),
+            'tn': tn.astype('float32'),
+            'fp': fp.astype('float32'),
+            'fn': fn.astype('float32'),
+            'accuracy': zero_divide(tp.sum(), total),
+            'sensitivity': zero_divide(tp, tp + fn),
+            'specificity': specificity,
+            'dice': dice,
+            'ppv': zero_divide(tp, tp + fp),
+            'npv': zero_divide(tn, tn + fn),
+            'f1': zero_divide(2 * tp, 2 * tp + fp + fn)
+        }
+
+        if not average:
+            return scores
+
+        Metrics._check_average_counts(
+            num_target_labels=np.count_nonzero(cm.sum(axis=1)),
+            num_prediction_labels=np.count_nonzero(cm.sum(axis=0)),
+            average=average)
+        if average == "binary":
+            if pos_label not in labels:
+                raise ValueError("pos_label={} is not a valid label: "
+                                 "{}".format(pos_label, labels))
+            pos_idx = int(np.searchsorted(labels, pos_label))
+        elif average != "macro":
+            raise NotImplementedError
+
+        for name in ['sensitivity', 'specificity', 'dice', 'ppv', 'npv',
+                     'f1']:
+            if average == "macro":
+                scores['macro_' + name] = np.average(scores[name])
+            else:
+                scores['macro_' + name] = scores[name][pos_idx]
+        return scores
+
+    @staticmethod
+    def _get_class_aucs(targets, raw_predictions, num_classes):
+        """
+        Calculate the one vs rest AUC of every class from score ranks.
+
+        The AUC of a class is the normalized rank sum of its positive
+        examples (Mann-Whitney U), which equals the area under its ROC
+        curve, ties included. Needs one sort per class.
+
+        Parameters:
+            targets: numpy.ndarray of integers
+                The target values.
+            raw_predictions: numpy.ndarray of floats
+                The raw predicted values, not converted to classes.
+            num_classes: int
+                The number of classes that will be predicted.
 
         Returns:
-            boolean
+            all_class_auc: list of floats
+                The AUC of each class, nan for a class without positive or
+                negative targets.
+
+        """
+        targets = np.asarray(targets).ravel()
+        all_class_auc = []
+        for i in range(num_classes):
+            if num_classes == 1:
+                class_scores = np.asarray(raw_predictions).ravel()
+                positives = targets == 1
+            else:
+                class_scores = raw_predictions[:, i]
+                positives = targets == i
+            num_pos = np.count_nonzero(positives)
+            num_neg = len(targets) - num_pos
+            if num_pos == 0 or num_neg == 0:
+                all_class_auc += [np.nan]
+                continue
+            # Tied scores share the average of their 1-based ranks.
+            order = np.argsort(np.ascontiguousarray(class_scores))
+            sorted_scores = class_scores[order]
+            tie_starts = np.flatnonzero(np.concatenate(
+                [[True], sorted_scores[1:] != sorted_scores[:-1]]))
+            sorted_positives = positives[order]
+            if len(tie_starts) == len(sorted_scores):
+                rank_sum = np.flatnonzero(sorted_positives).sum() + num_pos
+            else:
+                tie_ends = np.append(tie_starts[1:], len(sorted_scores))
+                tie_positives = np.add.reduceat(
+                    sorted_positives.astype(np.int64), tie_starts)
+                rank_sum = np.dot(tie_positives,
+                                  (tie_starts + tie_ends + 1) / 2)
+            auc = (rank_sum - num_pos * (num_pos + 1) / 2) / \
+                (num_pos * num_neg)
+            all_class_auc += [auc]
+        return all_class_auc
+
+    @staticmethod
+    def get_all_scores(targets, raw_predictions, num_classes, average=None,
+                       pos_label=1):
+        """
+        Calculate all classification scores of run_test in one pass.
+
+        A single confusion matrix gives the per class and averaged
+        sensitivity, specificity, dice, ppv, npv, f1 and the accuracy, with
+        the same values as the corresponding get_ functions. The AUC of
+        every class is computed from one sort per class.
+
+        Parameters:
+            targets: numpy.ndarray of integers
+                The target values.
+            raw_predictions: numpy.ndarray of floats
+                The raw predicted values, not converted to classes.
+            num_classes: int
+                The number of classes that will be predicted.
+            average: string
+                [None, 'binary', 'macro']
+                If None, the scores for each class are returned.
+                Otherwise, this determines the type of averaging performed on
+                the data.
+            pos_label: int
+                The label reported for average=binary.
+
+        Returns:
+            scores: dict
+                The confusion matrix, its labels and the scores described
+                in _get_scores_from_confusion_matrix, plus the per class
+                'auc' and its average 'macro_auc'.
+
+        """
+        if isinstance(targets, torch.Tensor):
+            targets = targets.cpu().detach().numpy()
+        predictions = Metrics.transform_outputs(raw_predictions)
+
+        labels, confusion_matrix = Metrics._get_confusion_matrix(
+            targets, predictions)
+        scores = Metrics._get_scores_from_confusion_matrix(
+            labels, confusion_matrix, average=average, pos_label=pos_label)
+        scores['labels'] = labels
+        scores['confusion_matrix'] = confusion_matrix
+
+        scores['auc'] = Metrics._get_class_aucs(targets, raw_predictions,
+                                                num_classes)
+        if average == "macro":
+            scores['macro_auc'] = np.average(scores['auc'])
+        elif average == "binary":
+            scores['macro_auc'] = scores['auc'][pos_label]
+        return scores
+
+    @staticmethod
+    def _check_average_counts(num_target_labels, num_prediction_labels,
+                              average):
+        """
+        Check the average parameter against the number of labels present.
+
+        Parameters:
+            num_target_labels: int
+                The number of distinct target values.
+            num_prediction_labels: int
+                The number of distinct predicted values.
+            average: string
+                [None, ‘binary’ (def), ‘micro’, ‘macro’, ‘samples’, ‘weighted’]
+
+        Raises:
+            ValueError if `average` value invalid for type of predictions.
 
         """
         if not average:
-            return True
+            return
 
-        if np.unique(predictions).size <= 2 and np.unique(targets).size <= 2:
+        if num_prediction_labels <= 2 and num_target_labels <= 2:
             if "binary" not in average:
                 raise ValueError(
                     "You must provide binary as the average \
                     function if binary data"
                 )
 
-        if np.unique(predictions).size > 2 or np.unique(targets).size > 2:
+        if num_prediction_labels > 2 or num_target_labels > 2:
             if "binary" in average:
                 raise ValueError(
                     "You cannot provide binary as the average \
                     function if non binary data"
                 )
 
+    @staticmethod
+    def _check_average_parameter(targets, predictions, average):
+        """
+        Check to see if average parameter is suitable for the data.
+
+        Parameters:
+            targets: numpy.ndarray of integers
+                The target values
+            predictions: numpy.ndarray of integers
+                The predicted values
+            average: string
+                [None, ‘binary’ (def), ‘micro’, ‘macro’, ‘samples’, ‘weighted’]
+                This parameter is required for multiclass/multilabel targets.
+                If None, the scores for each class are returned.
+                Otherwise, this determines the type of averaging performed on
+                the data. See scikit learn.
+
+        Raises:
+            ValueError if `average` value invalid for type of predictions.
+
+        Returns:
+            boolean
+
+        """
+        if not average:
+            return True
+
+        Metrics._check_average_counts(
+            num_target_labels=np.unique(targets).size,
+            num_prediction_labels=np.unique(predictions).size,
+            average=average)
+
         return True
 
     @staticmethod
@@ -513,7 +1069,8 @@ class Metrics(object):
 
     @staticmethod
     def run_test(network, data_loader, plot=False, save_path=None,
-                 pos_label=1, transform_callable=None, **kwargs):
+                 pos_label=1, transform_callable=None, streaming=False,
+                 **kwargs):
         """
         Will conduct the test suite to determine network strength.
 
@@ -539,6 +1096,12 @@ class Metrics(object):
                 calculations.
             transform_callable: callable
                 A torch function. e.g. torch.round()
+            streaming: bool
+                Whether to score each batch as it is predicted with a
+                MetricAccumulator instead of collecting all predictions.
+                Memory no longer grows with the dataset, but the AUCs are
+                computed from binned scores, so the class outputs of the
+                network after its final transform must be probabilities.
             kwargs: dict of keyworded parameters
                 Values passed to transform callable (function parameters)
 
@@ -550,6 +1113,13 @@ class Metrics(object):
 
         if num_classes is None or num_classes == 0:
             raise ValueError('There\'s no classification layer')
+        elif streaming:
+            results_dict = Metrics._run_test_streaming(
+                network, data_loader,
+                plot=plot,
+                save_path=save_path,
+                pos_label=pos_label,
+                transform_callable=transform_callable)
         elif num_classes == 1:
             results_dict = \
                 Metrics._run_test_single_continuous(
@@ -583,7 +1153,7 @@ class Metrics(object):
             results : dict
 
         """
-        targets = np.array([v[1] for v in data_loader.dataset])
+        targets = get_targets(data_loader.dataset).cpu().numpy()
 
         predictions = network.forward_pass(
             data_loader=data_loader,
@@ -626,63 +1196,143 @@ class Metrics(object):
 
         """
         num_classes = network.num_classes
-
-        if num_classes > 2:
-            average = "macro"
-        elif num_classes == 2:
-            logger.warning("Will report scores only for pos_label, which is \
-                           set to {}".format(pos_label))
-            average = "binary"
-        else:
-            raise ValueError("Incorrect number of classes for run_test_multi."
-                             "Need to have more than one class.")
+        average = Metrics._get_test_average(num_classes, pos_label)
 
         if plot:
             logger.setLevel(logging.INFO)
 
         # getting just the y values out of the dataset
-        # TODO: store in tensor for continuity?
-        targets = np.array([v[1] for v in data_loader.dataset])
+        targets = get_targets(data_loader.dataset).cpu().numpy()
 
         raw_predictions = network.forward_pass(
             data_loader=data_loader,
             transform_callable=transform_callable
         )
 
-        predictions = Metrics.transform_outputs(raw_predictions)
+        scores = Metrics.get_all_scores(targets, raw_predictions,
+                                        num_classes, average=average,
+                                        pos_label=pos_label)
+        if plot:
+            display_confusion_matrix(scores['confusion_matrix'],
+                                     save_path=save_path)
+
+        return Metrics._report_scores(network, scores)
+
+    @staticmethod
+    def _run_test_streaming(network, data_loader, plot=False, save_path=None,
+                            pos_label=1, transform_callable=None):
+        """
+        Will conduct the test suite while accumulating scores per batch.
+
+        Same results as _run_test_single_continuous and _run_test_multi, but
+        the targets are taken from the batches of the forward pass and
+        neither targets nor predictions are kept after their batch is
+        scored. transform_callable only applies to continuous outputs, as
+        in run_test.
+
+        Parameters:
+            network: nn.Module
+                The network
+            data_loader : DataLoader
+                A DataLoader object to run the test with.
+            save_path : string
+                Folder to place images in.
+            plot: bool
+                Determine if graphs should be plotted in real time.
+            pos_label: int
+                The label that is positive in the binary case for macro
+                calculations.
+            transform_callable: callable
+                A torch function. e.g. torch.round()
+
+        Returns:
+            results : dict
+
+        """
+        num_classes = network.num_classes
+        if num_classes == 1:
+            average = None
+        else:
+            average = Metrics._get_test_average(num_classes, pos_label)
+            transform_callable = None
 
-        cm = skl_metrics.confusion_matrix(targets, predictions)
         if plot:
-            display_confusion_matrix(cm, save_path=save_path)
+            logger.setLevel(logging.INFO)
+
+        accumulator = MetricAccumulator(num_classes)
+        with torch.no_grad():
+            for data, targets in data_loader:
+                accumulator.update(
+                    network._predict_batch(data, transform_callable),
+                    targets)
+        scores = accumulator.finalize(average=average, pos_label=pos_label)
 
-        tp, tn, fp, fn = Metrics.get_confusion_matrix_values(targets,
-                                                             predictions)
+        if num_classes == 1:
+            logger.info('{} test\'s results'.format(network.name))
+            logger.info('\nMean Squared Error: {}'.format(scores['mse']))
+            return scores
 
-        sensitivity = Metrics.get_sensitivity(targets, predictions)
-        sensitivity_macro = Metrics.get_sensitivity(targets, predictions,
-                                                    average=average)
+        if plot:
+            display_confusion_matrix(scores['confusion_matrix'],
+                                     save_path=save_path)
+        return Metrics._report_scores(network, scores)
 
-        specificity = Metrics.get_specificity(targets, predictions)
-        specificity_macro = Metrics.get_specificity(targets, predictions,
-                                                    average=average)
+    @staticmethod
+    def _get_test_average(num_classes, pos_label=1):
+        """
+        Choose the averaging of the run_test classification scores.
 
-        dice = Metrics.get_dice(targets, predictions)
-        dice_macro = Metrics.get_dice(targets, predictions, average=average)
+        Parameters:
+            num_classes: int
+                The number of classes that will be predicted.
+            pos_label: int
+                The label that is positive in the binary case.
 
-        ppv = Metrics.get_ppv(targets, predictions)
-        ppv_macro = Metrics.get_ppv(targets, predictions, average=average)
+        Returns:
+            average: string
+                'macro' for more than two classes, 'binary' for two.
 
-        npv = Metrics.get_npv(targets, predictions)
-        npv_macro = Metrics.get_npv(targets, predictions, average=average)
+        """
+        if num_classes > 2:
+            return "macro"
+        elif num_classes == 2:
+            logger.warning("Will report scores only for pos_label, which is \
+                           set to {}".format(pos_label))
+            return "binary"
+        raise ValueError("Incorrect number of classes for run_test_multi."
+                         "Need to have more than one class.")
 
-        accuracy = Metrics.get_accuracy(targets, predictions)
+    @staticmethod
+    def _report_scores(network, scores):
+        """
+        Log the run_test classification scores and collect the results.
 
-        f1 = Metrics.get_f1(targets, predictions)
-        f1_macro = Metrics.get_f1(targets, predictions, average=average)
+        Parameters:
+            network: nn.Module
+                The network
+            scores: dict
+                The scores as returned by get_all_scores.
 
-        auc = Metrics.get_auc(targets, raw_predictions, num_classes)
-        auc_macro = Metrics.get_auc(targets, raw_predictions, num_classes,
-                                    average=average)
+        Returns:
+            results : dict
+
+        """
+        tp, tn, fp, fn = (scores[k] for k in ['tp', 'tn', 'fp', 'fn'])
+        accuracy = scores['accuracy']
+        sensitivity = scores['sensitivity']
+        sensitivity_macro = scores['macro_sensitivity']
+        specificity = scores['specificity']
+        specificity_macro = scores['macro_specificity']
+        dice = scores['dice']
+        dice_macro = scores['macro_dice']
+        ppv = scores['ppv']
+        ppv_macro = scores['macro_ppv']
+        npv = scores['npv']
+        npv_macro = scores['macro_npv']
+        f1 = scores['f1']
+        f1_macro = scores['macro_f1']
+        auc = scores['auc']
+        auc_macro = scores['macro_auc']
 
         logger.info('{} test\'s results'.format(network.name))
 
@@ -738,7 +1388,8 @@ class Metrics(object):
     def bootfold_p_estimate(network, data_loader, n_samples, k, epochs,
                             index_to_iter, ls_feat_vals, retain_graph=None,
                             valid_interv=4, plot=False,
-                            save_path=None, **kwargs):
+                            save_path=None, n_workers=1, torch_threads=None,
+                            ci_width=None, **kwargs):
         """
         Performs bootfold - estimation to identify whether training model
         provides statistically significant
@@ -771,49 +1422,67 @@ class Metrics(object):
                 Whether or not to plot all results in prompt and charts.
             save_path : str
                 Where to save all figures and results.
+            n_workers : int
+                The number of worker processes the replicates run in. 1 runs
+                them one after another in this process. Above 1, network
+                is pickled to the workers and must be picklable.
+            torch_threads : int or None
+                The number of torch threads per worker process. Defaults to
+                the number of cpu cores divided by n_workers.
+            ci_width : float or None
+                Stop before n_samples replicates once the 95% confidence
+                interval of the p value is at most this wide.
             kwargs: dict of keyworded parameters
                 Values passed to transform callable (function parameters)
 
         Returns:
             p_value : float
         """
-        ls_imprv_scores = []
-
-        rand_sample = data.RandomSampler(data_loader.dataset, replacement=True)
-        data_loader_args = inspect.signature(data.DataLoader.__init__)
-        new_params = {}
-
-        for param in data_loader_args.parameters:
-            if param == "self":
-                continue
-            elif param == "shuffle":
-                continue
-            elif param == "sampler":
-                new_params["sampler"] = rand_sample
-            elif param == "batch_sampler":
-                new_params["batch_sampler"] = None
-            else:
-                new_params[param] = getattr(data_loader, param)
+        if not isinstance(n_workers, int) or n_workers < 1:
+            raise ValueError("n_workers must be a positive integer.")
+        if n_workers > 1:
+            _check_picklable(network=network)
+
+        # One seed per replicate, so the scores do not depend on n_workers.
+        seeds = torch.randint(2 ** 31 - 1, [n_samples]).tolist()
+        replicate_params = (
+            dict(network=network, dataset=data_loader.dataset,
+                 batch_size=data_loader.batch_size, k=k, epochs=epochs,
+                 retain_graph=retain_graph, valid_interv=valid_interv,
+                 plot=plot, save_path=save_path, index_to_iter=index_to_iter,
+                 ls_feat_vals=ls_feat_vals, seed=seed)
+            for seed in seeds)
 
-        dl_sample = data.DataLoader(**new_params)
-
-        for samp in range(n_samples):
-            imprv_score = Metrics._boot_cv(network, dl_sample, k, epochs,
-                                           retain_graph, valid_interv, plot,
-                                           save_path, index_to_iter,
-                                           ls_feat_vals)
-            ls_imprv_scores.append(imprv_score)
+        ls_imprv_scores = []
+        score_below_zero = 0
+        replicates = _iter_in_order(_boot_replicate, replicate_params,
+                                    n_workers, torch_threads)
+        try:
+            for imprv_score in replicates:
+                ls_imprv_scores.append(imprv_score)
+                score_below_zero += imprv_score <= 0.0
+                num_replicates = len(ls_imprv_scores)
+                if ci_width is not None and num_replicates < n_samples and \
+                        _wilson_interval_width(score_below_zero,
+                                               num_replicates) <= ci_width:
+                    logger.info(
+                        "P value confidence interval narrower than %f "
+                        "after %d of %d replicates. Stopping.",
+                        ci_width, num_replicates, n_samples)
+                    break
+        finally:
+            replicates.close()
 
-        tot_num_imprv = float(len(ls_imprv_scores))
-        score_below_zero = sum(val <= 0.0 for val in ls_imprv_scores)
         # calculate p value based on change of not improving
-        p_val = float(score_below_zero)/float(tot_num_imprv)
+        p_val = float(score_below_zero)/float(len(ls_imprv_scores))
         logger.info("Improvement scores: {}"
                     .format(', '.join(map(str, ls_imprv_scores))))
         logger.info("P value for bootfold p estimate: %f.", p_val)
+        return p_val
 
+    @staticmethod
     def _boot_cv(network, data_loader, k, epochs, retain_graph, valid_interv,
-                 save_path, plot, index_to_iter, ls_feat_vals):
+                 plot, save_path, index_to_iter, ls_feat_vals):
         """
         Perform a custom cross validation for bootstrapped p estimation.
 
@@ -833,6 +1502,8 @@ class Metrics(object):
                 Specifies after how many epochs validation should occur.
             plot : boolean
                 Whether or not to plot all results in prompt and charts.
+            save_path : str
+                Where to save all figures and results.
             index_to_iter : string
                 Index of feature within data_loader who's values will be
                 iterated to assess difference
@@ -887,17 +1558,16 @@ class Metrics(object):
                     train_loader, val_loader, epochs,
                     retain_graph=retain_graph,
                     valid_interv=valid_interv, plot=plot, save_path=save_path)
-                dct_scores = _get_probs(network, val_loader, index_to_iter,
-                                        ls_feat_vals)
+                dct_scores = _get_probs(cross_val_network, val_loader,
+                                        index_to_iter, ls_feat_vals)
                 dct_filtered = _filter_matched_subj(dct_scores, val_loader,
                                                     index_to_iter)
                 for ind in dct_filtered:
                     dct_filtered_subj[ind].append(dct_filtered[ind])
                     ls_filtered_probs.append(dct_filtered[ind])
             v_p = np.array(ls_filtered_probs).mean()
-            ls_pos_rate = [subj for subj in data_loader.dataset if
-                           subj[1].item() == 1]
-            v_t = float(len(ls_pos_rate)/len(data_loader.dataset)) * 100
+            num_pos = (get_targets(data_loader.dataset) == 1).sum().item()
+            v_t = float(num_pos/len(data_loader.dataset)) * 100
             improvement_score = float(v_p/v_t)
             if np.isnan(improvement_score):
                 improvement_score = 0.0
@@ -930,7 +1600,7 @@ class Metrics(object):
         # the target column exists in the second tensor
         # and the training data in the first tensor.
         if strata_column == "class_label":
-            sr = pd.Series(dataset.tensors[1].numpy())
+            sr = pd.Series(get_targets(dataset).numpy())
         else:
             # just let it fail if it doesn't work
             # does not work for complex multidimensional data
@@ -960,6 +1630,7 @@ class Metrics(object):
                        transform_callable=None,
                        stratified=False,
                        strata_column="class_label",
+                       n_workers=1, torch_threads=None,
                        **kwargs):
         """
         Perform k-fold cross validation given a Network and DataLoader object.
@@ -992,6 +1663,18 @@ class Metrics(object):
             strata_column: string or int
                 Either "class_label" or integer index of column.
                 Default "class_label"
+            n_workers : int
+                The number of worker processes the folds are trained in.
+                1 trains them one after another in this process. Each fold
+                is seeded from the torch random state, so parallel runs are
+                reproducible with set_global_seed but differ from sequential
+                ones. Above 1, network, transform_callable and kwargs are
+                pickled to the workers and must be picklable, so use a
+                module level function rather than a lambda as
+                transform_callable.
+            torch_threads : int or None
+                The number of torch threads per worker process. Defaults to
+                the number of cpu cores divided by n_workers.
             kwargs: dict of keyworded parameters
                 Values passed to transform callable (function parameters)
 
@@ -1002,6 +1685,12 @@ class Metrics(object):
                 If average_results is off, return dict of float lists.
 
         """
+        if not isinstance(n_workers, int) or n_workers < 1:
+            raise ValueError("n_workers must be a positive integer.")
+        if n_workers > 1:
+            _check_picklable(network=network,
+                             transform_callable=transform_callable, **kwargs)
+
         all_results = defaultdict(lambda: [])
 
         # TODO: this whole section is really clunky
@@ -1029,38 +1718,28 @@ class Metrics(object):
         # Set to true if RandomSampler exists.
         shuffle = isinstance(data_loader.sampler, data.sampler.RandomSampler)
 
-        try:
-            for fold in range(k):
-
-                # TODO: this may break on different devices?? test.
-                # TODO: Re-initialize instead of deepcopy?
-                cross_val_network = copy.deepcopy(network)
-
-                # TODO: properly pass params
-
-                # Generate fold training set.
-                train_dataset = data.ConcatDataset(
-                    dataset_splits[:fold] + dataset_splits[fold+1:])
-                # Generate fold validation set.
-                val_dataset = dataset_splits[fold]
-                # Generate fold training data loader object.
-                train_loader = data.DataLoader(
-                    train_dataset, batch_size=batch_size, shuffle=shuffle)
-                # Generate fold validation data loader object.
-                val_loader = data.DataLoader(
-                    val_dataset, batch_size=batch_size)
-                # Train network on fold training data loader.
-                cross_val_network.fit(
-                    train_loader, val_loader, epochs,
-                    retain_graph=retain_graph,
-                    valid_interv=valid_interv, plot=plot, save_path=save_path)
-                # Validate network performance on validation data loader.
-                results = Metrics.run_test(
-                    cross_val_network, val_loader,
-                    save_path=save_path, plot=plot,
-                    transform_callable=transform_callable,
-                    **kwargs)
+        # Generate the training and validation set of every fold.
+        folds = [(data.ConcatDataset(dataset_splits[:fold] +
+                                     dataset_splits[fold+1:]),
+                  dataset_splits[fold])
+                 for fold in range(k)]
+        # Worker processes start from their own random state, so their
+        # folds are seeded. In process, the folds keep using the global one.
+        if n_workers == 1:
+            seeds = [None] * k
+        else:
+            seeds = torch.randint(2 ** 31 - 1, [k]).tolist()
+        fold_params = [
+            dict(network=network, train_dataset=train_dataset,
+                 val_dataset=val_dataset, batch_size=batch_size,
+                 shuffle=shuffle, epochs=epochs, retain_graph=retain_graph,
+                 valid_interv=valid_interv, plot=plot, save_path=save_path,
+                 transform_callable=transform_callable, seed=seed, **kwargs)
+            for (train_dataset, val_dataset), seed in zip(folds, seeds)]
 
+        try:
+            for results in _iter_in_order(_fit_and_test_fold, fold_params,
+                                          n_workers, torch_threads):
                 logger.info(results)
                 for m in results:
                     all_results[m].append(results[m])
@@ -1085,11 +1764,16 @@ class Metrics(object):
 
     @staticmethod
     def conduct_sensitivity_analysis(network, data_loader, filename,
-                                     features=None, cutoff=20):
+                                     features=None, cutoff=20,
+                                     batch_size=4096):
         """
         Will conduct tests to figure out directionality of features by finding all the unique feature values present in
         the dataset and setting the feature for all examples to every unique value of that feature.
 
+        All (feature, value) perturbations of a chunk of examples are built
+        by broadcasting and several of them are scored per forward batch.
+        The class counts are accumulated on the network's device.
+
         Parameters
         ----------
             network : BaseNetwork
@@ -1103,6 +1787,8 @@ class Metrics(object):
             cutoff: int
                 Maximum number of unique feature values for a particular
                 feature that will be tested
+            batch_size: int
+                Number of perturbed examples per forward batch
 
         Returns
         -------
@@ -1110,27 +1796,26 @@ class Metrics(object):
         different classes when altering the input to constant feature values
         """
 
-        if network._num_classes is None or network._num_classes == 0:
+        if network.num_classes is None or network.num_classes < 2:
             raise ValueError('There\'s no classification layer')
+        num_classes = network.num_classes
 
-        if features is None:
-            features = [i for i in range(data_loader.dataset[:][0].shape[1])]
+        inputs = _collect_inputs(data_loader.dataset)
+        num_rows, num_features = inputs.shape
 
-        test_df = None
-        col_headers = None
+        if features is None:
+            features = [i for i in range(num_features)]
 
+        # Every (feature, value) perturbation to test.
+        perturbed_features = []
+        perturbed_values = []
         for feature_idx in range(len(features)):
-            feature_val_list = data_loader.dataset[:][0][
-                               :, feature_idx].tolist()
-
-            unique_feature_values = list(set(feature_val_list))
+            unique_feature_values = np.unique(inputs[:, feature_idx].numpy())
 
             if len(unique_feature_values) > cutoff:
-                logger.info("================================")
                 logger.info("Cutting off number of features to be tested for "
                             "feature {} from {} to {}".format(
                     features[feature_idx], len(unique_feature_values), cutoff))
-                logger.info("================================")
 
                 # unique_feature_values are sorted, this next line
                 # pulls cutoff num of features evenly spaced from the list of
@@ -1138,44 +1823,233 @@ class Metrics(object):
                 # than the cutoff
                 unique_feature_values = unique_feature_values[0::math.ceil(
                         len(unique_feature_values) / cutoff)]
-            data_loader_temp = copy.deepcopy(data_loader)
-            for unique_feature_idx in range(len(unique_feature_values)):
-                data_loader_temp.dataset[:][0][:, feature_idx] = \
-                    unique_feature_values[unique_feature_idx]
-                logger.info("Testing value {} for feature {}".format(
-                    unique_feature_values[unique_feature_idx],
-                    features[feature_idx]))
+            perturbed_features.extend(
+                [feature_idx] * len(unique_feature_values))
+            perturbed_values.extend(unique_feature_values.tolist())
+
+        num_perturbations = len(perturbed_values)
+        perturbed_features = torch.tensor(perturbed_features)
+        perturbed_values = torch.tensor(perturbed_values, dtype=inputs.dtype)
+        class_counts = torch.zeros([num_perturbations, num_classes],
+                                   dtype=torch.long, device=network.device)
+
+        # Score chunks of rows under several perturbations per batch.
+        chunk_len = max(1, min(num_rows, batch_size))
+        group_len = max(1, batch_size // chunk_len)
+        with torch.no_grad():
+            for row_start in range(0, num_rows, chunk_len):
+                chunk = inputs[row_start:row_start + chunk_len]
+                for start in range(0, num_perturbations, group_len):
+                    group = slice(start, start + group_len)
+                    num_group = len(perturbed_values[group])
+                    batch = chunk.unsqueeze(0).expand(
+                        num_group, *chunk.shape).clone()
+                    batch[torch.arange(num_group), :,
+                          perturbed_features[group]] = \
+                        perturbed_values[group].unsqueeze(1)
+                    predictions = torch.argmax(
+                        network(batch.view(-1, num_features)), dim=1)
+                    # Offset the classes of each perturbation so that one
+                    # bincount counts every perturbation of the batch.
+                    offsets = torch.arange(
+                        num_group, device=predictions.device) * num_classes
+                    predictions += offsets.repeat_interleave(len(chunk))
+                    class_counts[group] += torch.bincount(
+                        predictions,
+                        minlength=num_group * num_classes).view(
+                            num_group, num_classes)
+
+        class_counts = class_counts.cpu().numpy()
+        test_df = pd.DataFrame({
+            "Feature": [features[i] for i in perturbed_features.tolist()],
+            "Value": perturbed_values.numpy()})
+        for i in range(num_classes):
+            test_df["Number of examples classified as class " + str(i)] = \
+                class_counts[:, i]
+        test_df.to_csv("{}.csv".format(filename), index=False)
+        return test_df
 
-                targets = data_loader.dataset[:][1].tolist()
 
-                raw_predictions = network.forward_pass(
-                    data_loader=data_loader_temp)
+class MetricAccumulator(object):
+    """
+    Accumulate the run_test scores of predictions batch by batch.
+
+    Keeps confusion counts, squared error sums and per class histograms of
+    the predicted scores on the device of the predictions, so memory does
+    not depend on the number of scored rows. The AUCs are computed from the
+    histograms: scores falling in the same of the num_bins bins over [0, 1]
+    count as ties. Class scores must therefore be probabilities, e.g. the
+    softmax outputs of the network final transform. Logits or other scores
+    outside [0, 1] would mostly fall in the end bins, so finalize raises a
+    ValueError if any were accumulated.
+
+    Parameters:
+        num_classes: int
+            The number of classes the network predicts, 1 for a single
+            continuous value.
+        num_bins: int
+            The number of score bins used for the AUCs.
 
-                predictions = Metrics.transform_outputs(raw_predictions)
+    """
 
-                tp, _, fp, _ = Metrics.get_confusion_matrix_values(targets,
-                                                                   predictions)
+    def __init__(self, num_classes, num_bins=1000):
+        """Initialize empty counts."""
+        if num_classes is None or num_classes < 1:
+            raise ValueError("num_classes must be a positive integer.")
+        if num_bins < 1:
+            raise ValueError("num_bins must be a positive integer.")
+        self.num_classes = num_classes
+        self.num_bins = num_bins
+        self.reset()
+
+    def reset(self):
+        """Discard all accumulated counts."""
+        self._confusion_counts = None
+        self._positive_hist = None
+        self._score_hist = None
+        self._out_of_range_count = None
+        self._squared_error_sum = None
+        self._count = 0
+
+    def update(self, predictions, targets):
+        """
+        Add a batch of predictions to the counts.
 
-                # print(raw_predictions)
-                # print(predictions)
+        Parameters:
+            predictions: torch.Tensor
+                The network outputs of the batch after the final transform,
+                [batch, num_classes] class probabilities or the continuous
+                values.
+            targets: torch.Tensor
+                The target values of the batch.
 
-                if test_df is None and col_headers is None:
-                    col_headers = ["Feature", "Value"]
-                    for i in range(network._num_classes):
-                        col_headers.append("Number of examples classified as "
-                                           "class " + str(i))
-                    test_df = pd.DataFrame(columns=col_headers)
+        """
+        predictions = torch.as_tensor(predictions)
+        targets = torch.as_tensor(targets).to(predictions.device)
+        if self.num_classes == 1:
+            self._update_continuous(predictions, targets)
+        else:
+            self._update_classes(predictions, targets)
+        self._count += len(predictions)
+
+    def _update_continuous(self, predictions, targets):
+        """Add the squared errors of a batch of continuous predictions."""
+        targets = targets.reshape(predictions.shape)
+        squared_error = (predictions.double() - targets.double()) ** 2
+        if self._squared_error_sum is None:
+            self._squared_error_sum = squared_error.new_zeros([])
+        self._squared_error_sum += squared_error.sum()
+
+    def _update_classes(self, predictions, targets):
+        """Add a batch of class scores to the confusion and AUC counts."""
+        num_classes, num_bins = self.num_classes, self.num_bins
+        device = predictions.device
+        if self._confusion_counts is None:
+            self._confusion_counts = torch.zeros(
+                num_classes ** 2, dtype=torch.long, device=device)
+            self._positive_hist = torch.zeros(
+                num_classes * num_bins, dtype=torch.long, device=device)
+            self._score_hist = torch.zeros_like(self._positive_hist)
+            self._out_of_range_count = torch.zeros(
+                [], dtype=torch.long, device=device)
+
+        # Same class conversion as Metrics.transform_outputs
+        predictions = predictions.reshape(len(predictions), -1)
+        classes = torch.argmax(predictions, dim=1)
+        targets = targets.reshape(-1).long()
+        if len(targets) and (targets.min() < 0 or
+                             targets.max() >= num_classes):
+            raise ValueError("Targets must be class indices below "
+                             "num_classes={}.".format(num_classes))
+        self._confusion_counts += torch.bincount(
+            targets * num_classes + classes, minlength=num_classes ** 2)
+
+        # Counted on the device and checked once in finalize.
+        self._out_of_range_count += ((predictions < 0) |
+                                     (predictions > 1)).sum()
+        # Flat histogram index of every (row, class) score.
+        bins = (predictions.float() * num_bins).long().clamp_(0, num_bins - 1)
+        bins += torch.arange(num_classes, device=device) * num_bins
+        self._score_hist += torch.bincount(
+            bins.reshape(-1), minlength=num_classes * num_bins)
+        positive_bins = bins.gather(1, targets.unsqueeze(1)).reshape(-1)
+        self._positive_hist += torch.bincount(
+            positive_bins, minlength=num_classes * num_bins)
+
+    def finalize(self, average=None, pos_label=1):
+        """
+        Calculate the scores of all accumulated predictions.
 
-                row_to_append = [features[feature_idx],
-                                 unique_feature_values[unique_feature_idx]]
+        Parameters:
+            average: string
+                [None, 'binary', 'macro']
+                If None, the scores for each class are returned.
+                Otherwise, this determines the type of averaging performed on
+                the data.
+            pos_label: int
+                The label reported for average=binary.
 
-                row_to_append = row_to_append + [tp_i + fp_i for (tp_i, fp_i)
-                                                 in zip(tp, fp)]
+        Returns:
+            scores: dict
+                {'mse': float} for continuous predictions, otherwise the
+                same scores as Metrics.get_all_scores.
 
-                df = pd.DataFrame(np.array(row_to_append).reshape(1, -1),
-                                  columns=col_headers)
-                test_df = test_df.append(df)
-            logger.info("***************************")
-        test_df.to_csv("{}.csv".format(filename), index=False)
-        return test_df
+        """
+        if self._count == 0:
+            raise ValueError("No predictions were accumulated.")
+        if self.num_classes == 1:
+            return {'mse': self._squared_error_sum.item() / self._count}
+
+        out_of_range_count = self._out_of_range_count.item()
+        if out_of_range_count:
+            raise ValueError(
+                "{} class scores are outside [0, 1]. The binned AUCs need "
+                "probabilities, e.g. softmax outputs. Score raw outputs "
+                "with streaming=False.".format(out_of_range_count))
+
+        num_classes = self.num_classes
+        confusion_matrix = self._confusion_counts.reshape(
+            num_classes, num_classes).cpu().numpy()
+        # Only the labels present in targets or predictions, as
+        # sklearn.metrics.confusion_matrix.
+        present = (confusion_matrix.sum(axis=0) +
+                   confusion_matrix.sum(axis=1)) > 0
+        labels = np.flatnonzero(present)
+        confusion_matrix = confusion_matrix[np.ix_(present, present)]
+
+        scores = Metrics._get_scores_from_confusion_matrix(
+            labels, confusion_matrix, average=average, pos_label=pos_label)
+        scores['labels'] = labels
+        scores['confusion_matrix'] = confusion_matrix
+
+        scores['auc'] = self._get_class_aucs()
+        if average == "macro":
+            scores['macro_auc'] = np.average(scores['auc'])
+        elif average == "binary":
+            scores['macro_auc'] = scores['auc'][pos_label]
+        return scores
 
+    def _get_class_aucs(self):
+        """
+        Calculate the one vs rest AUC of every class from the histograms.
+
+        Returns:
+            all_class_auc: list of floats
+                The AUC of each class, nan for a class without positive or
+                negative targets.
+
+        """
+        shape = [self.num_classes, self.num_bins]
+        positive_hist = self._positive_hist.reshape(shape).cpu().numpy()
+        negative_hist = self._score_hist.reshape(shape).cpu().numpy() - \
+            positive_hist
+        num_pos = positive_hist.sum(axis=1)
+        num_neg = negative_hist.sum(axis=1)
+        # Negatives in lower bins rank below, same bin negatives are ties.
+        negatives_below = np.cumsum(negative_hist, axis=1) - negative_hist
+        pairs = (positive_hist * (negatives_below + negative_hist / 2)).sum(
+            axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            all_class_auc = np.where((num_pos > 0) & (num_neg > 0),
+                                     pairs / (num_pos * num_neg), np.nan)
+        return all_class_auc.tolist()
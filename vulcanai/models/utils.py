@@ -1,77 +1,135 @@
 # coding=utf-8
 """Define utilities for all networks."""
 from math import ceil, floor
+import queue
+import threading
+
 import torch
 import torch.nn as nn
 import torch.nn.functional as f
-from torch.utils.data import DataLoader, TensorDataset
+from torch.utils.data import (DataLoader, TensorDataset, BatchSampler,
+                              SequentialSampler)
 
 import numpy as np
 import math
 from sklearn.preprocessing import LabelBinarizer
 from collections import OrderedDict
 from collections import defaultdict
+from collections import deque
+
+
+def _collect_inputs(dataset, batch_size=1024):
+    """
+    Return the inputs of a dataset as one tensor, in dataset order.
+
+    Parameters:
+        dataset : torch.utils.data.Dataset
+            Dataset of (input, target) items with tensor inputs.
+        batch_size : int
+            The number of items collated at a time.
+
+    Returns:
+        inputs : torch.Tensor
+            The stacked inputs of shape [len(dataset), *input_shape].
+
+    """
+    return torch.cat([data for data, _ in
+                      DataLoader(dataset, batch_size=batch_size)])
 
 
-def _get_probs(network, loader, index_to_iter, ls_feat_vals):
+def _get_probs(network, loader, index_to_iter, ls_feat_vals,
+               batch_size=1024):
     """Returns probability for each object within loader based on output
     from training neural network
 
+    Every subject is scored with its own value of the feature and with the
+    feature set to each value of ls_feat_vals. All (subject, value) rows are
+    built in one tensor and scored in batches of batch_size. The dataset of
+    loader is not modified.
+
     Parameters:
         network : vulcan.model
             training vulcan network
         loader : torch.dataloader
             dataloader containing validation set
-        index_to_iter : string
-            feature to iterate through adjusting values
+        index_to_iter : int
+            index of the feature to iterate through adjusting values
         ls_feat_vals : list
             values to iterate through for feature in index_to_iter
+        batch_size : int
+            number of rows per forward pass
 
     Returns:
         dct_scores : dictionary
-            dictionary of scores
+            dictionary of scores, keyed by the position of each subject in
+            loader.dataset and then by feature value
     """
-
+    # Collected in dataset order, whatever the sampler of loader is.
+    inputs = _collect_inputs(loader.dataset, batch_size=batch_size)
+    num_subj = len(inputs)
+    num_vals = len(ls_feat_vals)
+    orig_vals = inputs[:, index_to_iter].tolist()
+
+    # Subject i fills rows i * (num_vals + 1) onwards: first as is, then
+    # with the feature set to each value of ls_feat_vals.
+    grid = inputs.repeat_interleave(num_vals + 1, dim=0)
+    grid.view(num_subj, num_vals + 1, -1)[:, 1:, index_to_iter] = \
+        torch.tensor(ls_feat_vals, dtype=grid.dtype)
+    grid_dataset = TensorDataset(grid, torch.zeros(len(grid)))
+    grid_loader = DataLoader(
+        grid_dataset,
+        sampler=BatchSampler(SequentialSampler(grid_dataset), batch_size,
+                             drop_last=False),
+        batch_size=None)
+
+    # Standardize probability of positive label
+    probs = network.forward_pass(data_loader=grid_loader)[:, 1] * 100
+    probs = np.round(probs, 2).reshape(num_subj, num_vals + 1).tolist()
+
+    # Add probability to scores dictionary where keys are the index
+    # and value the probability belongs to.
     dct_scores = defaultdict()
-    for index in range(len(loader)):
-        dct_scores[index] = {}
-    for index in range(len(loader)):
-        # Extract specific index from loader and create a DataLoader instance
-        # to send to forward_pass
-        input_loader = DataLoader(TensorDataset(loader.dataset[index][0]
-                                                .unsqueeze(0),
-                                                loader.dataset[index][1]
-                                                .unsqueeze(0)))
-
-        subj_prob = network.forward_pass(data_loader=input_loader,
-                                         transform_outputs=False)
-        # Standardize probability of positive label
-        subj_prob = subj_prob[0][1] * 100
-        subj_prob = round(subj_prob, 2)
-        # Add probability to scores dictionary where keys are the index
-        # and value the probability belongs to.
-        dct_scores[index][loader.dataset[index][0][index_to_iter].item()] = \
-            subj_prob
-        # Iterate through other possible values and find probability of
-        # positive label and add to dictionary
-        # for current index.
-        for new_val in ls_feat_vals:
-            if new_val != loader.dataset[index][0][index_to_iter].item():
-                loader.dataset[index][0][index_to_iter] = new_val
-                input_loader = DataLoader(TensorDataset(loader
-                                                        .dataset[index][0]
-                                                        .unsqueeze(0),
-                                                        loader
-                                                        .dataset[index][1]
-                                                        .unsqueeze(0)))
-                subj_prob = network.forward_pass(data_loader=input_loader,
-                                                 ransform_outputs=False)
-                subj_prob = subj_prob[0][1] * 100
-                subj_prob = round(subj_prob, 2)
+    for index, (orig_val, subj_probs) in enumerate(zip(orig_vals, probs)):
+        dct_scores[index] = {orig_val: subj_probs[0]}
+        for new_val, subj_prob in zip(ls_feat_vals, subj_probs[1:]):
+            if new_val != orig_val:
                 dct_scores[index][new_val] = subj_prob
     return dct_scores
 
 
+class _RecordingBatchSampler(object):
+    """
+    Wrap a batch sampler and remember the batches it hands out.
+
+    Lets a consumer of the DataLoader recover which dataset indices each
+    batch was built from. DataLoader yields batches in sampler order, so the
+    recorded batches are popped in the same order. Only the batches that
+    have been sampled but not yet consumed are kept.
+
+    Parameters:
+        batch_sampler : iterable of list of int
+            The batch sampler to wrap.
+
+    """
+
+    def __init__(self, batch_sampler):
+        self.batch_sampler = batch_sampler
+        self._pending = deque()
+
+    def __iter__(self):
+        self._pending.clear()
+        for batch in self.batch_sampler:
+            self._pending.append(batch)
+            yield batch
+
+    def __len__(self):
+        return len(self.batch_sampler)
+
+    def pop_batch(self):
+        """Return the indices of the oldest unconsumed batch."""
+        return np.asarray(self._pending.popleft(), dtype=np.int64)
+
+
 def _filter_matched_subj(dct_scores, loader, index_to_iter):
     """
     Returns dictionary of filtered keys based on predicted value and value
@@ -93,8 +151,7 @@ def _filter_matched_subj(dct_scores, loader, index_to_iter):
         highest_prob = max(dct_scores[subj].values())
         highest_val = [val for val, prob in dct_scores[subj].items()
                        if prob == highest_prob]
-        if loader.dataset.dataset[subj][0][index_to_iter].item() \
-                in highest_val:
+        if loader.dataset[subj][0][index_to_iter].item() in highest_val:
             dct_filtered[subj] = highest_prob
     return dct_filtered
 
@@ -351,6 +408,167 @@ def set_tensor_device(data, device=None):
     return data
 
 
+def split_batch(data, num_splits):
+    """
+    Split a batch of data tensors into micro-batches along the batch dim.
+
+    Nested lists of tensors, as used by multi-input networks, are split
+    element-wise so every micro-batch keeps the structure of data. All
+    tensors must share the same batch length.
+
+    Parameters:
+        data : torch.tensor or list
+            The batch to split.
+        num_splits : int
+            The number of micro-batches to split into. Fewer are returned
+            when the batch has fewer rows.
+
+    Returns:
+        micro_batches : list
+            The micro-batches, in order, each shaped like data.
+
+    """
+    if not isinstance(data, (list, tuple)):
+        return list(torch.chunk(data, num_splits))
+    splits = [split_batch(d, num_splits) for d in data]
+    return [list(micro_batch) for micro_batch in zip(*splits)]
+
+
+def _pin_tensors(data):
+    """Return data with its cpu tensors in pinned memory."""
+    if isinstance(data, (list, tuple)):
+        return [_pin_tensors(d) for d in data]
+    if data.device.type == 'cpu' and not data.is_pinned():
+        return data.pin_memory()
+    return data
+
+
+def _clone_tensors(data):
+    """Return data with copies of its tensors."""
+    if isinstance(data, (list, tuple)):
+        return [_clone_tensors(d) for d in data]
+    return data.clone()
+
+
+def _record_stream(data, stream):
+    """Mark the cuda tensors of data as used by stream."""
+    if isinstance(data, (list, tuple)):
+        for d in data:
+            _record_stream(d, stream)
+    elif data.is_cuda:
+        data.record_stream(stream)
+
+
+# Put on the batch queue by the BatchPrefetcher thread once the loader is
+# exhausted.
+_END_OF_BATCHES = object()
+
+
+class BatchPrefetcher(object):
+    """
+    Load the batches of a DataLoader ahead on a background thread.
+
+    A worker thread iterates over the loader and moves every batch to the
+    device with set_tensor_device, keeping up to num_batches of them ready,
+    so the training loop only waits for a batch when the loader is slower
+    than the network. On cuda, batches are pinned and copied on a separate
+    stream. Errors of the loader are raised when the batch is requested.
+    Loaders with a true reuses_buffers attribute, like MultiInputLoader,
+    overwrite a batch once the next one is requested, so their batches are
+    copied before they are kept.
+
+    Parameters:
+        loader : DataLoader
+            The loader of (data, targets) batches.
+        device : str or torch.device
+            The device to move the batches to.
+        num_batches : int
+            The number of batches to keep ready.
+
+    """
+
+    def __init__(self, loader, device=None, num_batches=2):
+        """Initialize a prefetcher over a loader."""
+        if not isinstance(num_batches, int) or num_batches < 1:
+            raise ValueError("num_batches must be a positive integer.")
+        self.loader = loader
+        self.device = torch.device(device) if device is not None else None
+        self.num_batches = num_batches
+        self.is_cuda = self.device is not None and \
+            self.device.type == 'cuda'
+        self._stream = torch.cuda.Stream(self.device) if self.is_cuda \
+            else None
+
+    @property
+    def dataset(self):
+        """The dataset of the loader."""
+        return self.loader.dataset
+
+    def __len__(self):
+        return len(self.loader)
+
+    def __iter__(self):
+        ready_batches = queue.Queue(maxsize=self.num_batches)
+        stop = threading.Event()
+        worker = threading.Thread(target=self._fill,
+                                  args=(ready_batches, stop), daemon=True)
+        worker.start()
+        try:
+            while True:
+                batch = ready_batches.get()
+                if batch is _END_OF_BATCHES:
+                    break
+                if isinstance(batch, BaseException):
+                    raise batch
+                if self.is_cuda:
+                    _record_stream(batch, torch.cuda.current_stream(
+                        self.device))
+                yield batch
+        finally:
+            stop.set()
+            # Unblock the worker if it waits for a place in the queue.
+            while not ready_batches.empty():
+                ready_batches.get_nowait()
+            worker.join()
+
+    def _fill(self, ready_batches, stop):
+        """
+        Load and move batches until the loader is exhausted.
+
+        Runs on the worker thread.
+
+        Parameters:
+            ready_batches : queue.Queue
+                [data, targets] batches on the device, ready to be used.
+            stop : threading.Event
+                Set when the consumer stops iterating.
+
+        """
+        reuses_buffers = getattr(self.loader, 'reuses_buffers', False)
+        try:
+            for data, targets in self.loader:
+                batch = [data, targets]
+                if self.is_cuda:
+                    with torch.cuda.stream(self._stream):
+                        if reuses_buffers:
+                            batch = _clone_tensors(batch)
+                        batch = set_tensor_device(_pin_tensors(batch),
+                                                  device=self.device)
+                    # The batch is handed out once its copies are done,
+                    # and before the loader may overwrite its buffers.
+                    self._stream.synchronize()
+                else:
+                    if reuses_buffers:
+                        batch = _clone_tensors(batch)
+                    batch = set_tensor_device(batch, device=self.device)
+                ready_batches.put(batch)
+                if stop.is_set():
+                    return
+            ready_batches.put(_END_OF_BATCHES)
+        except Exception as e:
+            ready_batches.put(e)
+
+
 def master_device_setter(network, device=None):
     """
     Convert network and input_networks to specified device.
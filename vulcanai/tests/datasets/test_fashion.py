@@ -0,0 +1,126 @@
+# coding=utf-8
+""" Defines test cases for the IDX readers of the fashion dataset """
+import gzip
+import os
+import struct
+
+import numpy as np
+import pytest
+import torch
+
+from vulcanai.datasets import fashion
+
+
+def write_idx_file(path, array, type_code):
+    """Write array as an IDX file with the given type code."""
+    header = struct.pack('>BBBB', 0, 0, type_code, array.ndim) + \
+        struct.pack('>' + 'I' * array.ndim, *array.shape)
+    data = header + array.astype(array.dtype.newbyteorder('>')).tobytes()
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'wb') as f:
+        f.write(data)
+
+
+# noinspection PyMissingOrEmptyDocstring
+class TestReadIdxFile:
+    @pytest.mark.parametrize("type_code,dtype", [
+        (0x08, np.uint8), (0x09, np.int8), (0x0B, np.int16),
+        (0x0C, np.int32), (0x0D, np.float32), (0x0E, np.float64)])
+    def test_read_idx_file(self, tmpdir, type_code, dtype):
+        array = (np.random.rand(4, 3, 2, 5) * 100).astype(dtype)
+        for filename, mmap in [('data-idx', False), ('data-idx', True),
+                               ('data-idx.gz', False)]:
+            path = os.path.join(str(tmpdir), filename)
+            write_idx_file(path, array, type_code)
+            res = fashion.read_idx_file(path, mmap=mmap)
+            assert res.dtype == dtype
+            np.testing.assert_array_equal(res, array)
+
+    def test_read_label_and_image_file(self, tmpdir):
+        images = np.random.randint(0, 256, size=(6, 28, 28)).astype(np.uint8)
+        labels = np.random.randint(0, 10, size=6).astype(np.uint8)
+        image_path = os.path.join(str(tmpdir), 'images-idx3-ubyte')
+        label_path = os.path.join(str(tmpdir), 'labels-idx1-ubyte')
+        write_idx_file(image_path, images, 0x08)
+        write_idx_file(label_path, labels, 0x08)
+
+        res_images = fashion.read_image_file(image_path)
+        res_labels = fashion.read_label_file(label_path)
+        assert res_images.dtype == torch.uint8
+        assert res_labels.dtype == torch.long
+        assert torch.equal(res_images, torch.from_numpy(images))
+        assert torch.equal(res_labels, torch.from_numpy(labels).long())
+
+    def test_read_idx_file_invalid(self, tmpdir):
+        path = os.path.join(str(tmpdir), 'data-idx')
+        with open(path, 'wb') as f:
+            f.write(b'\x01\x02\x08\x01')
+        with pytest.raises(ValueError):
+            fashion.read_idx_file(path)
+
+        write_idx_file(path, np.zeros(5, dtype=np.uint8), 0x08)
+        with open(path, 'rb') as f:
+            truncated = f.read()[:-1]
+        with open(path, 'wb') as f:
+            f.write(truncated)
+        with pytest.raises(ValueError):
+            fashion.read_idx_file(path)
+
+        with pytest.raises(ValueError):
+            fashion.read_idx_file(path + '.gz', mmap=True)
+
+
+# noinspection PyMissingOrEmptyDocstring
+class TestFashionData:
+    @pytest.fixture
+    def root(self, tmpdir):
+        """Processed files of a small random dataset."""
+        os.makedirs(os.path.join(str(tmpdir), 'processed'))
+        for filename, num_items in [('training.pt', 20), ('test.pt', 9)]:
+            torch.save(
+                (torch.randint(0, 256, (num_items, 28, 28),
+                               dtype=torch.uint8),
+                 torch.randint(0, 10, (num_items,))),
+                os.path.join(str(tmpdir), 'processed', filename))
+        return str(tmpdir)
+
+    def pil_dataset(self, root, **kwargs):
+        """Dataset forced onto the PIL path with an equal transform."""
+        dataset = fashion.FashionData(root, **kwargs)
+        dataset.transform = fashion.transforms.Compose(
+            dataset.transform.transforms)
+        return dataset
+
+    @pytest.mark.parametrize("train,preload", [
+        (True, False), (False, False), (True, True)])
+    def test_getitem(self, root, train, preload):
+        dataset = fashion.FashionData(root, train=train, preload=preload)
+        pil_dataset = self.pil_dataset(root, train=train)
+        assert len(dataset) == len(pil_dataset)
+
+        for idx in [0, len(dataset) - 1, np.int64(2), torch.tensor(3)]:
+            img, target = dataset[idx]
+            pil_img, pil_target = pil_dataset[idx]
+            assert torch.equal(img, pil_img)
+            assert target == pil_target
+
+        pil_imgs, pil_targets = next(iter(torch.utils.data.DataLoader(
+            pil_dataset, batch_size=len(pil_dataset))))
+        for index in [[4, 0, 4], slice(1, 5), torch.tensor([2, 1])]:
+            imgs, targets = dataset[index]
+            assert torch.equal(imgs, pil_imgs[index])
+            assert torch.equal(targets, pil_targets[index])
+
+        imgs, targets = next(iter(torch.utils.data.DataLoader(
+            dataset, batch_size=len(dataset))))
+        assert torch.equal(imgs, pil_imgs)
+        assert torch.equal(targets, pil_targets)
+
+    def test_getitem_transforms(self, root):
+        dataset = fashion.FashionData(root, target_transform=lambda t: t + 1)
+        pil_dataset = self.pil_dataset(root)
+        imgs, targets = dataset[[1, 3]]
+        pil_imgs, pil_targets = pil_dataset[[1, 3]]
+        assert torch.equal(imgs, pil_imgs)
+        assert torch.equal(targets, pil_targets + 1)
+        assert dataset[1][1] == pil_dataset[1][1] + 1
@@ -0,0 +1,109 @@
+# coding=utf-8
+""" Defines test cases for the memory-mapped dataset """
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+import torch
+from torch.utils.data import DataLoader
+
+from vulcanai.datasets import (MemmapDataset, MemmapDatasetWriter,
+                               write_memmap_dataset, tabular_data_utils)
+from vulcanai.datasets.utils import get_targets
+from vulcanai.models import DenseNet
+
+
+# noinspection PyMissingOrEmptyDocstring
+class TestMemmapDataset:
+    @pytest.fixture
+    def df(self):
+        rng = np.random.RandomState(0)
+        return pd.DataFrame({
+            'a': rng.rand(30),
+            'label': rng.randint(0, 3, 30),
+            'b': rng.randint(0, 100, 30),
+            'c': rng.rand(30)
+        })
+
+    def chunks(self, df):
+        # Later chunks may order their columns differently.
+        return [df[:7], df[7:8], df[8:][['c', 'label', 'b', 'a']]]
+
+    @pytest.mark.parametrize("target_vars,continuous_target", [
+        ('label', False), (['label', 'c'], True), (None, False)])
+    def test_matches_tensor_dataset(self, tmpdir, df, target_vars,
+                                    continuous_target):
+        dataset = write_memmap_dataset(str(tmpdir), self.chunks(df),
+                                       target_vars=target_vars,
+                                       continuous_target=continuous_target)
+        tensor_dataset = tabular_data_utils.convert_to_tensor_datasets(
+            df, target_vars=target_vars,
+            continuous_target=continuous_target)
+
+        assert len(dataset) == len(tensor_dataset)
+        for idx in [0, 29, [3, 1, 3], slice(4, 9)]:
+            for res, target_res in zip(dataset[idx], tensor_dataset[idx]):
+                assert res.dtype == target_res.dtype
+                assert torch.equal(res, target_res)
+
+        for batch, target_batch in zip(
+                DataLoader(dataset, batch_size=8, shuffle=False),
+                DataLoader(tensor_dataset, batch_size=8, shuffle=False)):
+            for res, target_res in zip(batch, target_batch):
+                assert torch.equal(res, target_res)
+
+        if target_vars:
+            assert torch.equal(get_targets(dataset),
+                               tensor_dataset.tensors[1])
+
+    def test_pickle(self, tmpdir, df):
+        dataset = write_memmap_dataset(str(tmpdir), df, target_vars='label')
+        res = pickle.loads(pickle.dumps(dataset))
+        assert len(pickle.dumps(dataset)) < df.values.nbytes
+        for res_item, item in zip(res[[2, 5]], dataset[[2, 5]]):
+            assert torch.equal(res_item, item)
+
+    def test_writer_errors(self, tmpdir, df):
+        with pytest.raises(ValueError):
+            MemmapDataset(str(tmpdir))
+
+        with MemmapDatasetWriter(str(tmpdir), target_vars='label') as writer:
+            writer.write(df)
+            with pytest.raises(ValueError):
+                writer.write(df.drop('a', axis=1))
+            # Not readable before the writer is closed.
+            assert not os.path.exists(os.path.join(str(tmpdir), 'meta.json'))
+        with pytest.raises(ValueError):
+            writer.write(df)
+        assert len(MemmapDataset(str(tmpdir))) == len(df)
+
+    def test_failed_write(self, tmpdir, df):
+        def failing_chunks():
+            yield df[:10]
+            raise pd.errors.ParserError("Bad line")
+
+        # Overwriting a complete dataset.
+        write_memmap_dataset(str(tmpdir), df, target_vars='label')
+        with pytest.raises(pd.errors.ParserError):
+            write_memmap_dataset(str(tmpdir), failing_chunks(),
+                                 target_vars='label')
+        assert not os.path.exists(os.path.join(str(tmpdir), 'meta.json'))
+        with pytest.raises(ValueError):
+            MemmapDataset(str(tmpdir))
+
+    def test_fit_and_cross_validate(self, tmpdir, df):
+        dataset = write_memmap_dataset(str(tmpdir), self.chunks(df),
+                                       target_vars='c',
+                                       continuous_target=True)
+        network = DenseNet(
+            name='Test_DenseNet_memmap',
+            in_dim=(3,),
+            config={'dense_units': [8]},
+            num_classes=1
+        )
+        loader = DataLoader(dataset, batch_size=8, shuffle=True)
+        network.fit(loader, loader, epochs=1)
+        res = network.cross_validate(loader, k=2, epochs=1)
+        assert 'mse' in res
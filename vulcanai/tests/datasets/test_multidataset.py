@@ -0,0 +1,100 @@
+# coding=utf-8
+""" Defines test cases for the MultiDataset """
+import logging
+
+import pytest
+import torch
+from torch.utils.data import Dataset, DataLoader, Subset, TensorDataset
+from torch.utils.data.dataloader import default_collate
+
+from vulcanai.datasets import MultiDataset
+
+
+class ItemDataset(Dataset):
+    """Dataset only readable item by item."""
+
+    def __init__(self, tensor_dataset):
+        self.tensor_dataset = tensor_dataset
+
+    def __len__(self):
+        return len(self.tensor_dataset)
+
+    def __getitem__(self, idx):
+        return self.tensor_dataset[idx]
+
+
+def assert_batches_equal(batch, other_batch):
+    """Check two (input_data, target) batches hold the same tensors."""
+    assert len(batch[0]) == len(other_batch[0])
+    for data, other_data in zip(batch[0], other_batch[0]):
+        if isinstance(data, list):
+            assert_batches_equal((data, None), (other_data, None))
+        else:
+            assert torch.equal(data, other_data)
+    if batch[1] is None:
+        assert other_batch[1] is None
+    else:
+        assert torch.equal(batch[1], other_batch[1])
+
+
+# noinspection PyMissingOrEmptyDocstring
+class TestMultiDataset:
+    @pytest.fixture
+    def tensor_dataset(self):
+        return TensorDataset(torch.rand(20, 3), torch.randint(0, 4, [20]))
+
+    @pytest.fixture
+    def multi_dataset(self, tensor_dataset):
+        short_dataset = TensorDataset(torch.rand(15, 2, 2),
+                                      torch.randint(0, 4, [15]))
+        nested_dataset = MultiDataset([
+            (ItemDataset(tensor_dataset), True, False),
+            (short_dataset, True, False)
+        ])
+        return MultiDataset([
+            (tensor_dataset, True, True),
+            (short_dataset, False, False),
+            nested_dataset
+        ])
+
+    def test_len(self, multi_dataset, caplog):
+        assert len(multi_dataset) == 15
+        with caplog.at_level(logging.WARNING):
+            for _ in range(3):
+                len(multi_dataset)
+        assert not caplog.records
+
+    def test_getitem(self, multi_dataset, tensor_dataset):
+        input_data, target = multi_dataset[4]
+        assert len(input_data) == 2
+        assert torch.equal(input_data[0], tensor_dataset[4][0])
+        assert torch.equal(input_data[1][0], tensor_dataset[4][0])
+        assert torch.equal(target, tensor_dataset[4][1])
+
+    def test_nested_target(self, tensor_dataset):
+        multi_dataset = MultiDataset([
+            (tensor_dataset, True, False),
+            MultiDataset([(tensor_dataset, True, True)])
+        ])
+        assert torch.equal(multi_dataset[3][1], tensor_dataset[3][1])
+        assert torch.equal(multi_dataset.__getitems__([3])[0][1],
+                           tensor_dataset[3][1])
+
+    def test_getitems(self, multi_dataset):
+        indices = [14, 0, 3, 3]
+        samples = multi_dataset.__getitems__(indices)
+        assert len(samples) == len(indices)
+        for sample, idx in zip(samples, indices):
+            assert_batches_equal(sample, multi_dataset[idx])
+
+    def test_data_loader(self, multi_dataset):
+        subset = Subset(multi_dataset, [2, 9, 14, 5, 0, 1, 7])
+        loader = DataLoader(subset, batch_size=3)
+        expected_batches = [
+            default_collate([subset[i] for i in range(start,
+                                                      min(start + 3, 7))])
+            for start in range(0, 7, 3)]
+        batches = list(loader)
+        assert len(batches) == len(expected_batches)
+        for batch, expected_batch in zip(batches, expected_batches):
+            assert_batches_equal(batch, expected_batch)
@@ -0,0 +1,139 @@
+# coding=utf-8
+""" Defines test cases for the MultiInputLoader """
+import pytest
+import torch
+from torch.utils.data import Dataset, DataLoader, Subset, TensorDataset
+
+from vulcanai.datasets import MultiDataset, MultiInputLoader
+
+TEST_CUDA = torch.cuda.is_available()
+
+
+class ItemDataset(Dataset):
+    """Dataset only readable item by item."""
+
+    def __init__(self, tensor_dataset):
+        self.tensor_dataset = tensor_dataset
+
+    def __len__(self):
+        return len(self.tensor_dataset)
+
+    def __getitem__(self, idx):
+        return self.tensor_dataset[idx]
+
+
+class FailingDataset(ItemDataset):
+    """Dataset failing to read its last item."""
+
+    def __getitem__(self, idx):
+        if idx == len(self) - 1:
+            raise IndexError("Failed to read {}".format(idx))
+        return self.tensor_dataset[idx]
+
+
+def assert_batches_equal(batch, other_batch):
+    """Check two (input_data, target) batches hold the same tensors."""
+    assert len(batch[0]) == len(other_batch[0])
+    for data, other_data in zip(batch[0], other_batch[0]):
+        if isinstance(data, list):
+            assert_batches_equal((data, None), (other_data, None))
+        else:
+            assert data.is_contiguous()
+            assert torch.equal(data, other_data)
+    if batch[1] is None:
+        assert other_batch[1] is None
+    else:
+        assert torch.equal(batch[1], other_batch[1])
+
+
+# noinspection PyMissingOrEmptyDocstring
+class TestMultiInputLoader:
+    @pytest.fixture
+    def tensor_dataset(self):
+        return TensorDataset(torch.rand(23, 3), torch.randint(0, 4, [23]))
+
+    @pytest.fixture
+    def multi_dataset(self, tensor_dataset):
+        image_dataset = TensorDataset(torch.rand(25, 1, 4, 4))
+        nested_dataset = MultiDataset([
+            (ItemDataset(tensor_dataset), True, False),
+            (image_dataset, True, False)
+        ])
+        return MultiDataset([
+            (image_dataset, True, False),
+            (tensor_dataset, True, True),
+            nested_dataset
+        ])
+
+    @pytest.mark.parametrize('prefetch', [0, 1, 3])
+    def test_batches(self, multi_dataset, prefetch):
+        datasets = [
+            multi_dataset,
+            Subset(Subset(multi_dataset, range(3, 20)), [16, 0, 4, 4, 9])
+        ]
+        for dataset in datasets:
+            for drop_last in [False, True]:
+                loader = MultiInputLoader(dataset, batch_size=4,
+                                          drop_last=drop_last,
+                                          prefetch=prefetch)
+                expected_batches = list(DataLoader(dataset, batch_size=4,
+                                                   drop_last=drop_last))
+                assert len(loader) == len(expected_batches)
+                num_batches = 0
+                for batch, expected_batch in zip(loader, expected_batches):
+                    assert_batches_equal(batch, expected_batch)
+                    num_batches += 1
+                assert num_batches == len(expected_batches)
+
+    def test_shuffle(self, multi_dataset, tensor_dataset):
+        loader = MultiInputLoader(multi_dataset, batch_size=5, shuffle=True)
+        targets = torch.cat([targets.clone() for _, targets in loader])
+        assert torch.equal(targets.sort().values,
+                           tensor_dataset.tensors[1].sort().values)
+
+    def test_buffers_reused(self, multi_dataset):
+        loader = MultiInputLoader(multi_dataset, batch_size=4, prefetch=0)
+        data_ptrs = {data[0].data_ptr() for data, _ in loader}
+        assert len(data_ptrs) == 1
+
+    @pytest.mark.skipif(not TEST_CUDA, reason="No CUDA"
+                        " supported devices available")
+    @pytest.mark.parametrize('prefetch', [0, 2])
+    def test_cuda_buffers(self, multi_dataset, prefetch):
+        loader = MultiInputLoader(multi_dataset, batch_size=4,
+                                  device='cuda:0', prefetch=prefetch)
+        expected_batches = DataLoader(multi_dataset, batch_size=4)
+        for (data, targets), (_, expected_targets) in zip(loader,
+                                                          expected_batches):
+            assert data[0].is_cuda
+            # Queue long kernels reading the batch before the next copy.
+            for _ in range(50):
+                (data[0] @ data[0].transpose(-1, -2)).sum()
+            assert torch.equal(targets.cpu(), expected_targets)
+
+    def test_release_without_prefetch(self, multi_dataset, monkeypatch):
+        loader = MultiInputLoader(multi_dataset, batch_size=4, prefetch=0)
+        released = []
+        monkeypatch.setattr(loader, '_release', released.append)
+        batches = sum(1 for _ in loader)
+        assert len(released) == batches - 1
+
+    def test_early_exit(self, multi_dataset):
+        loader = MultiInputLoader(multi_dataset, batch_size=2, prefetch=2)
+        for _ in range(3):
+            for _ in loader:
+                break
+        assert len(list(loader)) == len(loader)
+
+    def test_errors(self, tensor_dataset):
+        with pytest.raises(ValueError):
+            MultiInputLoader(tensor_dataset)
+        with pytest.raises(ValueError):
+            MultiInputLoader(MultiDataset([(tensor_dataset, True, True)]),
+                             prefetch=-1)
+
+        loader = MultiInputLoader(
+            MultiDataset([(FailingDataset(tensor_dataset), True, True)]),
+            batch_size=4)
+        with pytest.raises(IndexError):
+            list(loader)
@@ -0,0 +1,105 @@
+# coding=utf-8
+""" Defines test cases for the sparse tensor dataset """
+import numpy as np
+import pandas as pd
+import pytest
+import torch
+from torch.utils.data import DataLoader, BatchSampler, SequentialSampler
+
+from vulcanai.datasets import (SparseTensorDataset, collate_sparse,
+                               tabular_data_utils)
+from vulcanai.datasets.utils import get_targets
+from vulcanai.models import DenseNet
+
+
+# noinspection PyMissingOrEmptyDocstring
+class TestSparseTensorDataset:
+    @pytest.fixture
+    def df(self):
+        rng = np.random.RandomState(0)
+        return pd.DataFrame({
+            'category': rng.choice(['a', 'b', 'c', 'd', None], 30),
+            'label': rng.randint(0, 3, 30),
+            'b': rng.randint(0, 3, 30),
+            'c': rng.rand(30)
+        })
+
+    @pytest.mark.parametrize("target_vars,continuous_target", [
+        ('label', False), (['label', 'c'], True), (None, False)])
+    def test_matches_tensor_dataset(self, df, target_vars,
+                                    continuous_target):
+        sparse_df = tabular_data_utils.create_one_hot_encoding(
+            df, 'category', sparse=True)
+        dense_df = tabular_data_utils.create_one_hot_encoding(
+            df, 'category')
+        dataset = tabular_data_utils.convert_to_tensor_datasets(
+            sparse_df, target_vars=target_vars,
+            continuous_target=continuous_target, sparse=True)
+        tensor_dataset = tabular_data_utils.convert_to_tensor_datasets(
+            dense_df, target_vars=target_vars,
+            continuous_target=continuous_target)
+
+        assert isinstance(dataset, SparseTensorDataset)
+        assert len(dataset) == len(tensor_dataset)
+        for idx in [0, 29, [3, 1, 3], slice(4, 9), torch.tensor([2, 0])]:
+            res, target_res = dataset[idx], tensor_dataset[idx]
+            assert res[0].is_sparse
+            assert torch.equal(res[0].to_dense(), target_res[0])
+            for res_item, target_item in zip(res[1:], target_res[1:]):
+                assert torch.equal(res_item, target_item)
+
+        loaders = [
+            DataLoader(dataset, batch_size=8, collate_fn=collate_sparse),
+            DataLoader(dataset, batch_size=None, sampler=BatchSampler(
+                SequentialSampler(dataset), batch_size=8, drop_last=False))
+        ]
+        for loader in loaders:
+            for batch, target_batch in zip(
+                    loader, DataLoader(tensor_dataset, batch_size=8)):
+                assert torch.equal(batch[0].to_dense(), target_batch[0])
+                for res, target_res in zip(batch[1:], target_batch[1:]):
+                    assert torch.equal(res, target_res)
+
+        samples = collate_sparse([dataset[2], dataset[0]])
+        for res, target_res in zip(samples, tensor_dataset[[2, 0]]):
+            assert torch.equal(res.to_dense(), target_res)
+
+        if target_vars:
+            assert torch.equal(get_targets(dataset),
+                               tensor_dataset.tensors[1])
+
+    def test_data_layouts(self):
+        data = torch.tensor([[0., 1., 0.], [0., 0., 0.], [2., 0., 3.]])
+        targets = torch.arange(3)
+        for layout_data in [data, data.to_sparse(),
+                            data.to_sparse().to_sparse_csr()]:
+            dataset = SparseTensorDataset(layout_data, targets)
+            assert torch.equal(dataset[[2, 1, 0]][0].to_dense(),
+                               data[[2, 1, 0]])
+            assert torch.equal(dataset[2][0].to_dense(), data[2])
+        with pytest.raises(ValueError):
+            SparseTensorDataset(data, targets[:2])
+
+    def test_reverse_one_hot_encoding(self, df):
+        sparse_df = tabular_data_utils.create_one_hot_encoding(
+            df.dropna(), 'category', sparse=True)
+        res = tabular_data_utils.reverse_create_one_hot_encoding(
+            sparse_df, prefix_sep='@')
+        assert res['category'].equals(df.dropna()['category'])
+
+    def test_fit(self, df):
+        sparse_df = tabular_data_utils.create_one_hot_encoding(
+            df, 'category', sparse=True)
+        dataset = tabular_data_utils.convert_to_tensor_datasets(
+            sparse_df, target_vars='c', continuous_target=True, sparse=True)
+        network = DenseNet(
+            name='Test_DenseNet_sparse',
+            in_dim=(dataset.num_features,),
+            config={'dense_units': [8]},
+            num_classes=1
+        )
+        loader = DataLoader(dataset, batch_size=8, shuffle=True,
+                            collate_fn=collate_sparse)
+        network.fit(loader, loader, epochs=1)
+        res = network.run_test(loader, plot=False)
+        assert 'mse' in res
@@ -0,0 +1,101 @@
+# coding=utf-8
+""" Defines test cases for the chunked tabular pipeline """
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+import torch
+
+from vulcanai.datasets import tabular_data_utils, ChunkedTabularPipeline
+
+DATA_PATH = str(os.path.dirname(__file__)) + \
+    "/test_data/birthweight_reduced.csv"
+
+
+# noinspection PyMissingOrEmptyDocstring
+class TestChunkedTabularPipeline:
+    @pytest.fixture
+    def my_test_dataset(self):
+        return pd.read_csv(DATA_PATH, na_values='Nan')
+
+    @pytest.fixture
+    def pipeline(self):
+        # Chunks smaller than the dataset so statistics get merged.
+        return ChunkedTabularPipeline(DATA_PATH, chunksize=7,
+                                      na_values='Nan').fit()
+
+    def test_identify(self, my_test_dataset, pipeline):
+        assert set(pipeline.identify_null(0.2)) == \
+            set(tabular_data_utils.identify_null(my_test_dataset, 0.2))
+        for threshold in [2, 5, 30]:
+            assert pipeline.identify_unique(threshold) == \
+                tabular_data_utils.identify_unique(my_test_dataset,
+                                                   threshold)
+        for threshold in [0.3, 0.5, 0.8]:
+            for non_numeric in [True, False]:
+                assert pipeline.identify_unbalanced_columns(
+                    threshold, non_numeric=non_numeric) == \
+                    tabular_data_utils.identify_unbalanced_columns(
+                        my_test_dataset, threshold, non_numeric=non_numeric)
+
+        res = pipeline.identify_low_variance(0.05)
+        target_res = tabular_data_utils.identify_low_variance(
+            my_test_dataset, 0.05)
+        assert res.keys() == target_res.keys()
+        for col in res:
+            np.testing.assert_almost_equal(res[col], target_res[col])
+
+    def test_transform(self, my_test_dataset, pipeline):
+        res = pipeline.convert_all_categorical_binary(list_only=True)
+        target_res = tabular_data_utils.convert_all_categorical_binary(
+            my_test_dataset, list_only=True)
+        assert [(col, list(index)) for col, index in res] == \
+            [(col, list(index)) for col, index in target_res]
+
+        pipeline.convert_all_categorical_binary(
+            exception_columns=['LowBirthWeight'])
+        pipeline.create_one_hot_encoding('LowBirthWeight')
+        pipeline.drop_columns(['id'])
+
+        target_df = tabular_data_utils.convert_all_categorical_binary(
+            my_test_dataset, exception_columns=['LowBirthWeight'])
+        target_df = tabular_data_utils.create_one_hot_encoding(
+            target_df, 'LowBirthWeight').drop(['id'], axis=1)
+        chunks = list(pipeline.transform())
+        assert len(chunks) == 6
+        pd.testing.assert_frame_equal(pd.concat(chunks), target_df)
+
+    def test_sources(self, my_test_dataset):
+        for source in [my_test_dataset,
+                       lambda: [my_test_dataset[:20], my_test_dataset[20:]]]:
+            pipeline = ChunkedTabularPipeline(source, chunksize=9)
+            assert pipeline.num_rows == len(my_test_dataset)
+            assert pipeline.identify_unique(5) == \
+                tabular_data_utils.identify_unique(my_test_dataset, 5)
+
+    def test_max_distinct(self, my_test_dataset):
+        pipeline = ChunkedTabularPipeline(DATA_PATH, chunksize=7,
+                                          max_distinct=4, na_values='Nan')
+        assert pipeline.identify_unique(5) == \
+            tabular_data_utils.identify_unique(my_test_dataset, 5)
+        with pytest.raises(ValueError):
+            pipeline.identify_unique(10)
+        with pytest.raises(ValueError):
+            pipeline.create_one_hot_encoding('Birthweight')
+        # Decided as long as no uncounted value can reach the threshold.
+        assert pipeline.identify_unbalanced_columns(0.7) == \
+            tabular_data_utils.identify_unbalanced_columns(my_test_dataset,
+                                                           0.7)
+        with pytest.raises(ValueError):
+            pipeline.identify_unbalanced_columns(0.5)
+
+    def test_write_memmap_dataset(self, tmpdir, my_test_dataset, pipeline):
+        df = my_test_dataset.drop(['LowBirthWeight', 'id'], axis=1).fillna(0)
+        pipeline = ChunkedTabularPipeline(df, chunksize=7)
+        dataset = pipeline.write_memmap_dataset(
+            str(tmpdir), target_vars='Birthweight', continuous_target=True)
+        tensor_dataset = tabular_data_utils.convert_to_tensor_datasets(
+            df, target_vars='Birthweight', continuous_target=True)
+        for res, target_res in zip(dataset[:], tensor_dataset[:]):
+            assert torch.equal(res, target_res)
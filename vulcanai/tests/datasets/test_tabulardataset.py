@@ -53,6 +53,28 @@ class TestTabularDataset:
                                                            prefix_sep="@")
         assert "LowBirthWeight@Low" not in set(list(res.columns))
 
+    def test_reverse_create_one_hot_encoding_values(self):
+        df = pd.DataFrame({
+            'a@x': [1., 0., 0., np.nan],
+            'b@u': [0, 1, 0, 1],
+            'a@y@z': [0., 1., 0., np.nan],
+            'c': [5, 6, 7, 8],
+            'b@v': [1, 0, 0, 0],
+            'a@w': [0., 0.2, 0.5, np.nan]
+        })
+        res = tabular_data_utils.reverse_create_one_hot_encoding(
+            df, prefix_sep='@')
+        assert list(res.columns) == ['a', 'b', 'c']
+        assert res['a'].tolist()[:3] == ['x', 'y@z', 'w']
+        assert np.isnan(res['a'][3])
+        assert res['b'].tolist() == ['v', 'u', 'u', 'u']
+        assert res['c'].equals(df['c'])
+
+        res = tabular_data_utils.reverse_create_one_hot_encoding(
+            df, prefix_sep='@', column_name='b@u')
+        assert res['b'].tolist() == ['u'] * 4
+        assert 'b@v' in res.columns
+
     def test_identify_null(self, my_test_dataset):
         num_threshold = 0.2
         res = tabular_data_utils.identify_null(my_test_dataset, num_threshold)
@@ -72,13 +94,92 @@ class TestTabularDataset:
     def test_identify_highly_correlated(self, my_test_dataset):
         res = tabular_data_utils.identify_highly_correlated(my_test_dataset,
                                                             0.2)
-        assert (('fage', 'motherage'), 0.8065844173531495) in res
+        res = dict(res)
+        assert res[('motherage', 'fage')] == pytest.approx(0.8065844173531495)
+        assert ('fage', 'motherage') not in res
+
+    def test_identify_highly_correlated_blocks(self, my_test_dataset):
+        my_test_dataset['constant'] = 1.
+        corr = my_test_dataset.corr().abs()
+        expected = {}
+        for i, col in enumerate(corr.columns):
+            for other_col in corr.columns[i + 1:]:
+                if corr.loc[col, other_col] > 0.2:
+                    expected[(col, other_col)] = corr.loc[col, other_col]
+        for block_size in [1, 3, 1024]:
+            res = dict(tabular_data_utils.identify_highly_correlated(
+                my_test_dataset, 0.2, block_size=block_size))
+            assert res.keys() == expected.keys()
+            for pair, val in res.items():
+                assert val == pytest.approx(expected[pair])
 
     def test_identify_low_variance(self, my_test_dataset):
         res = tabular_data_utils.identify_low_variance(my_test_dataset, 0.05
                                                        )
         assert 'Gestation' in res
 
+    def test_convert_all_categorical_binary(self):
+        df = pd.DataFrame({
+            'answer': ['yes', 'no', 'yes', None],
+            'flag': [0, 1, 1, 1],
+            'level': pd.Categorical(['low'] * 4,
+                                    categories=['low', 'high']),
+            'many': [1, 2, 3, 4],
+            'skip': ['a', 'b', 'a', 'b']
+        })
+        res = tabular_data_utils.convert_all_categorical_binary(
+            df, list_only=True)
+        assert [(col, list(index)) for col, index in res] == [
+            ('answer', ['yes', 'no']), ('flag', [1, 0]),
+            ('level', ['low', 'high']), ('skip', ['a', 'b'])]
+
+        expected = pd.DataFrame({
+            'answer': [1., 0., 1., np.nan],
+            'flag': [0., 1., 1., 1.],
+            'level': [1.] * 4,
+            'many': [1, 2, 3, 4],
+            'skip': ['a', 'b', 'a', 'b']
+        })
+        for n_workers in [1, 3]:
+            res = tabular_data_utils.convert_all_categorical_binary(
+                df, exception_columns=['skip'], n_workers=n_workers)
+            pd.testing.assert_frame_equal(res, expected)
+        assert df['answer'][0] == 'yes'
+
+    def test_profile_columns(self, my_test_dataset):
+        my_test_dataset['mixed'] = ['a', 1] * 21
+        res = tabular_data_utils.profile_columns(my_test_dataset)
+
+        assert list(res.index) == list(my_test_dataset.columns)
+        assert res.loc['fedyrs', 'num_null'] == 10
+        assert res.loc['LowBirthWeight', 'num_unique'] == 2
+        assert res.loc['headcirumference', 'num_unique'] == \
+            len(my_test_dataset['headcirumference'].unique())
+        assert list(res.index[res['mixed_types']]) == ['mixed']
+        np.testing.assert_almost_equal(
+            res.loc['LowBirthWeight', 'majority_proportion'], 36 / 42)
+        assert np.isnan(res.loc['LowBirthWeight', 'scaled_variance'])
+
+        capped_res = tabular_data_utils.profile_columns(my_test_dataset,
+                                                        max_unique=5)
+        assert capped_res.loc['id', 'num_unique'] == 5
+        assert np.isnan(capped_res.loc['id', 'majority_proportion'])
+        assert capped_res.loc['smoker', 'num_unique'] == 2
+
+        # One profile serves all identify_ functions.
+        assert set(tabular_data_utils.identify_null(
+            my_test_dataset, 0.2, profile=res)) == {'fedyrs'}
+        assert tabular_data_utils.identify_unique(
+            my_test_dataset, 5, profile=res) == \
+            tabular_data_utils.identify_unique(my_test_dataset, 5)
+        assert tabular_data_utils.identify_unbalanced_columns(
+            my_test_dataset, 0.5, profile=res) == \
+            tabular_data_utils.identify_unbalanced_columns(my_test_dataset,
+                                                           0.5)
+        assert tabular_data_utils.identify_low_variance(
+            my_test_dataset, 0.05, profile=res) == \
+            tabular_data_utils.identify_low_variance(my_test_dataset, 0.05)
+
 
 # This is breaking lint for now because it aids in the clarity of the data
 # TODO: refactor
@@ -169,6 +270,23 @@ class TestStitchDataset:
         pd.testing.assert_frame_equal(stitch_dataset_results.sort_index(axis=1), df_two_moc_results.sort_index(axis=1),
                                       check_dtype=False)
 
+    def test_merge_on_columns_first_non_null(self):
+        df_main = pd.DataFrame({'name': ['Jane', 'John', None],
+                                'age': [np.nan, 25, 30]})
+        df_one = pd.DataFrame({'name': ['John', 'Jesse', 'Jane'],
+                               'age': ['26', '40', '23'],
+                               'state': [None, 'OR', 'CA']})
+        df_two = pd.DataFrame({'state': ['WA', 'NY'],
+                               'name': ['John', 'Jesse']})
+        expected = pd.DataFrame({'name': ['Jane', 'John', 'Jesse'],
+                                 'age': [23., 25., 40.],
+                                 'state': ['CA', 'WA', 'OR']},
+                                index=[0, 1, 4])
+        stitch_dataset_results = tabular_data_utils.stitch_datasets(
+            df_main=df_main, merge_on_columns=['name'], df_one=df_one,
+            df_two=df_two)
+        pd.testing.assert_frame_equal(stitch_dataset_results, expected)
+
     def test_three_merge_on_columns(self, my_test_dataset_four):
         df_three_moc_results = pd.DataFrame({'name': ['Jane', 'John', 'Jesse', 'Jane', 'John', 'Jesse'],
                                              'age': [23, 25, 26, 23, 25, 26],
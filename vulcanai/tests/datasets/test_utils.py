@@ -0,0 +1,79 @@
+# coding=utf-8
+""" Defines test cases for the dataset utilities """
+import pytest
+import torch
+from torch.utils.data import (Dataset, TensorDataset, Subset,
+                              ConcatDataset)
+
+from vulcanai.datasets import MultiDataset
+from vulcanai.datasets.utils import get_targets
+
+
+class ItemDataset(Dataset):
+    """Dataset only readable item by item."""
+
+    def __init__(self, tensor_dataset):
+        self.tensor_dataset = tensor_dataset
+
+    def __len__(self):
+        return len(self.tensor_dataset)
+
+    def __getitem__(self, idx):
+        return self.tensor_dataset[idx]
+
+
+def naive_targets(dataset):
+    """Targets read item by item."""
+    return torch.stack([torch.as_tensor(dataset[i][1])
+                        for i in range(len(dataset))])
+
+
+# noinspection PyMissingOrEmptyDocstring
+class TestGetTargets:
+    @pytest.fixture
+    def tensor_dataset(self):
+        return TensorDataset(torch.rand(20, 3), torch.randint(0, 4, [20]))
+
+    def test_tensor_dataset(self, tensor_dataset):
+        targets = get_targets(tensor_dataset)
+        assert targets.data_ptr() == tensor_dataset.tensors[1].data_ptr()
+        assert torch.equal(targets, naive_targets(tensor_dataset))
+
+    def test_wrapped_datasets(self, tensor_dataset):
+        other_dataset = TensorDataset(torch.rand(7, 3),
+                                      torch.randint(0, 4, [7]))
+        subset = Subset(tensor_dataset, [3, 3, 0, 19])
+        datasets = [
+            subset,
+            Subset(subset, [2, 1]),
+            ConcatDataset([subset, other_dataset]),
+            Subset(ConcatDataset([tensor_dataset, other_dataset]),
+                   [25, 0, 21])
+        ]
+        for dataset in datasets:
+            assert torch.equal(get_targets(dataset), naive_targets(dataset))
+
+    def test_multi_dataset(self, tensor_dataset):
+        short_dataset = TensorDataset(torch.rand(15, 2),
+                                      torch.randint(0, 4, [15]))
+        multi_dataset = MultiDataset([
+            (tensor_dataset, True, True),
+            (short_dataset, True, False)
+        ])
+        targets = get_targets(multi_dataset)
+        assert len(targets) == 15
+        assert torch.equal(targets, naive_targets(multi_dataset))
+
+        with pytest.raises(ValueError):
+            get_targets(MultiDataset([(tensor_dataset, True, False)]))
+
+    def test_fallback(self, tensor_dataset):
+        datasets = [
+            ItemDataset(tensor_dataset),
+            Subset(ItemDataset(tensor_dataset), [5, 1]),
+            ConcatDataset([tensor_dataset, ItemDataset(tensor_dataset)]),
+            MultiDataset([(ItemDataset(tensor_dataset), True, True)])
+        ]
+        for dataset in datasets:
+            assert torch.equal(get_targets(dataset, batch_size=3),
+                               naive_targets(dataset))
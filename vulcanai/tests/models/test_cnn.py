@@ -11,6 +11,7 @@ import torch.nn as nn
 from torch.utils.data import DataLoader, Subset, TensorDataset
 
 import vulcanai
+from vulcanai.datasets import MultiInputLoader
 from vulcanai.models import BaseNetwork
 from vulcanai.models.cnn import ConvNet, ConvNetConfig
 from vulcanai.models.utils import master_device_setter
@@ -140,6 +141,32 @@ class TestConvNet:
         for params in conv3D_net.network.parameters():
             assert params.requires_grad is True
 
+    def test_fit_multi_input_loader(self, multi_input_cnn,
+                                    multi_input_cnn_data):
+        """Test fit and forward_pass with a MultiInputLoader."""
+        test_net = copy.deepcopy(multi_input_cnn)
+        half = len(multi_input_cnn_data) // 2
+        train_loader = MultiInputLoader(
+            Subset(multi_input_cnn_data, range(half)), batch_size=2,
+            device=test_net.device, prefetch=2)
+        val_loader = MultiInputLoader(
+            Subset(multi_input_cnn_data,
+                   range(half, len(multi_input_cnn_data))),
+            batch_size=2, device=test_net.device)
+        init_weights = test_net.network[0]._kernel.weight.detach().clone()
+        test_net.fit(train_loader, val_loader, 2)
+        assert not torch.equal(init_weights,
+                               test_net.network[0]._kernel.weight.detach())
+
+        expected_output = test_net.forward_pass(DataLoader(
+            Subset(multi_input_cnn_data,
+                   range(half, len(multi_input_cnn_data))),
+            batch_size=2))
+        assert np.allclose(test_net.forward_pass(val_loader),
+                           expected_output)
+        with pytest.raises(ValueError):
+            next(test_net.iter_forward_pass(val_loader, return_indices=True))
+
     def test_fit_multi_input(self, multi_input_cnn,
                              multi_input_cnn_train_loader,
                              multi_input_cnn_test_loader):
@@ -207,6 +234,49 @@ class TestConvNet:
         shutil.rmtree(abs_save_path)
         assert all(load_params)
 
+    def test_fit_mixed_precision_multi_input(self, multi_input_cnn,
+                                             multi_input_cnn_train_loader,
+                                             multi_input_cnn_test_loader):
+        """Test bfloat16 autocast training through a multi input stack."""
+        test_net = copy.deepcopy(multi_input_cnn)
+        test_net.fit(
+            multi_input_cnn_train_loader,
+            multi_input_cnn_test_loader,
+            2,
+            mixed_precision='bfloat16')
+        # Weights stay in full precision and are updated
+        close_params = [not torch.allclose(param1, param2)
+                        for param1, param2 in zip(multi_input_cnn.parameters(),
+                                                  test_net.parameters())]
+        assert all(close_params)
+        assert all(param.dtype == torch.float
+                   for param in test_net.parameters())
+        assert np.all(np.isfinite(test_net.record['train_error']))
+        assert np.isfinite(test_net.record['validation_error'][0])
+
+        test_net.save_model()
+        save_path = test_net.save_path
+        abs_save_path = os.path.dirname(os.path.abspath(save_path))
+        loaded_test_net = BaseNetwork.load_model(load_path=save_path)
+        load_params = [torch.allclose(param1, param2)
+                       for param1, param2 in zip(test_net.parameters(),
+                                                 loaded_test_net.parameters())]
+        shutil.rmtree(abs_save_path)
+        assert all(load_params)
+
+    def test_fit_mixed_precision_invalid(self, conv3D_net_class):
+        """Test unsupported mixed precision modes are refused."""
+        data_loader = DataLoader(TensorDataset(
+            torch.rand(size=[2, *conv3D_net_class.in_dim]),
+            torch.tensor([0, 1]).long()))
+        with pytest.raises(ValueError):
+            conv3D_net_class.fit(data_loader, data_loader, 1,
+                                 mixed_precision='float8')
+        if conv3D_net_class.device.type == 'cpu':
+            with pytest.raises(ValueError):
+                conv3D_net_class.fit(data_loader, data_loader, 1,
+                                     mixed_precision='float16')
+
     def test_forward_pass_class_not_nan_single_value(self,
                                                      conv3D_net_class_single_value):
         """Confirm out is non nan."""
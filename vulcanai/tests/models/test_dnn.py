@@ -18,6 +18,14 @@ from vulcanai.models.utils import master_device_setter
 logger = logging.getLogger(__name__)
 
 
+class NoisyDataset(TensorDataset):
+    """TensorDataset adding random noise to its inputs."""
+
+    def __getitem__(self, idx):
+        data, target = super().__getitem__(idx)
+        return data + torch.rand(data.shape), target
+
+
 class TestDenseNet:
     """Define DenseNet test class."""
 
@@ -223,6 +231,146 @@ class TestDenseNet:
             transform_outputs=False)
         assert np.any(~np.isnan(raw_output))
 
+    def test_forward_pass_partial_batch(self, dnn_class):
+        """Confirm forward_pass fills every row when the last batch is
+        partial and matches a single full-batch forward."""
+        test_input = torch.rand(size=[11, *dnn_class.in_dim])
+        test_dataloader = DataLoader(TensorDataset(test_input, test_input),
+                                     batch_size=4)
+        output = dnn_class.forward_pass(data_loader=test_dataloader)
+        with torch.no_grad():
+            expected = dnn_class._final_transform(dnn_class(test_input))
+        assert output.shape == (11, *dnn_class.out_dim)
+        np.testing.assert_almost_equal(output, expected.numpy(), decimal=5)
+
+    def test_iter_forward_pass(self, dnn_class):
+        """Confirm streamed chunks match forward_pass, and that the yielded
+        indices line up with a shuffled sampler."""
+        test_input = torch.rand(size=[11, *dnn_class.in_dim])
+        test_dataloader = DataLoader(TensorDataset(test_input, test_input),
+                                     batch_size=4)
+        expected = dnn_class.forward_pass(data_loader=test_dataloader)
+
+        chunks = list(dnn_class.iter_forward_pass(test_dataloader))
+        assert [len(c) for c in chunks] == [4, 4, 3]
+        np.testing.assert_almost_equal(np.concatenate(chunks), expected)
+
+        shuffled_dataloader = DataLoader(
+            TensorDataset(test_input, test_input), batch_size=4,
+            shuffle=True)
+        seen = []
+        for indices, chunk in dnn_class.iter_forward_pass(
+                shuffled_dataloader, return_indices=True):
+            np.testing.assert_almost_equal(chunk, expected[indices],
+                                           decimal=5)
+            seen.extend(indices.tolist())
+        assert sorted(seen) == list(range(11))
+
+    def test_iter_forward_pass_loader_settings(self, dnn_class):
+        """Confirm recording the indices keeps the worker and random
+        settings of the DataLoader."""
+        test_input = torch.rand(size=[11, *dnn_class.in_dim])
+        dataset = NoisyDataset(test_input, test_input)
+
+        def get_data_loader():
+            return DataLoader(dataset, batch_size=4, num_workers=1,
+                              prefetch_factor=3, persistent_workers=True,
+                              generator=torch.Generator().manual_seed(0))
+
+        expected = list(dnn_class.iter_forward_pass(get_data_loader()))
+        torch.manual_seed(1)
+        for (indices, chunk), expected_chunk in zip(
+                dnn_class.iter_forward_pass(get_data_loader(),
+                                            return_indices=True),
+                expected):
+            np.testing.assert_almost_equal(chunk, expected_chunk)
+
+    def test_validate_partial_batch(self, dnn_class):
+        """Confirm the epoch loss and accuracy are exact when the last
+        batch is partial."""
+        dnn_class = copy.deepcopy(dnn_class)
+        dnn_class._init_trainer()
+        test_input = torch.rand(size=[11, *dnn_class.in_dim])
+        test_target = torch.tensor([0, 1, 2, 0, 1, 2, 0, 1, 2, 0, 1]).long()
+        test_dataloader = DataLoader(TensorDataset(test_input, test_target),
+                                     batch_size=4)
+        val_loss, val_acc = dnn_class._validate(test_dataloader)
+
+        with torch.no_grad():
+            raw_output = dnn_class(test_input)
+        expected_loss = dnn_class.criterion(raw_output, test_target).item()
+        expected_acc = dnn_class.metrics.get_accuracy(
+            test_target.numpy(),
+            dnn_class.metrics.transform_outputs(raw_output))
+        np.testing.assert_almost_equal(val_loss, expected_loss, decimal=5)
+        np.testing.assert_almost_equal(val_acc, expected_acc)
+
+    def test_fit_accumulation_steps(self):
+        """Confirm micro-batching steps the optimizer like the full batch."""
+        vulcanai.set_global_seed(42)
+        dnn = DenseNet(
+            name='dnn_accumulation',
+            in_dim=(12),
+            config={'dense_units': [20]},
+            optim_spec={'name': 'SGD', 'lr': 0.1},
+            num_classes=3,
+            device='cpu'
+        )
+        dnn_accumulated = copy.deepcopy(dnn)
+        test_input = torch.rand(size=[11, *dnn.in_dim])
+        test_target = torch.tensor([0, 1, 2, 0, 1, 2, 0, 1, 2, 0, 1]).long()
+        test_dataloader = DataLoader(TensorDataset(test_input, test_target),
+                                     batch_size=6)
+
+        dnn.fit(test_dataloader, test_dataloader, 2)
+        dnn_accumulated.fit(test_dataloader, test_dataloader, 2,
+                            accumulation_steps=4)
+
+        for param1, param2 in zip(dnn.parameters(),
+                                  dnn_accumulated.parameters()):
+            assert torch.allclose(param1, param2, atol=1e-6)
+        for key in ['train_error', 'train_accuracy', 'validation_error']:
+            np.testing.assert_allclose(dnn.record[key],
+                                       dnn_accumulated.record[key],
+                                       rtol=1e-5)
+
+        with pytest.raises(ValueError):
+            dnn.fit(test_dataloader, test_dataloader, 1,
+                    accumulation_steps=0)
+
+    def test_fit_prefetch(self):
+        """Confirm prefetching batches trains like loading them in place."""
+        vulcanai.set_global_seed(42)
+        dnn = DenseNet(
+            name='dnn_prefetch',
+            in_dim=(12),
+            config={'dense_units': [20]},
+            optim_spec={'name': 'SGD', 'lr': 0.1},
+            num_classes=3,
+            device='cpu'
+        )
+        dnn_prefetched = copy.deepcopy(dnn)
+        test_input = torch.rand(size=[11, *dnn.in_dim])
+        test_target = torch.tensor([0, 1, 2, 0, 1, 2, 0, 1, 2, 0, 1]).long()
+        test_dataloader = DataLoader(TensorDataset(test_input, test_target),
+                                     batch_size=4)
+
+        dnn.fit(test_dataloader, test_dataloader, 2)
+        dnn_prefetched.fit(test_dataloader, test_dataloader, 2, prefetch=2)
+
+        for param1, param2 in zip(dnn.parameters(),
+                                  dnn_prefetched.parameters()):
+            assert torch.equal(param1, param2)
+        for key in ['train_error', 'train_accuracy', 'validation_error']:
+            np.testing.assert_allclose(dnn.record[key],
+                                       dnn_prefetched.record[key])
+        for key in ['train_wait_time', 'train_compute_time']:
+            assert len(dnn_prefetched.record[key]) == 2
+            assert all(t >= 0 for t in dnn_prefetched.record[key])
+
+        with pytest.raises(ValueError):
+            dnn.fit(test_dataloader, test_dataloader, 1, prefetch=-1)
+
     def test_early_stopping(self, dnn_class_early_stopping,
                             dnn_class):
         """ Test that their final params are different: aka
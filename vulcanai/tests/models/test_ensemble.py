@@ -118,3 +118,26 @@ class TestSnapshotNet:
             plot=False
         )
         assert test_snap.template_network.lr_scheduler.get_lr()[0] < 0.001
+
+    def test_snapshot_mixed_precision(self, cnn_noclass, dnn_class):
+        """Confirm snapshots train under bfloat16 autocast."""
+        test_input = torch.randint(0, 10, size=[3, *cnn_noclass.in_dim]).float()
+        test_target = torch.LongTensor([0, 2, 1])
+        test_dataloader = DataLoader(TensorDataset(test_input, test_target))
+        test_snap = SnapshotNet(
+            name='test_snap',
+            template_network=dnn_class,
+            n_snapshots=2
+        )
+        test_snap.fit(
+            train_loader=test_dataloader,
+            val_loader=test_dataloader,
+            epochs=2,
+            mixed_precision='bfloat16'
+        )
+        assert len(test_snap.network) == 2
+        output = test_snap.forward_pass(
+            data_loader=test_dataloader,
+            transform_outputs=False)
+        assert output.shape == (3, test_snap.num_classes)
+        assert np.all(np.isfinite(output))
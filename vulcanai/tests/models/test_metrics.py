@@ -1,12 +1,19 @@
 # coding=utf-8
 """Includes TestMetrics which tests the metrics class of vulcanai."""
+import copy
 import pytest
 import numpy as np
+import logging
+import random
 import torch
-from vulcanai.models.metrics import Metrics
+import vulcanai
+from vulcanai.models.metrics import (Metrics, MetricAccumulator,
+                                     _fit_and_test_fold)
 from vulcanai.models.cnn import ConvNet
+from vulcanai.models.dnn import DenseNet
 from torch.utils.data import TensorDataset, DataLoader
 import pandas as pd
+from sklearn import metrics as skl_metrics
 import os
 
 
@@ -121,6 +128,142 @@ class TestMetrics:
         for k in all_results:
             assert isinstance(all_results[k], list)
 
+    def test_cross_validate_parallel(self, metrics, cnn_class):
+        """Tests parallel folds are shaped like the sequential results and
+        seeded folds are reproducible."""
+        num_items = 60
+        test_input = torch.Tensor(np.random.randint(0, 10,
+                                                    size=(num_items,
+                                                          *cnn_class.in_dim)))
+        test_target = torch.LongTensor(np.random.randint(0, 10,
+                                                         size=num_items))
+        test_dataset = TensorDataset(test_input, test_target)
+        test_dataloader = DataLoader(test_dataset, batch_size=10)
+
+        k = 3
+        epochs = 1
+
+        sequential_results = metrics.cross_validate(
+            cnn_class, test_dataloader, k, epochs,
+            average_results=False)
+        parallel_results = metrics.cross_validate(
+            cnn_class, test_dataloader, k, epochs,
+            average_results=False, n_workers=2, torch_threads=1)
+
+        assert parallel_results.keys() == sequential_results.keys()
+        for m in parallel_results:
+            assert len(parallel_results[m]) == k
+
+        fold_results = [
+            _fit_and_test_fold(
+                cnn_class, test_dataset, test_dataset, batch_size=10,
+                shuffle=True, epochs=epochs, retain_graph=None,
+                valid_interv=4, plot=False, save_path=None,
+                transform_callable=None, seed=7)
+            for _ in range(2)]
+        for m in fold_results[0]:
+            np.testing.assert_equal(fold_results[0][m], fold_results[1][m])
+
+        with pytest.raises(ValueError):
+            metrics.cross_validate(cnn_class, test_dataloader, k, epochs,
+                                   n_workers=0)
+        with pytest.raises(ValueError, match='transform_callable'):
+            metrics.cross_validate(cnn_class, test_dataloader, k, epochs,
+                                   transform_callable=lambda x: x,
+                                   n_workers=2)
+
+    def test_bootfold_p_estimate(self, metrics, caplog):
+        """Tests bootstrap replicates are reproducible and stop early once
+        the p value interval is narrow enough."""
+        dnn = DenseNet(
+            name='Test_DenseNet_boot',
+            in_dim=(4),
+            config={'dense_units': [8]},
+            num_classes=2,
+            device='cpu'
+        )
+
+        def make_loader():
+            test_input = torch.rand(size=[20, 4],
+                                    generator=torch.Generator().manual_seed(0))
+            test_input[:, 0] = (test_input[:, 0] > 0.5).float()
+            return DataLoader(TensorDataset(test_input,
+                                            test_input[:, 0].long()))
+
+        p_values = []
+        # Keep the seed from leaking into the other tests.
+        with torch.random.fork_rng():
+            for _ in range(2):
+                vulcanai.set_global_seed(3)
+                p_values.append(metrics.bootfold_p_estimate(
+                    dnn, make_loader(), n_samples=2, k=2, epochs=1,
+                    index_to_iter=0, ls_feat_vals=[0., 1.]))
+            # Only the replicate seeds are drawn from the caller's stream.
+            random_values = (torch.rand(1).item(), np.random.rand(),
+                             random.random())
+            vulcanai.set_global_seed(3)
+            torch.randint(2 ** 31 - 1, [2])
+            assert random_values == (torch.rand(1).item(), np.random.rand(),
+                                     random.random())
+        assert 0. <= p_values[0] <= 1.
+        assert p_values[0] == p_values[1]
+
+        # The interval of a single replicate is ~0.79 wide.
+        with caplog.at_level(logging.INFO):
+            metrics.bootfold_p_estimate(
+                dnn, make_loader(), n_samples=3, k=2, epochs=1,
+                index_to_iter=0, ls_feat_vals=[0., 1.], ci_width=0.8)
+        assert "after 1 of 3 replicates" in caplog.text
+
+        with pytest.raises(ValueError):
+            metrics.bootfold_p_estimate(
+                dnn, make_loader(), n_samples=2, k=2, epochs=1,
+                index_to_iter=0, ls_feat_vals=[0., 1.], n_workers=0)
+
+        unpicklable_dnn = copy.deepcopy(dnn)
+        unpicklable_dnn.transform = lambda x: x
+        with pytest.raises(ValueError, match='network'):
+            metrics.bootfold_p_estimate(
+                unpicklable_dnn, make_loader(), n_samples=2, k=2, epochs=1,
+                index_to_iter=0, ls_feat_vals=[0., 1.], n_workers=2)
+
+    @pytest.mark.parametrize("batch_size", [3, 7, 4096])
+    def test_conduct_sensitivity_analysis(self, metrics,
+                                          dnn_class_multi_value,
+                                          sensitivity_data_loader,
+                                          tmp_path, batch_size):
+        """Tests the batched class counts match perturbing each feature
+        value one at a time."""
+        inputs = sensitivity_data_loader.dataset.tensors[0].clone()
+        features = ['f{}'.format(i) for i in range(inputs.shape[1])]
+        filename = str(tmp_path / 'sensitivity')
+
+        test_df = metrics.conduct_sensitivity_analysis(
+            dnn_class_multi_value, sensitivity_data_loader, filename,
+            features=features, cutoff=3, batch_size=batch_size)
+
+        # 5 unique values per feature, every other one is kept
+        assert len(test_df) == 3 * len(features)
+        pd.testing.assert_frame_equal(test_df, pd.read_csv(filename + '.csv'),
+                                      check_dtype=False)
+        assert torch.equal(sensitivity_data_loader.dataset.tensors[0], inputs)
+        count_columns = ["Number of examples classified as class "
+                         "{}".format(i) for i in range(3)]
+        for feature_idx, feature in enumerate(features):
+            feature_df = test_df[test_df["Feature"] == feature]
+            unique_values = np.unique(inputs[:, feature_idx].numpy())
+            np.testing.assert_equal(feature_df["Value"].values,
+                                    unique_values[0::2])
+            for value, counts in zip(feature_df["Value"].values,
+                                     feature_df[count_columns].values):
+                perturbed = inputs.clone()
+                perturbed[:, feature_idx] = float(value)
+                with torch.no_grad():
+                    predictions = torch.argmax(
+                        dnn_class_multi_value(perturbed), dim=1)
+                np.testing.assert_equal(
+                    counts, np.bincount(predictions.numpy(), minlength=3))
+
     def test_get_score(self, metrics):
         """Test that get score returns correct values, with complex params."""
         test_target, test_predictions = self.create_target_predictions()
@@ -294,6 +437,66 @@ class TestMetrics:
 
         np.testing.assert_almost_equal(res, target_res)
 
+    @pytest.mark.parametrize("num_classes,average",
+                             [(10, 'macro'), (2, 'binary'), (10, None)])
+    def test_get_all_scores(self, metrics, num_classes, average):
+        """Test that the fused scores match the individual get_ functions."""
+        rng = np.random.RandomState(0)
+        targets = rng.randint(0, num_classes, size=500)
+        # Coarse scores so that the AUCs include ties.
+        raw_predictions = np.round(rng.rand(500, num_classes), 1)
+        raw_predictions[:, 1] = 0.5
+        predictions = metrics.transform_outputs(raw_predictions)
+
+        scores = metrics.get_all_scores(targets, raw_predictions,
+                                        num_classes, average=average)
+
+        np.testing.assert_array_equal(
+            scores['confusion_matrix'],
+            skl_metrics.confusion_matrix(targets, predictions))
+        for res, target_res in zip(
+                [scores[k] for k in ['tp', 'tn', 'fp', 'fn']],
+                metrics.get_confusion_matrix_values(targets, predictions)):
+            np.testing.assert_array_equal(res, target_res)
+        np.testing.assert_almost_equal(
+            scores['accuracy'], metrics.get_accuracy(targets, predictions))
+        np.testing.assert_almost_equal(
+            scores['auc'], metrics.get_auc(targets, raw_predictions,
+                                           num_classes))
+        for name in ['sensitivity', 'specificity', 'dice', 'ppv', 'npv',
+                     'f1']:
+            func = getattr(metrics, 'get_' + name)
+            np.testing.assert_almost_equal(
+                scores[name], func(targets, predictions), decimal=6)
+            if average:
+                np.testing.assert_almost_equal(
+                    scores['macro_' + name],
+                    func(targets, predictions, average=average), decimal=6)
+        if average:
+            np.testing.assert_almost_equal(
+                scores['macro_auc'],
+                metrics.get_auc(targets, raw_predictions, num_classes,
+                                average=average))
+
+    def test_get_all_scores_labels(self, metrics):
+        """Test the confusion matrix of sparse and non integer labels."""
+        targets = np.array([0, 7, 7, 3])
+        predictions = np.array([7, 7, 0, 3])
+        labels, cm = metrics._get_confusion_matrix(targets, predictions)
+        np.testing.assert_array_equal(labels, [0, 3, 7])
+        np.testing.assert_array_equal(
+            cm, skl_metrics.confusion_matrix(targets, predictions))
+
+        labels, cm = metrics._get_confusion_matrix(targets - 0.5,
+                                                   predictions - 0.5)
+        np.testing.assert_array_equal(labels, [-0.5, 2.5, 6.5])
+        np.testing.assert_array_equal(
+            cm, skl_metrics.confusion_matrix(targets, predictions))
+
+        with pytest.raises(ValueError):
+            metrics.get_all_scores(np.array([0, 1, 2]),
+                                   np.eye(3), 3, average='binary')
+
     def test_run_test(self, metrics, cnn_class):
         """Test that run_test returns values as expected."""
         num_items = 300
@@ -333,6 +536,75 @@ class TestMetrics:
 
         assert all(k in res_dict for k in required_metrics)
 
+    @pytest.mark.parametrize("num_classes,average",
+                             [(10, 'macro'), (2, 'binary'), (3, None)])
+    def test_metric_accumulator(self, metrics, num_classes, average):
+        """Test that batch by batch scores match get_all_scores."""
+        rng = np.random.RandomState(0)
+        targets = rng.randint(0, num_classes, size=503)
+        # Scores coarser than the bins give exact AUCs, ties included.
+        raw_predictions = np.round(rng.rand(503, num_classes), 2)
+
+        accumulator = MetricAccumulator(num_classes)
+        for idx in np.array_split(np.arange(503), [7, 100, 101, 400]):
+            accumulator.update(torch.tensor(raw_predictions[idx]),
+                               torch.tensor(targets[idx]))
+        res = accumulator.finalize(average=average)
+        target_res = metrics.get_all_scores(targets, raw_predictions,
+                                            num_classes, average=average)
+
+        assert res.keys() == target_res.keys()
+        for key in res:
+            np.testing.assert_almost_equal(res[key], target_res[key])
+
+        accumulator.reset()
+        with pytest.raises(ValueError):
+            accumulator.finalize()
+        with pytest.raises(ValueError):
+            accumulator.update(torch.rand(2, num_classes),
+                               torch.tensor([0, num_classes]))
+
+        # Logits would be clipped into the end bins.
+        accumulator.reset()
+        accumulator.update(torch.randn(4, num_classes) * 5,
+                           torch.tensor([0, 1, 0, 1]))
+        with pytest.raises(ValueError):
+            accumulator.finalize(average=average)
+
+    def test_metric_accumulator_continuous(self, metrics):
+        """Test that the accumulated MSE matches get_mse."""
+        targets = np.random.rand(50)
+        predictions = np.random.rand(50, 1)
+
+        accumulator = MetricAccumulator(num_classes=1)
+        for idx in np.array_split(np.arange(50), 3):
+            accumulator.update(torch.tensor(predictions[idx]),
+                               torch.tensor(targets[idx]))
+
+        np.testing.assert_almost_equal(accumulator.finalize()['mse'],
+                                       metrics.get_mse(targets, predictions))
+
+    def test_run_test_streaming(self, metrics, cnn_class):
+        """Test that streaming run_test matches the collected run_test."""
+        num_items = 300
+        test_input = torch.Tensor(np.random.randint(0, 10,
+                                                    size=(num_items,
+                                                          *cnn_class.in_dim)))
+        test_target = torch.LongTensor(np.random.randint(0, 10,
+                                                         size=num_items))
+        test_dataloader = DataLoader(TensorDataset(test_input, test_target),
+                                     batch_size=32)
+
+        res_dict = metrics.run_test(cnn_class, test_dataloader)
+        streaming_res_dict = metrics.run_test(cnn_class, test_dataloader,
+                                              streaming=True)
+
+        assert res_dict.keys() == streaming_res_dict.keys()
+        for key in res_dict:
+            # The streamed AUC comes from binned scores.
+            assert streaming_res_dict[key] == \
+                pytest.approx(res_dict[key], abs=1e-2)
+
     def test_cross_validate_outputs_stratified(self, metrics, cnn_class):
         """Tests that the cross-validate outputs are in the correct form."""
         num_items = 300
@@ -2,11 +2,18 @@
 import pytest
 import numpy as np
 import torch
-from vulcanai.models.utils import (round_list,
+from torch.utils.data import DataLoader, Subset, TensorDataset
+from vulcanai.datasets import MultiDataset, MultiInputLoader
+from vulcanai.models.dnn import DenseNet
+from vulcanai.models.utils import (_get_probs,
+                                    _filter_matched_subj,
+                                    round_list,
                                     get_one_hot,
                                     pad,
                                     set_tensor_device,
-                                    master_device_setter)
+                                    split_batch,
+                                    master_device_setter,
+                                    BatchPrefetcher)
 
 TEST_CUDA = torch.cuda.is_available()
 
@@ -66,6 +73,134 @@ def test_pad():
         n_channels * n_features * n_features * n_features
 
 
+def test_split_batch():
+    """Test batches and nested input lists split along the batch dim."""
+    test_tensor = torch.arange(10).reshape([5, 2])
+    micro_batches = split_batch(test_tensor, 2)
+    assert [len(m) for m in micro_batches] == [3, 2]
+    assert torch.equal(torch.cat(micro_batches), test_tensor)
+
+    # Multi input data keeps its structure in every micro-batch
+    test_list = [torch.rand([5, 3]), [torch.rand([5, 1, 4]),
+                                      torch.rand([5, 2])]]
+    micro_batches = split_batch(test_list, 3)
+    assert len(micro_batches) == 3
+    assert torch.equal(micro_batches[1][0], test_list[0][2:4])
+    assert torch.equal(micro_batches[2][1][0], test_list[1][0][4:])
+    assert torch.equal(micro_batches[0][1][1], test_list[1][1][:2])
+
+
+class _FailingDataset(TensorDataset):
+    """TensorDataset failing to read its last item."""
+
+    def __getitem__(self, idx):
+        if idx == len(self) - 1:
+            raise IndexError("Failed to read {}".format(idx))
+        return super().__getitem__(idx)
+
+
+def test_batch_prefetcher():
+    """Test prefetched batches match those of the loader."""
+    dataset = TensorDataset(torch.rand(11, 3), torch.randint(0, 3, [11]))
+    loader = DataLoader(dataset, batch_size=3)
+    prefetcher = BatchPrefetcher(loader, device='cpu', num_batches=2)
+    assert prefetcher.dataset is dataset
+    assert len(prefetcher) == len(loader)
+    for _ in range(2):
+        batches = list(prefetcher)
+        assert len(batches) == len(loader)
+        for (data, targets), (exp_data, exp_targets) in zip(batches,
+                                                             loader):
+            assert torch.equal(data, exp_data)
+            assert torch.equal(targets, exp_targets)
+
+    # Stopping early stops the worker thread.
+    for _ in prefetcher:
+        break
+    assert len(list(prefetcher)) == len(loader)
+
+    with pytest.raises(IndexError):
+        list(BatchPrefetcher(DataLoader(_FailingDataset(*dataset.tensors),
+                                        batch_size=3)))
+    with pytest.raises(ValueError):
+        BatchPrefetcher(loader, num_batches=0)
+
+
+@pytest.mark.parametrize('loader_prefetch', [0, 1])
+def test_batch_prefetcher_reused_buffers(loader_prefetch):
+    """Test batches of a loader reusing its buffers are kept intact, when
+    prefetched by fit or by a BatchPrefetcher."""
+    dataset = MultiDataset([
+        (TensorDataset(torch.rand(20, 3), torch.arange(20)), True, True),
+        (TensorDataset(torch.rand(20, 2)), True, False)
+    ])
+    loader = MultiInputLoader(dataset, batch_size=4,
+                              prefetch=loader_prefetch)
+    dnn = DenseNet(
+        name='dnn_prefetch_loader',
+        in_dim=(3),
+        config={'dense_units': [4]},
+        num_classes=20,
+        device='cpu'
+    )
+    for prefetched_loader in [dnn._get_prefetching_loader(loader, 2),
+                              BatchPrefetcher(loader, num_batches=2)]:
+        num_batches = 0
+        # Checked as they come, like in the training loop.
+        for batch_idx, (data, targets) in enumerate(prefetched_loader):
+            expected_rows = torch.arange(batch_idx * 4, batch_idx * 4 + 4)
+            assert torch.equal(targets, expected_rows)
+            assert torch.equal(data[1], dataset._children[1][0].tensors[0][
+                expected_rows])
+            num_batches += 1
+        assert num_batches == 5
+
+    # The prefetched batches are copies, so they can be kept.
+    batches = list(BatchPrefetcher(loader, num_batches=2))
+    assert torch.equal(torch.cat([targets for _, targets in batches]),
+                       torch.arange(20))
+
+
+def test_get_probs():
+    """Test the batched scores match scoring each subject and value."""
+    dnn = DenseNet(
+        name='dnn_probs',
+        in_dim=(4),
+        config={'dense_units': [8]},
+        num_classes=2,
+        device='cpu'
+    )
+    test_input = torch.rand([9, 4])
+    test_input[:, 2] = torch.tensor([0., 1., 2., 0., 1., 2., 0., 1., 2.])
+    dataset = TensorDataset(test_input.clone(), torch.zeros(9).long())
+    loader = DataLoader(Subset(dataset, [8, 1, 3, 4, 6]), batch_size=2,
+                        shuffle=True)
+    ls_feat_vals = [0., 1., 2.]
+
+    dct_scores = _get_probs(dnn, loader, 2, ls_feat_vals, batch_size=4)
+
+    # Dataset is left as is
+    assert torch.equal(dataset.tensors[0], test_input)
+    assert list(dct_scores) == list(range(5))
+    for subj, row in enumerate(test_input[[8, 1, 3, 4, 6]]):
+        orig_val = row[2].item()
+        assert list(dct_scores[subj])[0] == orig_val
+        assert sorted(dct_scores[subj]) == ls_feat_vals
+        for val in ls_feat_vals:
+            new_row = row.clone()
+            new_row[2] = val
+            with torch.no_grad():
+                prob = dnn._final_transform(dnn(new_row.unsqueeze(0)))
+            np.testing.assert_allclose(dct_scores[subj][val],
+                                       prob[0, 1].item() * 100, atol=0.01)
+
+    # Keys index the loader dataset
+    dct_filtered = _filter_matched_subj(dct_scores, loader, 2)
+    for subj in dct_filtered:
+        assert dct_filtered[subj] == dct_scores[subj][
+            loader.dataset[subj][0][2].item()]
+
+
 @pytest.mark.skipif(not TEST_CUDA, reason="No CUDA"
                     " supported devices available")
 def test_set_tensor_device():